@@ -1,23 +1,873 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, g, make_response, Response,
+                   send_from_directory, has_app_context, before_render_template, template_rendered)
+import atexit
+import click
+import cProfile
+import pstats
 import sqlite3
-from datetime import datetime, timedelta
+import queue
+import random
+import base64
+import bisect
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import logging
+import mimetypes
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from jinja2 import FileSystemBytecodeCache
 import os
+import update_db
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; without it responses are only gzip-compressed
+    brotli = None
+
+try:
+    import numpy as np
+except ImportError:  # in requirements.txt; without it attendance analytics run in plain Python
+    np = None
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'  # Change this in production!
 
-DATABASE = 'database/university.db'
+app.config['DATABASE'] = os.environ.get('UMS_DATABASE', 'database/university.db')
 
-def get_db_connection():
-    """Create a database connection"""
-    conn = sqlite3.connect(DATABASE)
+# Connections kept open per worker process (0 disables pooling)
+DB_POOL_SIZE = int(os.environ.get('UMS_DB_POOL_SIZE', '8'))
+
+# Tuning applied once when a connection is opened
+DB_PRAGMAS = (
+    ('journal_mode', 'WAL'),        # readers don't block the writer
+    ('synchronous', 'NORMAL'),      # safe with WAL, one fsync per checkpoint
+    ('cache_size', -16000),         # 16 MB page cache
+    ('mmap_size', 268435456),       # 256 MB memory-mapped reads
+    ('temp_store', 'MEMORY'),       # sorts and temp tables stay in RAM
+    ('busy_timeout', 5000),         # wait up to 5s for the write lock
+)
+
+_pool = queue.LifoQueue(maxsize=max(DB_POOL_SIZE, 1))
+_pool_pid = os.getpid()
+
+def connect_db():
+    """Open a new tuned database connection"""
+    conn = sqlite3.connect(app.config['DATABASE'], check_same_thread=False, factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row  # This allows us to access columns by name
+    for pragma, value in DB_PRAGMAS:
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    conn.create_function('bit_at', 2, bit_at, deterministic=True)
     return conn
 
-def init_db():
-    """Initialize the database with tables and sample data"""
-    conn = get_db_connection()
+def _checkout_connection():
+    """Take a connection from this worker's pool, opening one if it is empty"""
+    global _pool, _pool_pid
+    # Connections must never cross a fork (e.g. gunicorn --preload)
+    if _pool_pid != os.getpid():
+        _pool = queue.LifoQueue(maxsize=max(DB_POOL_SIZE, 1))
+        _pool_pid = os.getpid()
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return connect_db()
+
+def _release_connection(conn):
+    """Return a connection to the pool, or close it if the pool is full"""
+    if conn.in_transaction:
+        conn.rollback()
+    if DB_POOL_SIZE > 0 and _pool_pid == os.getpid():
+        try:
+            _pool.put_nowait(conn)
+            return
+        except queue.Full:
+            pass
+    conn.close()
+
+def get_db_connection():
+    """Get the database connection for the current request.
+
+    The connection is checked out of the worker's pool on first use and
+    handed back by close_db_connection() when the app context ends, so
+    routes must not close it themselves.
+    """
+    if 'db' not in g:
+        g.db = _checkout_connection()
+        g.db.metrics = g.get('request_metrics')
+    return g.db
+
+@app.teardown_appcontext
+def close_db_connection(exception=None):
+    """Return the request's connection to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.metrics = None
+        _release_connection(conn)
+
+# ==================== REQUEST METRICS ====================
+# Connections are opened with InstrumentedConnection, whose cursors time
+# every statement and count the rows fetched. While a request holds the
+# connection the figures go into that request's g.request_metrics; at the
+# end of the request they are added to per-endpoint histograms, served in
+# Prometheus text format by /admin/metrics.
+
+SLOW_QUERY_SECONDS = float(os.environ.get('UMS_SLOW_QUERY_MS', '100')) / 1000
+
+slow_query_log = logging.getLogger('ums.slow_query')
+
+# Histogram upper bounds; seconds unless the name says otherwise
+METRIC_BUCKETS = {
+    'request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    'sql_duration_seconds': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    'template_render_seconds': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    'sql_queries_per_request': (1, 2, 5, 10, 20, 50, 100, 500),
+    'sql_rows_per_request': (1, 10, 100, 1000, 10000, 100000),
+}
+METRIC_HELP = {
+    'request_duration_seconds': 'Time spent handling the request',
+    'sql_duration_seconds': 'Time spent in SQLite per request',
+    'template_render_seconds': 'Time spent rendering templates per request',
+    'sql_queries_per_request': 'SQL statements executed per request',
+    'sql_rows_per_request': 'Rows fetched from SQLite per request',
+}
+
+# (metric, endpoint) -> per-bucket counts (last one is +Inf) followed by sum and count
+_histograms = {}
+_slow_queries = {}  # endpoint -> number of slow statements
+_metrics_lock = threading.Lock()
+
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_VALUE_LIST = re.compile(r'\(\?(?:, ?\?)+\)')
+
+def normalize_sql(sql):
+    """Statement text with literals replaced by ? so similar queries group together"""
+    sql = _SQL_LITERAL.sub('?', ' '.join(sql.split()))
+    return _SQL_VALUE_LIST.sub('(?, ...)', sql)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times its statements and counts the rows fetched.
+
+    Row-at-a-time fetches (fetchone, iteration) are only timed for the first
+    row of a statement, which runs most of a sorting or grouping query; the
+    rows after it are counted but not timed, so that looping over a large
+    result does not pay for two clock reads per row.
+    """
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._elapsed, self._logged, self._stepped = sql, 0.0, False, False
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(time.perf_counter() - start, 0, statement=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql, self._elapsed, self._logged, self._stepped = sql, 0.0, False, False
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(time.perf_counter() - start, 0, statement=True)
+
+    def fetchone(self):
+        if self._stepped:
+            row = super().fetchone()
+            self._count(row is not None)
+            return row
+        self._stepped = True
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._observe(time.perf_counter() - start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._observe(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._observe(time.perf_counter() - start, len(rows))
+        return rows
+
+    def __next__(self):
+        if self._stepped:
+            row = super().__next__()
+            self._count(1)
+            return row
+        self._stepped = True
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._observe(time.perf_counter() - start, 0)
+            raise
+        self._observe(time.perf_counter() - start, 1)
+        return row
+
+    def _count(self, rows):
+        metrics = self.connection.metrics
+        if metrics is not None:
+            metrics['rows'] += rows
+
+    def _observe(self, elapsed, rows, statement=False):
+        metrics = self.connection.metrics
+        if metrics is not None:
+            metrics['queries'] += statement
+            metrics['sql_time'] += elapsed
+            metrics['rows'] += rows
+        self._elapsed += elapsed
+        # A SELECT does much of its work while rows are fetched, so this is
+        # checked again after every timed fetch
+        if self._elapsed >= SLOW_QUERY_SECONDS and not self._logged:
+            self._logged = True
+            endpoint = metrics['endpoint'] if metrics is not None else None
+            with _metrics_lock:
+                _slow_queries[endpoint] = _slow_queries.get(endpoint, 0) + 1
+            slow_query_log.warning('slow query (%.1f ms, endpoint %s): %s',
+                                   self._elapsed * 1000, endpoint, normalize_sql(self._sql))
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors are InstrumentedCursors"""
+    metrics = None  # the current request's g.request_metrics, if any
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def observe(metric, endpoint, value):
+    """Add one observation to a histogram"""
+    buckets = METRIC_BUCKETS[metric]
+    with _metrics_lock:
+        counts = _histograms.get((metric, endpoint))
+        if counts is None:
+            counts = _histograms[(metric, endpoint)] = [0] * (len(buckets) + 3)
+        counts[bisect.bisect_left(buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+@app.before_request
+def start_request_metrics():
+    g.request_metrics = {
+        'endpoint': request.endpoint or 'unknown',
+        'start': time.perf_counter(),
+        'queries': 0,
+        'sql_time': 0.0,
+        'rows': 0,
+        'template_time': 0.0,
+    }
+
+@app.teardown_request
+def record_request_metrics(exception=None):
+    metrics = g.pop('request_metrics', None)
+    if metrics is None:
+        return
+    endpoint = metrics['endpoint']
+    observe('request_duration_seconds', endpoint, time.perf_counter() - metrics['start'])
+    observe('sql_duration_seconds', endpoint, metrics['sql_time'])
+    observe('template_render_seconds', endpoint, metrics['template_time'])
+    observe('sql_queries_per_request', endpoint, metrics['queries'])
+    observe('sql_rows_per_request', endpoint, metrics['rows'])
+
+@before_render_template.connect_via(app)
+def _start_template_timer(sender, template, context, **extra):
+    g.template_start = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _stop_template_timer(sender, template, context, **extra):
+    start = g.pop('template_start', None)
+    metrics = g.get('request_metrics')
+    if start is not None and metrics is not None:
+        metrics['template_time'] += time.perf_counter() - start
+
+def prometheus_metrics():
+    """All histograms and counters in Prometheus text exposition format"""
+    with _metrics_lock:
+        histograms = {key: list(counts) for key, counts in _histograms.items()}
+        slow_queries = dict(_slow_queries)
+        response_bytes = {endpoint: list(counts) for endpoint, counts in _response_bytes.items()}
+    lines = []
+    for metric, buckets in METRIC_BUCKETS.items():
+        name = f'ums_{metric}'
+        lines.append(f'# HELP {name} {METRIC_HELP[metric]}')
+        lines.append(f'# TYPE {name} histogram')
+        for (hist_metric, endpoint), counts in sorted(histograms.items()):
+            if hist_metric != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {counts[-2]:.6f}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {counts[-1]}')
+    lines.append(f'# HELP ums_slow_queries_total Statements slower than {SLOW_QUERY_SECONDS * 1000:g} ms')
+    lines.append('# TYPE ums_slow_queries_total counter')
+    for endpoint, count in sorted(slow_queries.items(), key=lambda item: str(item[0])):
+        lines.append(f'ums_slow_queries_total{{endpoint="{endpoint or "none"}"}} {count}')
+    lines.append('# HELP ums_response_bytes_total Response body bytes as rendered, after minifying and as sent')
+    lines.append('# TYPE ums_response_bytes_total counter')
+    for endpoint, counts in sorted(response_bytes.items()):
+        for stage, count in zip(('rendered', 'minified', 'sent'), counts):
+            lines.append(f'ums_response_bytes_total{{endpoint="{endpoint}",stage="{stage}"}} {count}')
+    lines.append('# HELP ums_response_bytes_saved_total Bytes saved by minifying and compressing responses')
+    lines.append('# TYPE ums_response_bytes_saved_total counter')
+    for endpoint, counts in sorted(response_bytes.items()):
+        lines.append(f'ums_response_bytes_saved_total{{endpoint="{endpoint}"}} {counts[0] - counts[2]}')
+    return '\n'.join(lines) + '\n'
+
+# ==================== REQUEST PROFILER ====================
+# An admin can run a single request under cProfile by adding ?_profile=1 or
+# an "X-Profile: 1" header. Each profile is saved to PROFILE_DIR as a pstats
+# dump (.prof), a collapsed-stack file for flamegraph.pl / speedscope
+# (.collapsed) and a plain-text summary (.txt). Requests without the flag
+# only pay for the flag check.
+
+PROFILE_DIR = os.environ.get('UMS_PROFILE_DIR', 'profiles')
+PROFILE_KEEP = 50  # newest profiles kept on disk
+
+def profiling_requested():
+    return ((request.args.get('_profile') or request.headers.get('X-Profile'))
+            and session.get('user_type') == 'admin')
+
+@app.before_request
+def start_profiler():
+    if profiling_requested():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already running
+            return
+        g.profiler = profiler
+        g.profile_start = time.perf_counter()
+
+@app.teardown_request
+def save_profile(exception=None):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    elapsed_ms = (time.perf_counter() - g.pop('profile_start')) * 1000
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{request.endpoint or 'unknown'}-{elapsed_ms:.0f}ms"
+    base = os.path.join(PROFILE_DIR, name)
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(base + '.prof')
+    with open(base + '.collapsed', 'w') as f:
+        f.writelines(f'{stack} {micros}\n' for stack, micros in collapsed_stacks(stats))
+    with open(base + '.txt', 'w') as f:
+        f.write(f'{request.method} {request.full_path}\n{elapsed_ms:.1f} ms\n\n')
+        pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
+    # Only the newest PROFILE_KEEP profiles are kept
+    for old in recent_profiles(limit=None)[PROFILE_KEEP:]:
+        for ext in ('.prof', '.collapsed', '.txt'):
+            path = os.path.join(PROFILE_DIR, old['name'] + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+def _frame_label(func):
+    filename, line, name = func
+    return f'{os.path.basename(filename)}:{line}:{name}' if line else name
+
+def collapsed_stacks(stats, max_depth=64):
+    """Approximate collapsed stacks ("a;b;c microseconds") from a cProfile call graph.
+
+    cProfile only records caller -> callee edges, so a function's time is
+    split between its callers in proportion to the time each edge accounts for.
+    """
+    children = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in stats.stats.items() if not entry[4]]
+    totals = {}
+
+    def walk(func, path, share):
+        _, _, self_time, cumulative, _ = stats.stats[func]
+        labels = path + (_frame_label(func),)
+        key = ';'.join(labels)
+        totals[key] = totals.get(key, 0) + self_time * share
+        if len(labels) >= max_depth:
+            return
+        for child, edge_time in children.get(func, ()):
+            child_cumulative = stats.stats[child][3]
+            # Recursive calls are folded into the frame already on the stack
+            if child_cumulative and _frame_label(child) not in labels:
+                walk(child, labels, share * edge_time / child_cumulative)
+
+    for root in roots:
+        walk(root, (), 1.0)
+    return [(stack, round(seconds * 1e6)) for stack, seconds in totals.items() if seconds >= 1e-6]
+
+def recent_profiles(limit=PROFILE_KEEP):
+    """Saved profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if filename.endswith('.prof'):
+            name = filename[:-len('.prof')]
+            # <date>-<time>-<microseconds>-<endpoint>-<duration>
+            parts = name.split('-')
+            profiles.append({
+                'name': name,
+                'created': datetime.fromtimestamp(os.path.getmtime(os.path.join(PROFILE_DIR, filename))),
+                'endpoint': parts[3],
+                'duration': parts[4],
+            })
+    profiles.sort(key=lambda profile: profile['name'], reverse=True)
+    return profiles[:limit]
+
+# ==================== QUERY CACHE ====================
+# Results of shared, rarely changing queries are kept per worker and tagged
+# with the data_version of the tables they read. Writers bump the version in
+# the same transaction, so every worker sees the change on its next request.
+
+QUERY_CACHE_MAX_ENTRIES = 256
+
+_query_cache = {}
+query_cache_stats = {'hits': 0, 'misses': 0}
+
+def count_cache_lookup(stats, hit):
+    """Add a hit or a miss to a cache's counters (request threads share them)"""
+    with _metrics_lock:
+        stats['hits' if hit else 'misses'] += 1
+
+def bump_data_version(conn, *tables):
+    """Invalidate cached results for tables; call before the write commits"""
+    conn.executemany('''
+        INSERT INTO data_version (table_name, version) VALUES (?, 1)
+        ON CONFLICT(table_name) DO UPDATE SET version = version + 1
+    ''', ((table,) for table in tables))
+    if has_app_context():
+        g.pop('data_versions', None)
+
+def data_versions(conn):
+    """Current table versions, read once per request"""
+    if 'data_versions' not in g:
+        g.data_versions = dict(conn.execute('SELECT table_name, version FROM data_version').fetchall())
+    return g.data_versions
+
+def cached_query(conn, tables, sql, params=()):
+    """fetchall() for sql, served from the cache while `tables` are unchanged"""
+    versions = data_versions(conn)
+    # date('now') results roll over daily, so the UTC date is part of the stamp
+    stamp = (datetime.now(timezone.utc).date(),) + tuple(versions.get(table, 0) for table in tables)
+    key = (sql, tuple(params))
+
+    entry = _query_cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        count_cache_lookup(query_cache_stats, True)
+        return entry[1]
+
+    count_cache_lookup(query_cache_stats, False)
+    rows = conn.execute(sql, params).fetchall()
+    if len(_query_cache) >= QUERY_CACHE_MAX_ENTRIES:
+        _query_cache.clear()
+    _query_cache[key] = (stamp, rows)
+    return rows
+
+def recent_announcements(conn):
+    """The five latest announcements shown on the dashboards and events page"""
+    return cached_query(conn, ('announcements',), '''
+        SELECT * FROM announcements 
+        ORDER BY created_at DESC 
+        LIMIT 5
+    ''')
+
+# ==================== DASHBOARD SNAPSHOTS ====================
+# The student dashboard tiles are cached per user for a short TTL. A snapshot
+# is also dropped as soon as a table it counts changes (data_version) or the
+# student's own numbers change (snapshot_version, bumped per user).
+
+DASHBOARD_SNAPSHOT_TTL = 60  # seconds
+DASHBOARD_SNAPSHOT_MAX_ENTRIES = 10000
+
+_dashboard_snapshots = {}
+dashboard_snapshot_stats = {'hits': 0, 'misses': 0}
+
+def bump_snapshot_versions(conn, user_ids_sql, params=()):
+    """Invalidate the dashboard snapshots of the users selected by user_ids_sql"""
+    conn.execute(f'''
+        INSERT INTO snapshot_version (user_id, version)
+        SELECT user_id, 1 FROM ({user_ids_sql}) WHERE true
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+    ''', params)
+
+def student_dashboard_snapshot(conn, user_id):
+    """Dashboard figures for a student, computed with one query on a miss"""
+    versions = data_versions(conn)
+    user_version = conn.execute(
+        'SELECT version FROM snapshot_version WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    stamp = (
+        datetime.now(timezone.utc).date(),
+        versions.get('assignments', 0),
+        versions.get('placement_drives', 0),
+        versions.get('events', 0),
+        user_version[0] if user_version else 0,
+    )
+
+    entry = _dashboard_snapshots.get(user_id)
+    if entry is not None and entry[0] > time.monotonic() and entry[1] == stamp:
+        count_cache_lookup(dashboard_snapshot_stats, True)
+        return entry[2]
+
+    count_cache_lookup(dashboard_snapshot_stats, False)
+    row = conn.execute('''
+        SELECT
+            s.*,
+            (SELECT COUNT(*) FROM attendance a WHERE a.student_id = s.id) as total_subjects,
+            (SELECT AVG(a.attended_classes * 100.0 / NULLIF(a.total_classes, 0))
+             FROM attendance a WHERE a.student_id = s.id) as avg_attendance,
+            (SELECT COUNT(*) FROM assignments
+             WHERE status = 'pending' AND due_date >= date('now')) as pending_assignments,
+            (SELECT COUNT(*) FROM events
+             WHERE event_date >= date('now')) as upcoming_events
+        FROM students s
+        WHERE s.user_id = ?
+    ''', (user_id,)).fetchone()
+
+    drives = eligibility_index(conn)['drives']
+    snapshot = {
+        'student': {key: row[key] for key in ('id', 'user_id', 'student_id', 'program', 'semester', 'cgpa')},
+        'attendance_summary': {
+            'total_subjects': row['total_subjects'],
+            'avg_attendance': row['avg_attendance']
+        },
+        'pending_assignments': row['pending_assignments'],
+        'eligible_drives': sum(drives[drive_id]['status'] == 'Open'
+                               for drive_id in eligible_drive_ids(conn, row['id'])),
+        'upcoming_events': row['upcoming_events']
+    }
+    if len(_dashboard_snapshots) >= DASHBOARD_SNAPSHOT_MAX_ENTRIES:
+        _dashboard_snapshots.clear()
+    _dashboard_snapshots[user_id] = (time.monotonic() + DASHBOARD_SNAPSHOT_TTL, stamp, snapshot)
+    return snapshot
+
+# ==================== CONDITIONAL GET ====================
+# Pages whose content depends only on a few versioned tables plus the
+# user's own data get a strong ETag built from those versions, so a repeat
+# view is answered with 304 Not Modified before the view runs a query.
+
+_release = None  # worked out on first use, like static_assets()
+
+def release_stamp():
+    """Changes whenever app.py, a template or the static asset build is deployed"""
+    global _release
+    if _release is None:
+        _release = os.environ.get('UMS_RELEASE') or _newest_mtime()
+    return _release
+
+def _newest_mtime():
+    paths = [os.path.abspath(__file__)]
+    for root, _, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+        paths.extend(os.path.join(root, name) for name in files)
+    # Pages embed the fingerprinted asset URLs
+    manifest = os.path.join(app.static_folder, 'dist', 'manifest.json')
+    if os.path.exists(manifest):
+        paths.append(manifest)
+    return str(max(os.path.getmtime(path) for path in paths))
+
+def view_etag(conn, tables):
+    """ETag of the current user's view of `tables` at the current URL"""
+    versions = data_versions(conn)
+    user_version = conn.execute(
+        'SELECT version FROM snapshot_version WHERE user_id = ?', (session['user_id'],)
+    ).fetchone()
+    parts = (
+        release_stamp(),
+        session['user_id'],
+        session.get('user_type'),
+        request.full_path,
+        # Queries using date('now') change with the UTC date
+        datetime.now(timezone.utc).date().isoformat(),
+        user_version[0] if user_version else 0,
+        tuple(versions.get(table, 0) for table in tables),
+    )
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def conditional(*tables):
+    """Decorator answering If-None-Match with 304 while `tables` and the user's data are unchanged.
+
+    Writers must bump_data_version() the tables and bump_snapshot_versions()
+    for user-specific rows (e.g. registrations) for this to stay correct.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Pending flash messages are shown by the next page that renders
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+            etag = view_etag(get_db_connection(), tables)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Browsers may keep the page but must revalidate it on every view
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+# ==================== STATIC ASSETS ====================
+# build_assets.py copies static/ to static/dist/ under content-hashed names
+# with gzip/brotli variants. url_for('static', ...) is pointed at those
+# files, which never change and so can be cached by browsers for good.
+
+ASSET_MANIFEST = os.path.join(app.static_folder, 'dist', 'manifest.json')
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Preferred first
+ASSET_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+VENDORED_ICONS = 'vendor/fontawesome/icons.css'
+
+def load_asset_manifest():
+    """Logical static path -> fingerprinted path, empty until build_assets.py has run"""
+    try:
+        with open(ASSET_MANIFEST) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def precompressed_variants(manifest):
+    """Fingerprinted path -> (encoding, suffix) of the variants build_assets.py wrote, preferred first"""
+    return {hashed: tuple((encoding, suffix) for encoding, suffix in ASSET_ENCODINGS
+                          if os.path.isfile(os.path.join(app.static_folder, *(hashed + suffix).split('/'))))
+            for hashed in manifest.values()}
+
+_static_assets = None  # (manifest, variants, vendored icons), read on first use
+
+def static_assets():
+    """The asset manifest, its precompressed variants and whether the vendored icons exist.
+
+    Read from disk once per process on first use (gunicorn.conf.py does it in
+    the master before forking), so importing app.py touches no files.
+    """
+    global _static_assets
+    if _static_assets is None:
+        manifest = load_asset_manifest()
+        _static_assets = (manifest, precompressed_variants(manifest),
+                          VENDORED_ICONS in manifest or os.path.exists(os.path.join(app.static_folder, VENDORED_ICONS)))
+    return _static_assets
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Point url_for('static', filename=...) at the fingerprinted build of the file"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = static_assets()[0].get(values['filename'], values['filename'])
+
+@app.context_processor
+def inject_asset_flags():
+    """base.html uses the vendored icon subset instead of the CDN once it exists"""
+    return {'vendored_icons': static_assets()[2]}
+
+def static_asset(filename):
+    """Serve static files, fingerprinted ones precompressed and with an immutable Cache-Control"""
+    if not filename.startswith('dist/'):
+        return app.send_static_file(filename)
+    for encoding, suffix in static_assets()[1].get(filename, ()):
+        if request.accept_encodings[encoding]:
+            response = send_from_directory(app.static_folder, filename + suffix, max_age=ASSET_MAX_AGE,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(app.static_folder, filename, max_age=ASSET_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+app.view_functions['static'] = static_asset
+
+# ==================== RESPONSE COMPRESSION ====================
+# Text responses are compressed with the best encoding the client accepts
+# (brotli when the module is installed, else gzip). Rendered HTML is
+# minified first. Streamed bodies (exports, static files) are compressed
+# chunk by chunk so they are never buffered whole.
+
+COMPRESS_MIN_BYTES = int(os.environ.get('UMS_COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5  # higher levels cost more CPU than they save on dynamic pages
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson',
+                      'image/svg+xml')
+MINIFY_HTML = os.environ.get('UMS_MINIFY_HTML', '1') != '0'
+# Also drop the newline and indentation around {% %} tags when rendering.
+# Off by default: it changes the text of templates that rely on that
+# whitespace (inline text, <pre> and <textarea> contents)
+TRIM_TEMPLATE_BLOCKS = os.environ.get('UMS_TRIM_TEMPLATE_BLOCKS', '0') == '1'
+
+if TRIM_TEMPLATE_BLOCKS:
+    app.jinja_env.trim_blocks = True
+    app.jinja_env.lstrip_blocks = True
+
+_response_bytes = {}  # endpoint -> [bytes rendered, bytes after minifying, bytes sent]
+
+_RAW_HTML_BLOCK = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I)
+_HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+# Line breaks and indentation right after a tag or right before one (the
+# text between raw blocks starts and ends at a tag)
+_TAG_INDENT = re.compile(r'(?:(?<=>)|^)[ \t]*\n\s*|\s*\n[ \t]*(?=<|\Z)')
+# Quoted strings are matched first so they are copied unchanged
+_CSS_TOKEN = re.compile(r'''("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')|\s*/\*.*?\*/\s*|\s*([{};,])\s*|\s+''', re.S)
+
+def minify_html(html):
+    """Drop comments and indentation between tags, and comments and spacing
+    from inline CSS.
+
+    Line breaks next to tags are kept as a single newline, so the rendered
+    page is unchanged. <pre>, <textarea> and <script> contents and CSS
+    strings are left alone.
+    """
+    parts = _RAW_HTML_BLOCK.split(html)
+    out = []
+    for i in range(0, len(parts), 3):
+        out.append(_TAG_INDENT.sub('\n', _HTML_COMMENT.sub('', parts[i])))
+        if i + 1 >= len(parts):
+            break
+        block, tag = parts[i + 1], parts[i + 2].lower()
+        if tag == 'style':
+            block = _CSS_TOKEN.sub(lambda m: m.group(1) or m.group(2) or ' ', block)
+        out.append(block)
+    return ''.join(out)
+
+def negotiate_encoding():
+    """The best content coding the client accepts, or None"""
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+
+def compress_stream(chunks, encoding, endpoint):
+    """Compress a stream chunk by chunk, flushing so each chunk reaches the client"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    original = sent = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            original += len(chunk)
+            compressed = compress(chunk) + flush()
+            sent += len(compressed)
+            yield compressed
+        compressed = finish()
+        sent += len(compressed)
+        yield compressed
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        count_response_bytes(endpoint, original, original, sent)
+
+def count_response_bytes(endpoint, rendered, minified, sent):
+    with _metrics_lock:
+        counts = _response_bytes.setdefault(endpoint, [0, 0, 0])
+        counts[0] += rendered
+        counts[1] += minified
+        counts[2] += sent
+
+@app.after_request
+def compress_response(response):
+    """Minify HTML and compress text responses the client can decode"""
+    mimetype = response.mimetype or ''
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or not mimetype.startswith(COMPRESSIBLE_TYPES)
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    response.vary.add('Accept-Encoding')
+    endpoint = request.endpoint or 'unknown'
+    encoding = negotiate_encoding()
+
+    if response.is_streamed or response.direct_passthrough:
+        if encoding is None or (response.content_length is not None
+                                and response.content_length < COMPRESS_MIN_BYTES):
+            return response
+        response.response = compress_stream(response.response, encoding, endpoint)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        rendered = len(data)
+        if MINIFY_HTML and mimetype == 'text/html':
+            data = minify_html(data.decode('utf-8')).encode('utf-8')
+        minified = len(data)
+        if encoding is not None and minified >= COMPRESS_MIN_BYTES:
+            data = compress_body(data, encoding)
+        else:
+            encoding = None
+        response.set_data(data)
+        count_response_bytes(endpoint, rendered, minified, len(data))
+        if encoding is None:
+            return response
+
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity body, so a strong
+    # validator no longer applies (If-None-Match compares weakly anyway)
+    tag, weak = response.get_etag()
+    if tag and not weak:
+        response.set_etag(tag, weak=True)
+    return response
+
+# ==================== TEMPLATE CACHE ====================
+# Compiled templates are stored on disk, so a new worker loads bytecode
+# instead of parsing each template on its first hit. precompile_templates()
+# compiles all of them up front; gunicorn.conf.py runs it in the master
+# before workers are forked, so they start with every template loaded.
+
+TEMPLATE_CACHE_DIR = os.environ.get('UMS_TEMPLATE_CACHE_DIR', 'template-cache')
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """Creates its directory on first write, so importing app.py touches no files"""
+
+    def dump_bytecode(self, bucket):
+        os.makedirs(self.directory, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+if TEMPLATE_CACHE_DIR:
+    # Cache keys don't cover Environment options, so the whitespace modes
+    # must not share files
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(
+        TEMPLATE_CACHE_DIR, pattern='__jinja2_%s.trim.cache' if TRIM_TEMPLATE_BLOCKS else '__jinja2_%s.cache')
+
+def precompile_templates():
+    """Load every template into the Jinja environment (and the bytecode cache); returns their names"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+def init_db(scale=0.0, seed=0):
+    """Initialize the database with tables and sample data (see insert_sample_data)"""
+    db_dir = os.path.dirname(app.config['DATABASE'])
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = connect_db()
     cursor = conn.cursor()
     
     # Create Users table (for both students and faculty)
@@ -42,6 +892,8 @@ def init_db():
             program TEXT NOT NULL,
             semester INTEGER NOT NULL,
             cgpa REAL DEFAULT 0.0,
+            graded_credits INTEGER DEFAULT 0,
+            grade_point_total INTEGER DEFAULT 0,
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
     ''')
@@ -52,7 +904,8 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             subject_code TEXT UNIQUE NOT NULL,
             subject_name TEXT NOT NULL,
-            credits INTEGER NOT NULL
+            credits INTEGER NOT NULL,
+            enrolled_count INTEGER DEFAULT 0
         )
     ''')
     
@@ -68,6 +921,66 @@ def init_db():
             FOREIGN KEY (subject_id) REFERENCES subjects(id)
         )
     ''')
+
+    # Create Subject Roster table (the students enrolled in each subject, with
+    # their bit position in the subject's attendance bitmaps and counters
+    # carried over from before the ledger)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subject_roster (
+            subject_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            carried_total INTEGER DEFAULT 0,
+            carried_attended INTEGER DEFAULT 0,
+            PRIMARY KEY (subject_id, position),
+            UNIQUE (subject_id, student_id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id),
+            FOREIGN KEY (student_id) REFERENCES students(id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Create Faculty Subjects table (the subjects each faculty member teaches)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_subjects (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            PRIMARY KEY (faculty_id, subject_id),
+            FOREIGN KEY (faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Create Attendance Sessions table (one row per class held, with presence
+    # packed as a bitmap over the subject roster)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject_id INTEGER NOT NULL,
+            class_date DATE NOT NULL,
+            roster_size INTEGER NOT NULL,
+            present_count INTEGER NOT NULL,
+            present BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        )
+    ''')
+    
+    # Create Grades table (one result per student per subject, with the
+    # subject's credits at the time it was graded)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS grades (
+            student_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            semester INTEGER NOT NULL,
+            grade TEXT NOT NULL,
+            grade_points INTEGER NOT NULL,
+            credits INTEGER NOT NULL,
+            graded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (student_id, subject_id),
+            FOREIGN KEY (student_id) REFERENCES students(id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        ) WITHOUT ROWID
+    ''')
     
     # Create Assignments table
     cursor.execute('''
@@ -104,7 +1017,8 @@ def init_db():
             drive_date DATE NOT NULL,
             status TEXT DEFAULT 'Open',
             min_cgpa REAL DEFAULT 0.0,
-            description TEXT
+            description TEXT,
+            capacity INTEGER  -- seats; NULL means unlimited
         )
     ''')
     
@@ -171,17 +1085,48 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
+
+    # Create Data Version table (bumped on every write to a cached table)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Create Snapshot Version table (bumped when a user's dashboard figures change)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snapshot_version (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Create CGPA Change Log table (the student each set_grade() moved, by students version)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cgpa_change_log (
+            students_version INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL
+        )
+    ''')
+
+    # Create indexes for the hot query paths
+    update_db.create_indexes(cursor)
+    # Full-text search tables, filled by their triggers from here on
+    update_db.create_search_index(cursor)
+    # A new database needs none of update_db.py's migrations
+    cursor.execute(f'PRAGMA user_version = {update_db.SCHEMA_VERSION}')
+
     conn.commit()
-    
+
     # Insert sample data
-    insert_sample_data(conn)
+    insert_sample_data(conn, scale, seed)
     
     conn.close()
     print("Database initialized successfully!")
 
-def insert_sample_data(conn):
-    """Insert sample data for testing"""
+def insert_sample_data(conn, scale=0.0, seed=0):
+    """Insert sample data for testing, plus insert_scale_data() rows when scale > 0"""
     cursor = conn.cursor()
     
     # Check if data already exists
@@ -228,6 +1173,24 @@ def insert_sample_data(conn):
         (1, 4, 42, 33),
         (1, 5, 40, 38)
     """)
+
+    # Put those students on the subject rosters, carrying their counters over
+    cursor.execute("""
+        INSERT INTO subject_roster (subject_id, position, student_id, carried_total, carried_attended)
+        SELECT subject_id,
+               ROW_NUMBER() OVER (PARTITION BY subject_id ORDER BY student_id) - 1,
+               student_id, total_classes, attended_classes
+        FROM attendance
+    """)
+
+    # Student 2 is enrolled in the same subjects, with no classes yet
+    cursor.execute("""
+        INSERT INTO subject_roster (subject_id, position, student_id)
+        SELECT id, 1, 2 FROM subjects
+    """)
+    cursor.execute("""
+        UPDATE subjects SET enrolled_count = (SELECT COUNT(*) FROM subject_roster r WHERE r.subject_id = subjects.id)
+    """)
     
     # Insert assignments
     today = datetime.now()
@@ -281,9 +1244,1559 @@ def insert_sample_data(conn):
         VALUES 
         (3, 'FAC2024001', 'Computer Science', 'Professor')
     """)
+
+    # The faculty member teaches every sample subject
+    cursor.execute("""
+        INSERT INTO faculty_subjects (faculty_id, subject_id)
+        SELECT 1, id FROM subjects
+    """)
     
     conn.commit()
 
+    if scale > 0:
+        insert_scale_data(conn, scale, seed)
+
+# ==================== SCALE DATA ====================
+# Synthetic data on top of the sample data, for benchmarking the routes at
+# realistic sizes. Row counts are SCALE_DATA_ROWS multiplied by the scale
+# factor; the same seed always produces the same rows (dates are relative
+# to the day the data is generated).
+
+SCALE_DATA_ROWS = {
+    'students': 50000,
+    'faculty': 1000,
+    'subjects': 800,
+    'companies': 300,
+    'drives': 200,
+    'drive_registrations': 100000,
+    'events': 5000,
+    'event_registrations': 100000,
+    'announcements': 200,
+}
+SCALE_SUBJECTS_PER_STUDENT = 5
+
+FIRST_NAMES = ('Aarav', 'Aisha', 'Ben', 'Chen', 'Diego', 'Elena', 'Fatima', 'George', 'Hana', 'Ivan',
+               'Jia', 'Kofi', 'Lena', 'Mateo', 'Nina', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam',
+               'Tariq', 'Uma', 'Victor', 'Wei', 'Yara', 'Zoe')
+LAST_NAMES = ('Ahmed', 'Brown', 'Costa', 'Das', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jensen',
+              'Khan', 'Lopez', 'Meyer', 'Nguyen', 'Okafor', 'Patel', 'Quinn', 'Rossi', 'Singh', 'Tanaka',
+              'Usman', 'Varga', 'Wang', 'Xu', 'Yilmaz', 'Zhang')
+PROGRAMS = ('Computer Science', 'Information Technology', 'Electronics', 'Mechanical Engineering',
+            'Civil Engineering', 'Electrical Engineering', 'Mathematics', 'Physics')
+DESIGNATIONS = ('Professor', 'Associate Professor', 'Assistant Professor', 'Lecturer')
+EVENT_TYPES = ('Technical', 'Placement', 'Competition', 'Cultural', 'Workshop', 'Sports')
+
+def insert_scale_data(conn, scale=1.0, seed=0):
+    """Add scale * SCALE_DATA_ROWS synthetic rows in a single transaction"""
+    rng = random.Random(seed)
+    counts = {table: max(1, round(rows * scale)) for table, rows in SCALE_DATA_ROWS.items()}
+    today = datetime.now().date()
+
+    def day(offset):
+        return (today + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+    def full_name():
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        next_user = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users').fetchone()[0]
+        next_student = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM students').fetchone()[0]
+        next_subject = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM subjects').fetchone()[0]
+        next_drive = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM placement_drives').fetchone()[0]
+        next_faculty = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM faculty').fetchone()[0]
+        next_event = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM events').fetchone()[0]
+
+        # Students: CGPA roughly normal around 7.2
+        students = []
+        for i in range(counts['students']):
+            name = full_name()
+            cgpa = round(min(10.0, max(4.0, rng.gauss(7.2, 1.1))), 2)
+            students.append((next_student + i, next_user + i, f'S{seed:02d}{i:07d}', name,
+                             rng.choice(PROGRAMS), rng.randint(1, 8), cgpa))
+        cursor.executemany('''
+            INSERT INTO users (id, username, password, user_type, full_name, email, created_at)
+            VALUES (?, ?, 'pass123', 'student', ?, ?, ?)
+        ''', ((user_id, roll, name, f'{roll.lower()}@university.edu', day(-30 * semester))
+              for _, user_id, roll, name, _, semester, _ in students))
+        cursor.executemany('''
+            INSERT INTO students (id, user_id, student_id, program, semester, cgpa)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((sid, user_id, roll, program, semester, cgpa)
+              for sid, user_id, roll, _, program, semester, cgpa in students))
+        next_user += counts['students']
+
+        cursor.executemany('''
+            INSERT INTO users (id, username, password, user_type, full_name, email, created_at)
+            VALUES (?, ?, 'pass123', 'faculty', ?, ?, ?)
+        ''', ((next_user + i, f'fac{seed:02d}{i:05d}', f'Dr. {full_name()}', f'fac{seed:02d}{i:05d}@university.edu',
+               day(-rng.randint(30, 3650)))
+              for i in range(counts['faculty'])))
+        cursor.executemany('''
+            INSERT INTO faculty (id, user_id, faculty_id, department, designation)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((next_faculty + i, next_user + i, f'F{seed:02d}{i:06d}', rng.choice(PROGRAMS), rng.choice(DESIGNATIONS))
+              for i in range(counts['faculty'])))
+        next_user += counts['faculty']
+
+        # Subjects are spread over the programs; each student takes a few of their program's
+        subjects_by_program = {program: [] for program in PROGRAMS}
+        subjects = []
+        for i in range(counts['subjects']):
+            program = PROGRAMS[i % len(PROGRAMS)]
+            subject_id = next_subject + i
+            subjects_by_program[program].append(subject_id)
+            subjects.append((subject_id, f'G{seed:02d}{i:04d}', f'{program} {i // len(PROGRAMS) + 1:03d}',
+                             rng.randint(2, 4)))
+        cursor.executemany('INSERT INTO subjects (id, subject_code, subject_name, credits) VALUES (?, ?, ?, ?)',
+                           subjects)
+        cursor.executemany('''
+            INSERT INTO assignments (subject_id, title, description, due_date, status)
+            VALUES (?, ?, 'Generated assignment', ?, ?)
+        ''', ((subject_id, f'Assignment {n}', day(rng.randint(-30, 30)), rng.choice(('pending', 'upcoming')))
+              for subject_id, _, _, _ in subjects for n in (1, 2)))
+
+        # Attendance counters: every subject has held a fixed number of classes,
+        # each student attends with their own probability (mostly 65-95%)
+        classes_held = {subject_id: rng.randint(30, 48) for subject_id, _, _, _ in subjects}
+        roster_size = dict.fromkeys(classes_held, 0)
+        attendance = []
+        for sid, _, _, _, program, _, _ in students:
+            pool = subjects_by_program[program]
+            diligence = rng.betavariate(8, 2)
+            for subject_id in rng.sample(pool, min(SCALE_SUBJECTS_PER_STUDENT, len(pool))):
+                total = classes_held[subject_id]
+                attended = min(total, max(0, round(total * diligence + rng.gauss(0, 2))))
+                attendance.append((sid, subject_id, total, attended, roster_size[subject_id]))
+                roster_size[subject_id] += 1
+        cursor.executemany('''
+            INSERT INTO attendance (student_id, subject_id, total_classes, attended_classes)
+            VALUES (?, ?, ?, ?)
+        ''', (row[:4] for row in attendance))
+        cursor.executemany('''
+            INSERT INTO subject_roster (subject_id, position, student_id, carried_total, carried_attended)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((subject_id, position, sid, total, attended)
+              for sid, subject_id, total, attended, position in attendance))
+        cursor.executemany('UPDATE subjects SET enrolled_count = ? WHERE id = ?',
+                           ((size, subject_id) for subject_id, size in roster_size.items()))
+        # Subjects are handed out to the faculty in turn
+        cursor.executemany('INSERT INTO faculty_subjects (faculty_id, subject_id) VALUES (?, ?)',
+                           ((next_faculty + i % counts['faculty'], subject_id)
+                            for i, (subject_id, _, _, _) in enumerate(subjects)))
+
+        cursor.executemany('''
+            INSERT INTO companies (company_name, visit_date, position, package, description)
+            VALUES (?, ?, ?, ?, 'Generated company')
+        ''', ((f'Company {i:04d}', day(rng.randint(-180, 180)), rng.choice(('Software Engineer', 'Data Analyst',
+               'Cloud Engineer', 'ML Engineer', 'QA Engineer')), f'${rng.randint(50, 150)},000')
+              for i in range(counts['companies'])))
+
+        # Drives: registrations go to students meeting the drive's CGPA cut-off
+        by_cgpa = sorted((cgpa, sid) for sid, _, _, _, _, _, cgpa in students)
+        cgpas = [cgpa for cgpa, _ in by_cgpa]
+        drives, registrations = [], []
+        per_drive = counts['drive_registrations'] // counts['drives']
+        for i in range(counts['drives']):
+            drive_id = next_drive + i
+            offset = rng.randint(-120, 120)
+            status = 'Closed' if offset < 0 else rng.choice(('Open', 'Open', 'Upcoming'))
+            min_cgpa = rng.choice((6.0, 6.5, 7.0, 7.5, 8.0))
+            drives.append((drive_id, f'Company {rng.randrange(counts["companies"]):04d}', 'Software Engineer',
+                           f'CGPA > {min_cgpa}', day(offset), status, min_cgpa))
+            eligible = by_cgpa[bisect.bisect_left(cgpas, min_cgpa):]
+            for _, sid in rng.sample(eligible, min(per_drive, len(eligible))):
+                registrations.append((sid, drive_id, day(min(offset, 0) - rng.randint(1, 30))))
+        cursor.executemany('''
+            INSERT INTO placement_drives (id, company_name, position, eligibility_criteria, drive_date, status,
+                                          min_cgpa, description)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'Generated drive')
+        ''', drives)
+        cursor.executemany('''
+            INSERT INTO drive_registrations (student_id, drive_id, registration_date)
+            VALUES (?, ?, ?)
+        ''', registrations)
+
+        event_offsets = [rng.randint(-365, 365) for _ in range(counts['events'])]
+        cursor.executemany('''
+            INSERT INTO events (id, event_name, event_type, event_date, location, description, organizer)
+            VALUES (?, ?, ?, ?, 'Campus', 'Generated event', 'Student Council')
+        ''', ((next_event + i, f'Event {i:05d}', rng.choice(EVENT_TYPES), day(offset))
+              for i, offset in enumerate(event_offsets)))
+        first_user = next_user - counts['students'] - counts['faculty']
+        per_event = counts['event_registrations'] // counts['events']
+        cursor.executemany('''
+            INSERT INTO event_registrations (user_id, event_id, registration_date) VALUES (?, ?, ?)
+        ''', ((user_id, next_event + i, day(min(offset, 0) - rng.randint(1, 30)))
+              for i, offset in enumerate(event_offsets)
+              for user_id in rng.sample(range(first_user, next_user), min(per_event, next_user - first_user))))
+
+        cursor.executemany('''
+            INSERT INTO announcements (title, content, created_at) VALUES (?, 'Generated announcement', ?)
+        ''', ((f'Announcement {i}', day(-rng.randint(0, 365)) + ' 09:00:00')
+              for i in range(counts['announcements'])))
+        # Cached queries and ETags over these tables are now stale
+        bump_data_version(conn, 'users', 'students', 'faculty', 'subjects', 'faculty_subjects', 'attendance',
+                          'assignments', 'companies', 'placement_drives', 'events', 'announcements')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return counts
+
+# ==================== ENROLLMENT ====================
+# subject_roster is the enrollment of students in subjects and
+# faculty_subjects that of faculty members. A student's roster position is
+# also their bit in the subject's attendance bitmaps, so students are only
+# ever appended. subjects.enrolled_count is kept equal to the roster size so
+# class lists and new sessions never count roster rows.
+
+def enroll_students(conn, subject_id, student_ids):
+    """Append students to a subject's roster; returns how many were newly enrolled.
+
+    Ids already on the roster, or not belonging to a student, are skipped.
+    """
+    ids_json = json.dumps(list(student_ids))
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute('''
+            INSERT INTO subject_roster (subject_id, position, student_id)
+            SELECT ?,
+                   (SELECT COALESCE(MAX(position) + 1, 0) FROM subject_roster WHERE subject_id = ?)
+                   + ROW_NUMBER() OVER (ORDER BY s.id) - 1,
+                   s.id
+            FROM students s
+            WHERE s.id IN (SELECT value FROM json_each(?))
+              AND s.id NOT IN (SELECT student_id FROM subject_roster WHERE subject_id = ?)
+        ''', (subject_id, subject_id, ids_json, subject_id))
+        added = cursor.rowcount
+        if added:
+            cursor.execute('UPDATE subjects SET enrolled_count = enrolled_count + ? WHERE id = ?',
+                           (added, subject_id))
+            # The new subject shows up on their dashboards
+            bump_snapshot_versions(conn, '''
+                SELECT user_id FROM students WHERE id IN (SELECT value FROM json_each(?))
+            ''', (ids_json,))
+            bump_data_version(conn, 'subjects', 'attendance')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return added
+
+def assign_subject(conn, faculty_id, subject_id):
+    """Record that a faculty member teaches a subject"""
+    conn.execute('INSERT OR IGNORE INTO faculty_subjects (faculty_id, subject_id) VALUES (?, ?)',
+                 (faculty_id, subject_id))
+    bump_data_version(conn, 'faculty_subjects')
+    conn.commit()
+
+def teaches(conn, user_id, subject_id):
+    """True when the faculty member logged in as user_id teaches the subject"""
+    return conn.execute('''
+        SELECT 1 FROM faculty f
+        JOIN faculty_subjects fs ON fs.faculty_id = f.id
+        WHERE f.user_id = ? AND fs.subject_id = ?
+    ''', (user_id, subject_id)).fetchone() is not None
+
+def taught_subject_ids(conn, user_id):
+    """Ids of the subjects the faculty member logged in as user_id teaches"""
+    return [row[0] for row in conn.execute('''
+        SELECT fs.subject_id FROM faculty f
+        JOIN faculty_subjects fs ON fs.faculty_id = f.id
+        WHERE f.user_id = ?
+        ORDER BY fs.subject_id
+    ''', (user_id,))]
+
+def teaches_assignment(conn, user_id, assignment_id):
+    """True when the assignment belongs to a subject the faculty member logged in as user_id teaches"""
+    return conn.execute('''
+        SELECT 1 FROM assignments a
+        JOIN faculty_subjects fs ON fs.subject_id = a.subject_id
+        JOIN faculty f ON fs.faculty_id = f.id
+        WHERE a.id = ? AND f.user_id = ?
+    ''', (assignment_id, user_id)).fetchone() is not None
+
+# ==================== ATTENDANCE LEDGER ====================
+# Every class held is one attendance_sessions row whose `present` column is
+# a bitmap over the subject roster: bit i (byte i // 8, LSB first) is set
+# when the student at subject_roster.position i was present. The attendance
+# counters are derived from these rows as they are appended.
+
+def pack_positions(positions, size):
+    """Pack roster positions into a presence bitmap of `size` bits"""
+    bitmap = bytearray((size + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return bytes(bitmap)
+
+def bit_at(bitmap, position):
+    """1 if `position` is set in the bitmap (registered as an SQL function)"""
+    byte = position >> 3
+    if bitmap is None or byte >= len(bitmap):
+        return 0
+    return (bitmap[byte] >> (position & 7)) & 1
+
+def record_attendance(conn, subject_id, present_ids, class_date=None):
+    """Append one class to the ledger and update the attendance counters.
+
+    present_ids is a set of student ids marked present; ids of students not
+    enrolled in the subject are ignored. Everything runs in one BEGIN
+    IMMEDIATE transaction; the counters are upserted from the new session's
+    bitmap by a single INSERT ... SELECT.
+    """
+    class_date = class_date or datetime.now().strftime('%Y-%m-%d')
+    present_json = json.dumps(list(present_ids))
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        roster_size = cursor.execute(
+            'SELECT COALESCE((SELECT enrolled_count FROM subjects WHERE id = ?), 0)', (subject_id,)
+        ).fetchone()[0]
+        positions = [row[0] for row in cursor.execute('''
+            SELECT position FROM subject_roster
+            WHERE subject_id = ? AND student_id IN (SELECT value FROM json_each(?))
+        ''', (subject_id, present_json))]
+
+        cursor.execute('''
+            INSERT INTO attendance_sessions (subject_id, class_date, roster_size, present_count, present)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (subject_id, class_date, roster_size, len(positions), pack_positions(positions, roster_size)))
+        session_id = cursor.lastrowid
+
+        cursor.execute('''
+            INSERT INTO attendance (student_id, subject_id, total_classes, attended_classes)
+            SELECT r.student_id, r.subject_id, 1, bit_at(ss.present, r.position)
+            FROM attendance_sessions ss
+            JOIN subject_roster r ON r.subject_id = ss.subject_id AND r.position < ss.roster_size
+            WHERE ss.id = ?
+            ON CONFLICT(student_id, subject_id) DO UPDATE SET
+                total_classes = total_classes + 1,
+                attended_classes = attended_classes + excluded.attended_classes
+        ''', (session_id,))
+
+        # Everyone on the roster has a new attendance average
+        bump_snapshot_versions(conn, '''
+            SELECT s.user_id FROM subject_roster r
+            JOIN students s ON r.student_id = s.id
+            WHERE r.subject_id = ?
+        ''', (subject_id,))
+        bump_data_version(conn, 'attendance')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return session_id
+
+def attendance_by_subject(conn, student_id, date_from=None, date_to=None):
+    """Per-subject attendance for a student, aggregated from the ledger.
+
+    Without a date range the counters carried over from before the ledger
+    are included; with one, only classes held in that range are counted.
+    Subjects with no classes in the range are left out.
+    """
+    ranged = date_from is not None or date_to is not None
+    return conn.execute('''
+        SELECT
+            sub.subject_name,
+            sub.subject_code,
+            t.total_classes,
+            t.attended_classes,
+            CAST(t.attended_classes AS FLOAT) / t.total_classes * 100 as percentage
+        FROM (
+            SELECT
+                r.subject_id,
+                (CASE WHEN ? THEN 0 ELSE r.carried_total END) + COUNT(ss.id) as total_classes,
+                (CASE WHEN ? THEN 0 ELSE r.carried_attended END)
+                    + COALESCE(SUM(bit_at(ss.present, r.position)), 0) as attended_classes
+            FROM subject_roster r
+            LEFT JOIN attendance_sessions ss
+                ON ss.subject_id = r.subject_id
+                AND ss.roster_size > r.position
+                AND ss.class_date BETWEEN ? AND ?
+            WHERE r.student_id = ?
+            GROUP BY r.subject_id
+        ) t
+        JOIN subjects sub ON t.subject_id = sub.id
+        WHERE t.total_classes > 0
+        ORDER BY percentage DESC
+    ''', (ranged, ranged, date_from or '0001-01-01', date_to or '9999-12-31', student_id)).fetchall()
+
+def missed_recent_classes(conn, subject_id, classes=3):
+    """Students on the roster who were absent from each of the last `classes` classes"""
+    sessions = conn.execute('''
+        SELECT roster_size, present FROM attendance_sessions
+        WHERE subject_id = ?
+        ORDER BY class_date DESC, id DESC
+        LIMIT ?
+    ''', (subject_id, classes)).fetchall()
+    if len(sessions) < classes:
+        return []
+
+    # Only students on the roster for all of those classes can have missed them all
+    size = min(row['roster_size'] for row in sessions)
+    attended_any = 0
+    for row in sessions:
+        attended_any |= int.from_bytes(row['present'], 'little')
+    missed = ~attended_any & ((1 << size) - 1)
+    positions = [p for p in range(size) if missed >> p & 1]
+
+    return conn.execute('''
+        SELECT s.id, s.student_id, u.full_name
+        FROM subject_roster r
+        JOIN students s ON r.student_id = s.id
+        JOIN users u ON s.user_id = u.id
+        WHERE r.subject_id = ? AND r.position IN (SELECT value FROM json_each(?))
+        ORDER BY u.full_name
+    ''', (subject_id, json.dumps(positions))).fetchall()
+
+# ==================== ATTENDANCE ANALYTICS ====================
+# Shortage figures for every student of a set of subjects at once. The
+# attendance counters of those subjects are loaded as four integer columns
+# in one query. Shortage flags and the classes needed to recover are then
+# computed over whole columns with NumPy and summed per student and per
+# subject with bincount; a plain Python loop does the same when NumPy is
+# not installed. Reports are cached per subject set until the attendance
+# data version changes.
+
+# Minimum attendance percentage a student must keep in every subject
+ATTENDANCE_THRESHOLD = int(os.environ.get('UMS_ATTENDANCE_THRESHOLD', '75'))
+SHORTAGE_LIST_SIZE = 100
+ATTENDANCE_FETCH_ROWS = 10000
+
+_attendance_reports = {}
+
+def classes_to_recover(total, attended, threshold):
+    """Consecutive classes needed to get back to `threshold` percent.
+
+    This is the smallest x with (attended + x) / (total + x) >= threshold / 100.
+    It uses integer arithmetic, so a student exactly at the threshold needs 0.
+    The result is negative for students above the threshold. Works
+    elementwise on NumPy arrays as well as on ints.
+    """
+    return -((100 * attended - threshold * total) // (100 - threshold))
+
+def _aggregate_attendance_numpy(rows, threshold):
+    columns = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64).reshape(-1, 4)
+    student_col, subject_col, total, attended = columns.T
+    needed = np.maximum(classes_to_recover(total, attended, threshold), 0)
+    short = needed > 0
+
+    def per_key(keys):
+        ids, index = np.unique(keys, return_inverse=True)
+        sums = [np.bincount(index, minlength=len(ids))]
+        sums += [np.bincount(index, weights=column, minlength=len(ids)).astype(np.int64)
+                 for column in (total, attended, short, needed)]
+        return dict(zip(ids.tolist(), zip(*(column.tolist() for column in sums))))
+
+    short_rows = zip(*(column[short].tolist() for column in (student_col, subject_col, total, attended, needed)))
+    return per_key(student_col), per_key(subject_col), list(short_rows)
+
+def _aggregate_attendance_python(rows, threshold):
+    students, subjects, short_rows = {}, {}, []
+    for student_id, subject_id, total, attended in rows:
+        needed = classes_to_recover(total, attended, threshold)
+        short = needed > 0
+        if short:
+            short_rows.append((student_id, subject_id, total, attended, needed))
+        else:
+            needed = 0
+        # Spelled out twice rather than looped: this is the hot loop without NumPy
+        entry = students.get(student_id)
+        if entry is None:
+            students[student_id] = [1, total, attended, short, needed]
+        else:
+            entry[0] += 1
+            entry[1] += total
+            entry[2] += attended
+            entry[3] += short
+            entry[4] += needed
+        entry = subjects.get(subject_id)
+        if entry is None:
+            subjects[subject_id] = [1, total, attended, short, needed]
+        else:
+            entry[0] += 1
+            entry[1] += total
+            entry[2] += attended
+            entry[3] += short
+            entry[4] += needed
+    return students, subjects, short_rows
+
+def _percentage(attended, total):
+    return attended * 100.0 / total if total else None
+
+def attendance_report(conn, subject_ids, threshold=ATTENDANCE_THRESHOLD):
+    """Students below `threshold` percent in any of `subject_ids`, worst first, plus per-subject totals"""
+    subject_ids = sorted(set(subject_ids))
+    key = (threshold, tuple(subject_ids))
+    stamp = data_versions(conn).get('attendance', 0)
+    entry = _attendance_reports.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples, no Row objects for every cell
+    cursor.execute('''
+        SELECT student_id, subject_id, COALESCE(total_classes, 0), COALESCE(attended_classes, 0)
+        FROM attendance
+        WHERE subject_id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(subject_ids),))
+    # Fetched in batches: iterating the cursor would time every row
+    rows = itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(ATTENDANCE_FETCH_ROWS), []))
+    aggregate = _aggregate_attendance_numpy if np is not None else _aggregate_attendance_python
+    students, subjects, short_rows = aggregate(rows, threshold)
+
+    # (rows, total, attended, short, needed) sums -> report entries
+    short_subjects = {}
+    for student_id, subject_id, total, attended, needed in short_rows:
+        short_subjects.setdefault(student_id, []).append({
+            'subject_id': subject_id,
+            'total_classes': total,
+            'attended_classes': attended,
+            'percentage': _percentage(attended, total),
+            'classes_needed': needed,
+        })
+    shortages = [{
+        'student_id': student_id,
+        'percentage': _percentage(students[student_id][2], students[student_id][1]),
+        'classes_needed': students[student_id][4],
+        'subjects': sorted(entries, key=lambda entry: -entry['classes_needed']),
+    } for student_id, entries in short_subjects.items()]
+    shortages.sort(key=lambda entry: (-entry['classes_needed'], entry['student_id']))
+
+    report = {
+        'threshold': threshold,
+        'students': len(students),
+        'short_students': len(shortages),
+        'subjects': sorted(({
+            'subject_id': subject_id,
+            'students': sums[0],
+            'percentage': _percentage(sums[2], sums[1]),
+            'short_students': sums[3],
+            'classes_needed': sums[4],
+        } for subject_id, sums in subjects.items()), key=lambda entry: (-entry['short_students'], entry['subject_id'])),
+        'shortages': shortages,
+    }
+    if len(_attendance_reports) >= 16:
+        _attendance_reports.clear()
+    _attendance_reports[key] = (stamp, report)
+    return report
+
+# ==================== KEYSET PAGINATION ====================
+# Long lists are paged by seeking past the last row shown instead of using
+# OFFSET, so every page costs the same. The cursor handed to the client is
+# the (sort value, tie-breaker id) of that row, base64-encoded.
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# sort key -> (sort column, unique tie-breaker column)
+STUDENT_SORTS = {
+    'name': ('u.full_name', 'u.id'),
+    'cgpa': ('s.cgpa', 's.id'),
+}
+FACULTY_SORTS = {
+    'name': ('u.full_name', 'u.id'),
+}
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(token):
+    """The [sort value, id] pair in a cursor, or None if it is missing or invalid"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != 2 or not all(map(_cursor_value_ok, values)):
+        return None
+    return values
+
+def _cursor_value_ok(value):
+    """True for a value SQLite can bind as a sort key or row id"""
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return value is None or isinstance(value, (str, float))
+
+def keyset_query(columns, from_sql, where, params, sort, descending=False, cursor=None, page_size=PAGE_SIZE):
+    """Build the SQL and parameters for one page of a keyset-paginated list"""
+    sort_column, tie_column = sort
+    conditions, params = list(where), list(params)
+    after = decode_cursor(cursor)
+    if after is not None:
+        conditions.append(f'({sort_column}, {tie_column}) {"<" if descending else ">"} (?, ?)')
+        params.extend(after)
+    direction = 'DESC' if descending else 'ASC'
+    sql = f'SELECT {columns}, {sort_column} AS sort_key, {tie_column} AS tie_key FROM {from_sql}'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {sort_column} {direction}, {tie_column} {direction} LIMIT ?'
+    # One extra row tells us whether there is a next page
+    params.append(page_size + 1)
+    return sql, params
+
+def keyset_page(conn, *args, page_size=PAGE_SIZE, **kwargs):
+    """Fetch one page; returns (rows, cursor of the next page or None)"""
+    sql, params = keyset_query(*args, page_size=page_size, **kwargs)
+    rows = conn.execute(sql, params).fetchall()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor([rows[-1]['sort_key'], rows[-1]['tie_key']])
+
+def page_size_arg(args):
+    return min(max(args.get('per_page', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+def student_list_filters(args):
+    """Search text, program, semester and CGPA filters plus sort order from the query string.
+
+    Returns the filter values (for the form and next-page links) and the
+    matching WHERE conditions and parameters.
+    """
+    filters = {
+        'q': args.get('q', '').strip() or None,
+        'program': args.get('program') or None,
+        'semester': args.get('semester', type=int),
+        'cgpa_min': args.get('cgpa_min', type=float),
+        'cgpa_max': args.get('cgpa_max', type=float),
+        'sort': args.get('sort') if args.get('sort') in STUDENT_SORTS else 'name',
+        'order': 'desc' if args.get('order') == 'desc' else 'asc',
+    }
+    where, params = [], []
+    match = fts_query(filters['q']) if filters['q'] else None
+    if match:
+        where.append('s.user_id IN (SELECT rowid FROM people_search WHERE people_search MATCH ?)')
+        params.append(match)
+    if filters['program']:
+        where.append('s.program = ?')
+        params.append(filters['program'])
+    if filters['semester'] is not None:
+        where.append('s.semester = ?')
+        params.append(filters['semester'])
+    if filters['cgpa_min'] is not None:
+        where.append('s.cgpa >= ?')
+        params.append(filters['cgpa_min'])
+    if filters['cgpa_max'] is not None:
+        where.append('s.cgpa <= ?')
+        params.append(filters['cgpa_max'])
+    return filters, where, params
+
+def student_programs(conn):
+    """Distinct programs for the filter dropdowns"""
+    return [row['program'] for row in cached_query(conn, ('students',), '''
+        SELECT DISTINCT program FROM students ORDER BY program
+    ''')]
+
+def render_list_page(page_template, rows_template, next_cursor, **context):
+    """Render the whole list page, or only its rows for a "load more" request"""
+    if request.args.get('partial'):
+        response = make_response(render_template(rows_template, **context))
+        response.headers['X-Next-Cursor'] = next_cursor or ''
+        return response
+    return render_template(page_template, next_cursor=next_cursor, **context)
+
+# ==================== SEARCH ====================
+# Full-text search over the FTS5 tables created by update_db.SEARCH_SCHEMA.
+# Every word of the query must match, the last one as a prefix so results
+# follow the user's typing, and results are ordered by each table's stored
+# bm25 weights (rank).
+
+SEARCH_PAGE_SIZE = 20
+SUGGESTION_LIMIT = 5
+# People are ranked among their first matches in rowid order only. A short
+# prefix such as "S0" matches nearly every roll number, and ranking all of
+# those with bm25 takes a large-dataset admin search from ~14 ms to ~130 ms
+# at p95, so a better match beyond the first SEARCH_CANDIDATES can be
+# missed until the user types more. The other kinds are small enough to
+# rank every match.
+SEARCH_CANDIDATES = 2000
+SUGGESTION_CANDIDATES = 200
+SEARCH_WORD = re.compile(r'\w+')
+
+# kind -> (user types allowed to search it, query taking the :match
+# expression, the number of people matches to rank (:candidates, -1 for all)
+# and a :limit)
+SEARCH_KINDS = {
+    'people': (('admin',), '''
+        SELECT m.rowid AS id, m.full_name AS label, m.code, m.program, m.user_type
+        FROM (SELECT rowid, rank, full_name, code, program, user_type FROM people_search
+              WHERE people_search MATCH :match LIMIT :candidates) m
+        ORDER BY m.rank
+        LIMIT :limit
+    '''),
+    'events': (('admin', 'faculty', 'student'), '''
+        SELECT e.id, e.event_name AS label, e.event_type, e.event_date, e.location
+        FROM (SELECT rowid, rank FROM events_search WHERE events_search MATCH :match
+              ORDER BY rank LIMIT :limit) m
+        JOIN events e ON e.id = m.rowid
+        ORDER BY m.rank
+    '''),
+    'drives': (('admin', 'student'), '''
+        SELECT d.id, d.company_name || ' - ' || d.position AS label, d.drive_date, d.status
+        FROM (SELECT rowid, rank FROM drives_search WHERE drives_search MATCH :match
+              ORDER BY rank LIMIT :limit) m
+        JOIN placement_drives d ON d.id = m.rowid
+        ORDER BY m.rank
+    '''),
+    'announcements': (('admin', 'faculty', 'student'), '''
+        SELECT a.id, a.title AS label, m.excerpt, a.created_at
+        FROM (SELECT rowid, rank, snippet(announcements_search, 1, '', '', '...', 16) AS excerpt
+              FROM announcements_search WHERE announcements_search MATCH :match
+              ORDER BY rank LIMIT :limit) m
+        JOIN announcements a ON a.id = m.rowid
+        ORDER BY m.rank
+    '''),
+}
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text, or None when it has no words"""
+    words = SEARCH_WORD.findall(text)[:10]
+    if not words:
+        return None
+    # Quoted so words like AND/NOT are not operators
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def search_records(conn, text, user_type, limit=SEARCH_PAGE_SIZE, candidates=SEARCH_CANDIDATES):
+    """kind -> best matching rows of each kind `user_type` may search.
+
+    People are ranked among their first `candidates` matches (in rowid
+    order; -1 ranks them all), every other kind among all of its matches.
+    """
+    match = fts_query(text)
+    params = {'match': match, 'candidates': candidates, 'limit': limit}
+    return {kind: conn.execute(sql, params).fetchall() if match else []
+            for kind, (user_types, sql) in SEARCH_KINDS.items() if user_type in user_types}
+
+# ==================== DATA EXPORT ====================
+# Exports are streamed straight from a database cursor a batch at a time, so
+# memory use does not grow with the number of rows exported.
+
+EXPORT_BATCH_ROWS = 500
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# dataset -> (user types allowed to export it, SELECT without WHERE/ORDER BY, ORDER BY)
+EXPORT_DATASETS = {
+    'students': (('admin', 'faculty'), '''
+        SELECT s.student_id, u.username, u.full_name, u.email,
+               s.program, s.semester, s.cgpa
+        FROM students s
+        JOIN users u ON s.user_id = u.id
+    ''', 's.id'),
+    'attendance': (('admin', 'faculty'), '''
+        SELECT sub.subject_code, sub.subject_name, s.student_id, u.full_name,
+               a.total_classes, a.attended_classes,
+               ROUND(a.attended_classes * 100.0 / NULLIF(a.total_classes, 0), 2) AS percentage
+        FROM attendance a
+        JOIN subjects sub ON a.subject_id = sub.id
+        JOIN students s ON a.student_id = s.id
+        JOIN users u ON s.user_id = u.id
+    ''', 'a.subject_id, a.student_id'),
+    'drive_registrations': (('admin',), '''
+        SELECT d.company_name, d.position, d.drive_date, s.student_id, u.full_name,
+               s.cgpa, r.registration_date, r.status
+        FROM drive_registrations r
+        JOIN placement_drives d ON r.drive_id = d.id
+        JOIN students s ON r.student_id = s.id
+        JOIN users u ON s.user_id = u.id
+    ''', 'r.drive_id, r.id'),
+    'event_registrations': (('admin',), '''
+        SELECT e.event_name, e.event_date, u.username, u.full_name, u.user_type,
+               r.registration_date, r.status
+        FROM event_registrations r
+        JOIN events e ON r.event_id = e.id
+        JOIN users u ON r.user_id = u.id
+    ''', 'r.event_id, r.id'),
+}
+
+def export_query(dataset, args, subject_ids=None):
+    """SQL and parameters for an export, narrowed by the optional query-string filters.
+
+    With `subject_ids` (a faculty member's subjects) students and attendance
+    are limited to the rosters of those subjects.
+    """
+    _, select_sql, order_by = EXPORT_DATASETS[dataset]
+    where, params = [], []
+    if dataset == 'students':
+        _, where, params = student_list_filters(args)
+        if subject_ids is not None:
+            where.append('s.id IN (SELECT student_id FROM subject_roster'
+                         ' WHERE subject_id IN (SELECT value FROM json_each(?)))')
+            params.append(json.dumps(subject_ids))
+    elif dataset == 'attendance':
+        if args.get('subject_id', type=int) is not None:
+            where.append('a.subject_id = ?')
+            params.append(args.get('subject_id', type=int))
+        if subject_ids is not None:
+            where.append('a.subject_id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(subject_ids))
+    elif dataset == 'drive_registrations' and args.get('drive_id', type=int) is not None:
+        where.append('r.drive_id = ?')
+        params.append(args.get('drive_id', type=int))
+    elif dataset == 'event_registrations' and args.get('event_id', type=int) is not None:
+        where.append('r.event_id = ?')
+        params.append(args.get('event_id', type=int))
+    sql = select_sql
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return sql + f' ORDER BY {order_by}', params
+
+def export_chunks(sql, params, fmt):
+    """Yield the encoded export a batch of rows at a time.
+
+    Uses its own connection because the generator keeps running after the
+    view has returned and the request's connection has gone back to the pool.
+    """
+    conn = _checkout_connection()
+    cursor = None
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row))) + '\n')
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if fmt == 'csv' and buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        if cursor is not None:
+            cursor.close()
+        _release_connection(conn)
+
+# ==================== BULK USER IMPORT ====================
+# CSV rows are validated against the existing usernames and IDs in memory,
+# then written in batches with one executemany() per table.
+
+IMPORT_BATCH_ROWS = 5000
+IMPORT_MAX_ERRORS = 1000  # errors kept for the report; all of them are counted
+
+IMPORT_REQUIRED_FIELDS = {
+    'student': ('username', 'password', 'full_name', 'student_id', 'program', 'semester'),
+    'faculty': ('username', 'password', 'full_name', 'faculty_id', 'department', 'designation'),
+}
+
+def import_users(conn, rows):
+    """Import users from an iterable of CSV dicts (as produced by csv.DictReader).
+
+    Each row needs user_type ('student' or 'faculty') plus the fields in
+    IMPORT_REQUIRED_FIELDS; email is optional. Invalid rows are reported and
+    skipped, every other row is imported. Returns a report dict with the
+    imported count, the error count and up to IMPORT_MAX_ERRORS
+    (line number, message) pairs.
+    """
+    usernames = {row[0] for row in conn.execute('SELECT username FROM users')}
+    student_ids = {row[0] for row in conn.execute('SELECT student_id FROM students')}
+    faculty_ids = {row[0] for row in conn.execute('SELECT faculty_id FROM faculty')}
+    report = {'imported': 0, 'error_count': 0, 'errors': []}
+
+    def error(line, message):
+        report['error_count'] += 1
+        if len(report['errors']) < IMPORT_MAX_ERRORS:
+            report['errors'].append((line, message))
+
+    batch = []
+    # Line 1 is the header
+    for line, row in enumerate(rows, start=2):
+        row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        user_type = row.get('user_type', '').lower()
+        if user_type not in IMPORT_REQUIRED_FIELDS:
+            error(line, f"user_type must be 'student' or 'faculty', got {row.get('user_type')!r}")
+            continue
+        missing = [field for field in IMPORT_REQUIRED_FIELDS[user_type] if not row.get(field)]
+        if missing:
+            error(line, f"missing {', '.join(missing)}")
+            continue
+        if row['username'] in usernames:
+            error(line, f"username {row['username']} already exists")
+            continue
+        if user_type == 'student':
+            if row['student_id'] in student_ids:
+                error(line, f"student_id {row['student_id']} already exists")
+                continue
+            try:
+                row['semester'] = int(row['semester'])
+            except ValueError:
+                error(line, f"semester must be a number, got {row['semester']!r}")
+                continue
+            student_ids.add(row['student_id'])
+        elif row['faculty_id'] in faculty_ids:
+            error(line, f"faculty_id {row['faculty_id']} already exists")
+            continue
+        else:
+            faculty_ids.add(row['faculty_id'])
+        usernames.add(row['username'])
+        row['user_type'] = user_type
+        row['line'] = line
+        batch.append(row)
+
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            _write_import_batch(conn, batch, report, error)
+            batch = []
+    if batch:
+        _write_import_batch(conn, batch, report, error)
+    return report
+
+def _write_import_batch(conn, batch, report, error):
+    """Insert one validated batch in a single transaction.
+
+    User ids are assigned up front from MAX(id) under the write lock, so the
+    students/faculty rows can reference them without a lastrowid per row.
+    If the batch still fails (e.g. a concurrent insert took a username) it
+    is retried row by row so only the offending rows are rejected.
+    """
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users').fetchone()[0]
+        _insert_import_rows(conn, batch, first_id)
+        conn.commit()
+        report['imported'] += len(batch)
+        return
+    except sqlite3.IntegrityError:
+        conn.rollback()
+
+    for row in batch:
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users').fetchone()[0]
+            _insert_import_rows(conn, [row], first_id)
+            conn.commit()
+            report['imported'] += 1
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            error(row['line'], str(e))
+
+def _insert_import_rows(conn, rows, first_id):
+    conn.executemany('''
+        INSERT INTO users (id, username, password, user_type, full_name, email)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ((first_id + i, row['username'], row['password'], row['user_type'], row['full_name'], row.get('email') or None)
+          for i, row in enumerate(rows)))
+    students = [(first_id + i, row['student_id'], row['program'], row['semester'])
+                for i, row in enumerate(rows) if row['user_type'] == 'student']
+    faculty = [(first_id + i, row['faculty_id'], row['department'], row['designation'])
+               for i, row in enumerate(rows) if row['user_type'] == 'faculty']
+    if students:
+        conn.executemany('INSERT INTO students (user_id, student_id, program, semester) VALUES (?, ?, ?, ?)', students)
+        bump_data_version(conn, 'students')
+    if faculty:
+        conn.executemany('INSERT INTO faculty (user_id, faculty_id, department, designation) VALUES (?, ?, ?, ?)', faculty)
+        bump_data_version(conn, 'faculty')
+
+# ==================== GRADES AND CGPA ====================
+# Every grade is stored with its subject's credits at the time it was given.
+# students.graded_credits and students.grade_point_total are the running
+# sums of credits and credits * grade points, so changing one grade moves a
+# student's CGPA by the difference alone. Publishing a semester's results
+# recomputes the sums of every affected student in one set-based UPDATE.
+# Students without any grades keep the CGPA they were created with.
+
+# 10-point scale
+GRADE_POINTS = {'O': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 'C': 5, 'P': 4, 'F': 0}
+RESULTS_REQUIRED_FIELDS = ('student_id', 'subject_code', 'grade')
+# Single-grade changes kept for workers whose eligibility index is behind;
+# one further behind rebuilds it
+CGPA_CHANGE_LOG_ROWS = 1000
+
+def set_grade(conn, student_id, subject_id, grade, semester):
+    """Record one grade and move the student's CGPA by the change.
+
+    Returns the new CGPA, or None when the student or subject does not
+    exist. The grade must be a key of GRADE_POINTS.
+    """
+    points = GRADE_POINTS[grade]
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        subject = cursor.execute('SELECT credits FROM subjects WHERE id = ?', (subject_id,)).fetchone()
+        old = cursor.execute('''
+            SELECT credits, grade_points FROM grades WHERE student_id = ? AND subject_id = ?
+        ''', (student_id, subject_id)).fetchone()
+        student = None
+        if subject is not None:
+            credit_change = subject['credits'] - (old['credits'] if old else 0)
+            point_change = subject['credits'] * points - (old['credits'] * old['grade_points'] if old else 0)
+            # The right-hand sides see the old sums
+            student = cursor.execute('''
+                UPDATE students SET
+                    graded_credits = graded_credits + ?,
+                    grade_point_total = grade_point_total + ?,
+                    cgpa = COALESCE(ROUND((grade_point_total + ?) * 1.0 / NULLIF(graded_credits + ?, 0), 2), cgpa)
+                WHERE id = ?
+                RETURNING user_id, cgpa
+            ''', (credit_change, point_change, point_change, credit_change, student_id)).fetchone()
+        if student is None:
+            conn.rollback()
+            return None
+
+        cursor.execute('''
+            INSERT INTO grades (student_id, subject_id, semester, grade, grade_points, credits)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(student_id, subject_id) DO UPDATE SET
+                semester = excluded.semester,
+                grade = excluded.grade,
+                grade_points = excluded.grade_points,
+                credits = excluded.credits,
+                graded_at = CURRENT_TIMESTAMP
+        ''', (student_id, subject_id, semester, grade, points, subject['credits']))
+
+        # Eligible drive counts on the dashboard follow the CGPA
+        bump_snapshot_versions(conn, 'SELECT ? AS user_id', (student['user_id'],))
+        bump_data_version(conn, 'grades', 'students')
+        # Lets eligibility_index() move this one student instead of rebuilding
+        cursor.execute('''
+            INSERT INTO cgpa_change_log (students_version, student_id)
+            SELECT version, ? FROM data_version WHERE table_name = 'students'
+        ''', (student_id,))
+        cursor.execute('''
+            DELETE FROM cgpa_change_log
+            WHERE students_version <= (SELECT version FROM data_version WHERE table_name = 'students') - ?
+        ''', (CGPA_CHANGE_LOG_ROWS,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return student['cgpa']
+
+def publish_results(conn, semester, rows):
+    """Publish a semester's grades from an iterable of CSV dicts and recompute
+    the CGPA of every student in them, all in one transaction.
+
+    Each row needs the fields in RESULTS_REQUIRED_FIELDS: the student's roll
+    number, the subject code and a GRADE_POINTS grade. Invalid rows are
+    reported and skipped. Returns a report dict with the published and
+    student counts, the error count and up to IMPORT_MAX_ERRORS
+    (line number, message) pairs.
+    """
+    students = dict(conn.execute('SELECT student_id, id FROM students'))
+    subjects = {row['subject_code']: (row['id'], row['credits'])
+                for row in conn.execute('SELECT id, subject_code, credits FROM subjects')}
+    report = {'published': 0, 'students': 0, 'error_count': 0, 'errors': []}
+
+    def error(line, message):
+        report['error_count'] += 1
+        if len(report['errors']) < IMPORT_MAX_ERRORS:
+            report['errors'].append((line, message))
+
+    # Later rows for the same student and subject replace earlier ones
+    grades = {}
+    for line, row in enumerate(rows, start=2):
+        row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        missing = [field for field in RESULTS_REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            error(line, f"missing {', '.join(missing)}")
+            continue
+        student_id = students.get(row['student_id'])
+        if student_id is None:
+            error(line, f"unknown student_id {row['student_id']}")
+            continue
+        subject = subjects.get(row['subject_code'])
+        if subject is None:
+            error(line, f"unknown subject_code {row['subject_code']}")
+            continue
+        grade = row['grade'].upper()
+        if grade not in GRADE_POINTS:
+            error(line, f"grade must be one of {', '.join(GRADE_POINTS)}, got {row['grade']!r}")
+            continue
+        grades[student_id, subject[0]] = (semester, grade, GRADE_POINTS[grade], subject[1])
+    if not grades:
+        return report
+
+    affected = json.dumps(sorted({student_id for student_id, _ in grades}))
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.executemany('''
+            INSERT INTO grades (student_id, subject_id, semester, grade, grade_points, credits)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(student_id, subject_id) DO UPDATE SET
+                semester = excluded.semester,
+                grade = excluded.grade,
+                grade_points = excluded.grade_points,
+                credits = excluded.credits,
+                graded_at = CURRENT_TIMESTAMP
+        ''', (key + value for key, value in grades.items()))
+        cursor.execute('''
+            UPDATE students SET (graded_credits, grade_point_total, cgpa) = (
+                SELECT SUM(g.credits), SUM(g.credits * g.grade_points),
+                       COALESCE(ROUND(SUM(g.credits * g.grade_points) * 1.0 / NULLIF(SUM(g.credits), 0), 2),
+                                students.cgpa)
+                FROM grades g
+                WHERE g.student_id = students.id
+            )
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (affected,))
+        report['students'] = cursor.rowcount
+        bump_snapshot_versions(conn, '''
+            SELECT user_id FROM students WHERE id IN (SELECT value FROM json_each(?))
+        ''', (affected,))
+        bump_data_version(conn, 'grades', 'students')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    report['published'] = len(grades)
+    return report
+
+def student_grades(conn, student_id):
+    """A student's grades, latest semester first"""
+    return conn.execute('''
+        SELECT g.subject_id, g.semester, g.grade, g.grade_points, g.credits,
+               sub.subject_code, sub.subject_name
+        FROM grades g
+        JOIN subjects sub ON g.subject_id = sub.id
+        WHERE g.student_id = ?
+        ORDER BY g.semester DESC, sub.subject_code
+    ''', (student_id,)).fetchall()
+
+# ==================== DRIVE REGISTRATION ====================
+# A drive with a capacity takes registrations until its seats are gone;
+# later applicants are waitlisted in application order (registration id)
+# and promoted automatically when a registered student withdraws. Each
+# change is one BEGIN IMMEDIATE transaction, so concurrent applicants are
+# serialized by SQLite and a drive can never be overbooked.
+
+def register_for_drive(conn, student_id, drive_id):
+    """Apply to an open drive; returns 'Registered', 'Waitlisted', or None if the
+    student had already applied or the drive is not open"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # The seat check and the insert are one statement, and a repeat
+        # application is a no-op instead of a UNIQUE error
+        rows = conn.execute('''
+            INSERT INTO drive_registrations (student_id, drive_id, status)
+            SELECT ?, d.id,
+                   CASE WHEN d.capacity IS NULL
+                          OR d.capacity > (SELECT COUNT(*) FROM drive_registrations r
+                                           WHERE r.drive_id = d.id AND r.status = 'Registered')
+                        THEN 'Registered' ELSE 'Waitlisted' END
+            FROM placement_drives d
+            WHERE d.id = ? AND d.status = 'Open'
+            ON CONFLICT(student_id, drive_id) DO NOTHING
+            RETURNING status
+        ''', (student_id, drive_id)).fetchall()
+        if rows:
+            bump_data_version(conn, 'drive_registrations')
+            bump_snapshot_versions(conn, 'SELECT user_id FROM students WHERE id = ?', (student_id,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows[0]['status'] if rows else None
+
+def withdraw_from_drive(conn, student_id, drive_id):
+    """Cancel an application, giving a freed seat to the waitlist; returns the
+    cancelled registration's status, or None if there was none"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        rows = conn.execute('''
+            DELETE FROM drive_registrations
+            WHERE student_id = ? AND drive_id = ?
+            RETURNING status
+        ''', (student_id, drive_id)).fetchall()
+        if rows:
+            promoted = promote_waitlist(conn, drive_id)
+            bump_data_version(conn, 'drive_registrations')
+            bump_snapshot_versions(conn, '''
+                SELECT user_id FROM students WHERE id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps([student_id] + promoted),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows[0]['status'] if rows else None
+
+def promote_waitlist(conn, drive_id):
+    """Register waitlisted students, first come first served, into the drive's free
+    seats; returns their student ids. Runs in the caller's write transaction."""
+    # LIMIT -1 (no capacity) promotes everyone
+    return [row['student_id'] for row in conn.execute('''
+        UPDATE drive_registrations SET status = 'Registered'
+        WHERE id IN (
+            SELECT w.id FROM drive_registrations w
+            WHERE w.drive_id = ? AND w.status = 'Waitlisted'
+            ORDER BY w.id
+            LIMIT (SELECT COALESCE(MAX(d.capacity - (SELECT COUNT(*) FROM drive_registrations r
+                                                     WHERE r.drive_id = d.id AND r.status = 'Registered'), 0), -1)
+                   FROM placement_drives d WHERE d.id = ?)
+        )
+        RETURNING student_id
+    ''', (drive_id, drive_id)).fetchall()]
+
+# ==================== PLACEMENT ELIGIBILITY ====================
+# Each drive's eligibility_criteria text is split into clauses and parsed
+# into rules:
+# - a minimum CGPA: the larger of the min_cgpa column and any "CGPA > x"
+#   ("CGPA: x", "x+ CGPA", ...) clause, inclusive like the column
+# - "No backlogs": no F grade on record
+# - the programs the text names
+# - a minimum semester
+# Clauses that cannot be checked, such as "Python/Java", are kept as notes
+# and never make a student ineligible.
+#
+# Students are indexed by CGPA, and drives by their minimum CGPA. The
+# students eligible for a drive are therefore a bisect plus a filter over
+# the other rules, and so are the drives a student is eligible for. The
+# index is rebuilt when students, grades or drives change, except that the
+# students set_grade() changed (logged in cgpa_change_log) are moved in a
+# copy of it: one grade costs a seek and a list insert, not a rebuild.
+
+# "CGPA > 7", "CGPA: 7.0", "Minimum CGPA of 7", "GPA at least 7"
+CGPA_RULE = re.compile(
+    r'\bc?gpa\s*[:=]?\s*(?:>=|≥|>|of at least|at least|of|above|over|min(?:imum)?)?\s*(\d+(?:\.\d+)?)', re.I)
+# "7.5+ CGPA", "7 CGPA and above"
+CGPA_FIRST_RULE = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?)\s*\+?\s*c?gpa\b', re.I)
+BACKLOG_RULE = re.compile(r'\bno\s+(?:active\s+|pending\s+)?backlogs?\b', re.I)
+SEMESTER_RULE = re.compile(r'\bsem(?:ester)?\s*(>=|≥|>)\s*(\d+)', re.I)
+OPEN_TO_ALL = re.compile(r'^(?:all|any|none|open to all(?: students)?)$', re.I)
+
+_eligibility = {}  # 'index' -> the current eligibility_index()
+
+def parse_eligibility(criteria, min_cgpa=0.0, programs=()):
+    """Rules for a drive from its eligibility text; `programs` are the program
+    names a clause may restrict the drive to"""
+    rules = {'min_cgpa': min_cgpa or 0.0, 'no_backlogs': False, 'programs': set(), 'min_semester': 0,
+             'notes': []}
+    for clause in re.split(r'[,;\n]', criteria or ''):
+        clause = clause.strip()
+        if not clause or OPEN_TO_ALL.match(clause):
+            continue
+        cgpa = CGPA_RULE.search(clause) or CGPA_FIRST_RULE.search(clause)
+        semester = SEMESTER_RULE.search(clause)
+        named = {program for program in programs if program.lower() in clause.lower()}
+        if cgpa:
+            rules['min_cgpa'] = max(rules['min_cgpa'], float(cgpa.group(1)))
+        elif BACKLOG_RULE.search(clause):
+            rules['no_backlogs'] = True
+        elif semester:
+            rules['min_semester'] = max(rules['min_semester'],
+                                        int(semester.group(2)) + (semester.group(1) == '>'))
+        elif named:
+            rules['programs'] |= named
+        else:
+            rules['notes'].append(clause)
+    return rules
+
+def eligibility_index(conn):
+    """Students sorted by CGPA and every drive's parsed rules sorted by minimum CGPA"""
+    versions = data_versions(conn)
+    stamp = tuple(versions.get(table, 0) for table in ('students', 'grades', 'placement_drives'))
+    index = _eligibility.get('index')
+    if index is not None and index['stamp'] == stamp:
+        return index
+    if index is not None:
+        changed = _cgpa_changes(conn, index['stamp'], stamp)
+        if changed is not None:
+            index = _move_students(conn, index, changed, stamp)
+            _eligibility['index'] = index
+            return index
+
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    # (id, cgpa, program, semester, has a backlog)
+    students = cursor.execute('''
+        SELECT s.id, COALESCE(s.cgpa, 0.0), s.program, s.semester,
+               EXISTS (SELECT 1 FROM grades g WHERE g.student_id = s.id AND g.grade_points = 0)
+        FROM students s
+        ORDER BY s.cgpa, s.id
+    ''').fetchall()
+    programs = {student[2] for student in students}
+    drives = []
+    for row in conn.execute('SELECT id, eligibility_criteria, min_cgpa, status FROM placement_drives'):
+        rules = parse_eligibility(row['eligibility_criteria'], row['min_cgpa'], programs)
+        rules.update(id=row['id'], status=row['status'])
+        drives.append(rules)
+    drives.sort(key=lambda rules: rules['min_cgpa'])
+
+    index = {
+        'stamp': stamp,
+        'students': students,
+        'cgpas': [student[1] for student in students],
+        'by_id': {student[0]: student for student in students},
+        'drives': {rules['id']: rules for rules in drives},
+        'drive_order': [rules['id'] for rules in drives],
+        'drive_cgpas': [rules['min_cgpa'] for rules in drives],
+        'by_student': {},  # student id -> eligible drive ids, filled on first use
+    }
+    # Swapped in whole so a concurrent reader never sees a half-built index
+    _eligibility['index'] = index
+    return index
+
+def _cgpa_changes(conn, old_stamp, stamp):
+    """Ids of the students set_grade() changed between two index stamps, or None
+    when anything else wrote students, grades or drives in between"""
+    (old_students, old_grades, old_drives), (students, grades, drives) = old_stamp, stamp
+    steps = students - old_students
+    # set_grade() bumps students and grades once each and logs every bump
+    if drives != old_drives or steps <= 0 or grades - old_grades != steps:
+        return None
+    rows = conn.execute('''
+        SELECT student_id FROM cgpa_change_log WHERE students_version > ? AND students_version <= ?
+    ''', (old_students, students)).fetchall()
+    if len(rows) != steps:
+        return None
+    return {row[0] for row in rows}
+
+def _move_students(conn, index, student_ids, stamp):
+    """A copy of index with the given students re-read and re-sorted by CGPA"""
+    students = list(index['students'])
+    cgpas = list(index['cgpas'])
+    by_id = dict(index['by_id'])
+    by_student = dict(index['by_student'])
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    fresh = cursor.execute('''
+        SELECT s.id, COALESCE(s.cgpa, 0.0), s.program, s.semester,
+               EXISTS (SELECT 1 FROM grades g WHERE g.student_id = s.id AND g.grade_points = 0)
+        FROM students s
+        WHERE s.id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(sorted(student_ids)),)).fetchall()
+    for student_id in student_ids:
+        old = by_id.pop(student_id, None)
+        by_student.pop(student_id, None)
+        if old is not None:
+            position = students.index(old, bisect.bisect_left(cgpas, old[1]), bisect.bisect_right(cgpas, old[1]))
+            del students[position], cgpas[position]
+    for student in fresh:
+        # Same order as the rebuild's ORDER BY s.cgpa, s.id
+        position = bisect.bisect_left(students, student[0], bisect.bisect_left(cgpas, student[1]),
+                                      bisect.bisect_right(cgpas, student[1]), key=lambda other: other[0])
+        students.insert(position, student)
+        cgpas.insert(position, student[1])
+        by_id[student[0]] = student
+    return dict(index, stamp=stamp, students=students, cgpas=cgpas, by_id=by_id, by_student=by_student)
+
+def _meets_rules(rules, student):
+    """Every rule but the minimum CGPA, which the bisect has already applied"""
+    return ((not rules['no_backlogs'] or not student[4])
+            and (not rules['programs'] or student[2] in rules['programs'])
+            and student[3] >= rules['min_semester'])
+
+def _only_cgpa_rule(rules):
+    return not rules['no_backlogs'] and not rules['programs'] and not rules['min_semester']
+
+def eligible_students(conn, drive_id):
+    """Ids of the students eligible for a drive, lowest CGPA first"""
+    index = eligibility_index(conn)
+    rules = index['drives'].get(drive_id)
+    if rules is None:
+        return []
+    start = bisect.bisect_left(index['cgpas'], rules['min_cgpa'])
+    return [student[0] for student in index['students'][start:] if _meets_rules(rules, student)]
+
+def eligible_counts(conn):
+    """Number of eligible students for every drive, by drive id"""
+    index = eligibility_index(conn)
+    counts = {}
+    for drive_id, rules in index['drives'].items():
+        start = bisect.bisect_left(index['cgpas'], rules['min_cgpa'])
+        if _only_cgpa_rule(rules):
+            counts[drive_id] = len(index['students']) - start
+        else:
+            counts[drive_id] = sum(1 for student in index['students'][start:] if _meets_rules(rules, student))
+    return counts
+
+def eligible_drive_ids(conn, student_id):
+    """Ids of the drives (any status) a student is eligible for"""
+    index = eligibility_index(conn)
+    drive_ids = index['by_student'].get(student_id)
+    if drive_ids is None:
+        student = index['by_id'].get(student_id)
+        if student is None:
+            return []
+        end = bisect.bisect_right(index['drive_cgpas'], student[1])
+        drive_ids = [drive_id for drive_id in index['drive_order'][:end]
+                     if _meets_rules(index['drives'][drive_id], student)]
+        index['by_student'][student_id] = drive_ids
+    return drive_ids
+
+# ==================== EVENT REGISTRATION QUEUE ====================
+# Event registrations are write-behind: a request checks the registration
+# against this worker's in-memory sets of registered users, queues it and
+# is answered at once, while a background thread writes queued rows in
+# grouped transactions (every EVENT_FLUSH_SECONDS or EVENT_FLUSH_ROWS rows),
+# so a burst costs one commit per batch instead of one per click.
+#
+# Each event's set is loaded with one index seek the first time the event
+# is registered for, and all of them are dropped when the events data
+# version moves, so events deleted (with their registrations) by any
+# worker are seen. The UNIQUE constraint still settles duplicates between
+# workers, and rows for an event deleted while queued are not written.
+#
+# Queued rows are written before the worker exits (gunicorn.conf.py
+# worker_exit, atexit); only a crash loses them, at most one flush
+# interval's worth. A batch that still fails after EVENT_WRITE_RETRIES
+# attempts is written row by row and the rows that fail on their own are
+# logged and dropped, so shutdown never hangs. A writer thread that died is
+# restarted by the next registration, and the queue is drained at exit.
+
+EVENT_WRITE_BEHIND = os.environ.get('UMS_EVENT_WRITE_BEHIND', '1') != '0'
+EVENT_FLUSH_SECONDS = float(os.environ.get('UMS_EVENT_FLUSH_MS', '5')) / 1000
+EVENT_FLUSH_ROWS = 500
+EVENT_WRITE_RETRIES = 3
+
+event_writer_log = logging.getLogger('ums.event_writer')
+
+_event_lock = threading.Condition()
+_event_registered = {}            # event_id -> {user_id} of this worker, loaded per event on first use
+_event_registered_stamp = None    # events data version the sets were loaded at
+_event_pending = {}               # user_id -> queued rows not yet committed
+_event_queue = queue.Queue()
+_event_writer = None
+_event_pid = None
+
+def queue_event_registration(conn, user_id, event_id):
+    """Queue a registration; False if the user is already registered, None if the event does not exist"""
+    global _event_registered_stamp, _event_writer, _event_pid
+    stamp = data_versions(conn).get('events', 0)
+    if conn.execute('SELECT 1 FROM events WHERE id = ?', (event_id,)).fetchone() is None:
+        return None
+    with _event_lock:
+        # Queue and writer thread must never cross a fork
+        if _event_pid != os.getpid():
+            _event_writer, _event_pid = None, os.getpid()
+            _event_registered.clear()
+            _event_pending.clear()
+            _event_queue.queue.clear()
+        if _event_registered_stamp != stamp:
+            _event_registered.clear()
+            _event_registered_stamp = stamp
+        registered = _event_registered.get(event_id)
+        if registered is None:
+            registered = _event_registered[event_id] = {row[0] for row in conn.execute(
+                'SELECT user_id FROM event_registrations WHERE event_id = ?', (event_id,))}
+        if user_id in registered:
+            return False
+        registered.add(user_id)
+        _event_pending[user_id] = _event_pending.get(user_id, 0) + 1
+        if _event_writer is None or not _event_writer.is_alive():
+            if _event_writer is not None:
+                event_writer_log.error('event writer thread died; restarting it')
+            _event_writer = threading.Thread(target=_write_event_registrations, name='event-writer', daemon=True)
+            _event_writer.start()
+    # Stamped now, as the synchronous insert would have been
+    _event_queue.put((user_id, event_id, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')))
+    return True
+
+def _write_event_registrations():
+    """Writer thread: commit queued registrations in batches until stopped"""
+    conn = connect_db()
+    stopping = False
+    while not stopping:
+        batch = []
+        item = _event_queue.get()
+        deadline = time.monotonic() + EVENT_FLUSH_SECONDS
+        while item is not None:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= EVENT_FLUSH_ROWS or remaining <= 0:
+                break
+            try:
+                item = _event_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        stopping = item is None
+        if not batch:
+            continue
+        try:
+            _commit_event_registrations(conn, batch)
+        except Exception:
+            # Not a database error: drop the batch but keep the thread alive
+            event_writer_log.exception('dropping %d event registrations', len(batch))
+            if conn.in_transaction:
+                conn.rollback()
+            _release_event_registrations(batch, batch)
+    conn.close()
+
+def _insert_event_registrations(conn, rows):
+    conn.execute('BEGIN IMMEDIATE')
+    conn.executemany('''
+        INSERT INTO event_registrations (user_id, event_id, registration_date)
+        SELECT ?, id, ? FROM events WHERE id = ?
+        ON CONFLICT(user_id, event_id) DO NOTHING
+    ''', ((user_id, registered, event_id) for user_id, event_id, registered in rows))
+    bump_snapshot_versions(conn, 'SELECT value AS user_id FROM json_each(?)',
+                           (json.dumps(sorted({row[0] for row in rows})),))
+    conn.commit()
+
+def _commit_event_registrations(conn, batch):
+    """Write one batch, falling back to row by row; the rows that fail alone are dropped"""
+    dropped = []
+    for attempt in range(1, EVENT_WRITE_RETRIES + 1):
+        try:
+            _insert_event_registrations(conn, batch)
+            break
+        except sqlite3.Error:
+            conn.rollback()
+            event_writer_log.warning('writing %d event registrations failed (attempt %d of %d)',
+                                     len(batch), attempt, EVENT_WRITE_RETRIES, exc_info=True)
+            time.sleep(0.1)
+    else:
+        for row in batch:
+            try:
+                _insert_event_registrations(conn, [row])
+            except sqlite3.Error:
+                conn.rollback()
+                event_writer_log.exception('dropping event registration %r', row)
+                dropped.append(row)
+    _release_event_registrations(batch, dropped)
+
+def _release_event_registrations(batch, dropped):
+    """Mark a batch as no longer pending; the dropped rows may be registered again"""
+    with _event_lock:
+        for user_id, event_id, _ in batch:
+            _event_pending[user_id] -= 1
+            if not _event_pending[user_id]:
+                del _event_pending[user_id]
+        for user_id, event_id, _ in dropped:
+            _event_registered.get(event_id, set()).discard(user_id)
+        _event_lock.notify_all()
+
+def wait_for_event_registrations(user_id, timeout=2.0):
+    """Block until this worker has committed the user's queued registrations"""
+    with _event_lock:
+        _event_lock.wait_for(lambda: user_id not in _event_pending, timeout)
+
+def stop_event_writer():
+    """Write everything queued and stop the writer thread (worker shutdown)"""
+    global _event_writer
+    with _event_lock:
+        writer = _event_writer if _event_pid == os.getpid() else None
+        _event_writer = None
+    if writer is not None:
+        _event_queue.put(None)
+        writer.join()
+        # The writer died before reaching the end of the queue: drain it here
+        if not _event_queue.empty():
+            _write_event_registrations()
+
+atexit.register(stop_event_writer)
+
+def awaits_event_registrations(f):
+    """Decorator for pages listing the user's events, so they show what was just queued"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        wait_for_event_registrations(session['user_id'])
+        return f(*args, **kwargs)
+    return decorated_function
+
 # ==================== AUTHENTICATION DECORATOR ====================
 
 def login_required(f):
@@ -316,6 +2829,16 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def staff_required(f):
+    """Decorator to require admin or faculty login"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if session.get('user_type') not in ('admin', 'faculty'):
+            flash('This page is only accessible to staff.', 'danger')
+            return redirect(url_for('dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
 # ==================== ROUTES ====================
 
 @app.route('/')
@@ -338,7 +2861,6 @@ def login():
             'SELECT * FROM users WHERE username = ? AND password = ?',
             (username, password)
         ).fetchone()
-        conn.close()
         
         if user:
             # Set session variables
@@ -378,6 +2900,7 @@ def profile():
         if action == 'update_details':
             email = request.form.get('email')
             conn.execute('UPDATE users SET email = ? WHERE id = ?', (email, session['user_id']))
+            bump_data_version(conn, 'users')
             conn.commit()
             flash('Profile details updated successfully!', 'success')
             
@@ -397,12 +2920,10 @@ def profile():
                 conn.commit()
                 flash('Password changed successfully!', 'success')
         
-        conn.close()
         return redirect(url_for('profile'))
     
     # GET request
     user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-    conn.close()
     
     return render_template('profile.html', user=user)
 
@@ -418,55 +2939,11 @@ def dashboard():
     
     # Get student/faculty specific data
     if session['user_type'] == 'student':
-        student = conn.execute('''
-            SELECT s.* FROM students s
-            WHERE s.user_id = ?
-        ''', (session['user_id'],)).fetchone()
-        
-        # Get attendance summary
-        attendance_summary = conn.execute('''
-            SELECT 
-                COUNT(*) as total_subjects,
-                AVG(CAST(attended_classes AS FLOAT) / total_classes * 100) as avg_attendance
-            FROM attendance
-            WHERE student_id = ?
-        ''', (student['id'],)).fetchone()
-        
-        # Get pending assignments count
-        pending_assignments = conn.execute('''
-            SELECT COUNT(*) as count FROM assignments
-            WHERE status = 'pending' AND due_date >= date('now')
-        ''').fetchone()
-        
-        # Get upcoming placement drives count
-        eligible_drives = conn.execute('''
-            SELECT COUNT(*) as count FROM placement_drives
-            WHERE status = 'Open' AND min_cgpa <= ?
-        ''', (student['cgpa'],)).fetchone()
-        
-        # Get upcoming events count
-        upcoming_events = conn.execute('''
-            SELECT COUNT(*) as count FROM events
-            WHERE event_date >= date('now')
-        ''').fetchone()
+        # Student row, attendance summary and tile counts (cached per user)
+        dashboard_data = dict(student_dashboard_snapshot(conn, session['user_id']))
         
         # Get recent announcements
-        announcements = conn.execute('''
-            SELECT * FROM announcements 
-            ORDER BY created_at DESC 
-            LIMIT 5
-        ''').fetchall()
-        
-        conn.close()
-        
-        dashboard_data = {
-            'student': student,
-            'attendance_summary': attendance_summary,
-            'pending_assignments': pending_assignments['count'],
-            'eligible_drives': eligible_drives['count'],
-            'upcoming_events': upcoming_events['count'],
-            'announcements': announcements
-        }
+        dashboard_data['announcements'] = recent_announcements(conn)
         
         return render_template('dashboard.html', data=dashboard_data)
     
@@ -477,14 +2954,8 @@ def dashboard():
         ''', (session['user_id'],)).fetchone()
         
         # Get recent announcements
-        announcements = conn.execute('''
-            SELECT * FROM announcements 
-            ORDER BY created_at DESC 
-            LIMIT 5
-        ''').fetchall()
-        
-        conn.close()
-        
+        announcements = recent_announcements(conn)
+    
         dashboard_data = {
             'faculty': faculty,
             'announcements': announcements
@@ -505,19 +2976,11 @@ def academics():
         WHERE s.user_id = ?
     ''', (session['user_id'],)).fetchone()
     
-    # Get detailed attendance with subject info
-    attendance_data = conn.execute('''
-        SELECT 
-            s.subject_name,
-            s.subject_code,
-            a.total_classes,
-            a.attended_classes,
-            CAST(a.attended_classes AS FLOAT) / a.total_classes * 100 as percentage
-        FROM attendance a
-        JOIN subjects s ON a.subject_id = s.id
-        WHERE a.student_id = ?
-        ORDER BY percentage DESC
-    ''', (student['id'],)).fetchall()
+    # Get detailed attendance with subject info, optionally for a date range
+    date_from = request.args.get('from') or None
+    date_to = request.args.get('to') or None
+    attendance_data = attendance_by_subject(conn, student['id'], date_from, date_to)
+    grades = student_grades(conn, student['id'])
     
     # Get all assignments
     assignments = conn.execute('''
@@ -534,15 +2997,17 @@ def academics():
         ORDER BY a.due_date ASC
     ''').fetchall()
     
-    conn.close()
-    
     return render_template('academics.html', 
                          student=student, 
                          attendance=attendance_data, 
-                         assignments=assignments)
+                         assignments=assignments,
+                         grades=grades,
+                         date_from=date_from,
+                         date_to=date_to)
 
 @app.route('/placements')
 @login_required
+@conditional('companies', 'placement_drives', 'drive_registrations', 'students')
 @student_required
 def placements():
     """Placement portal page"""
@@ -555,15 +3020,19 @@ def placements():
     ''', (session['user_id'],)).fetchone()
     
     # Get companies visited
-    companies = conn.execute('''
+    companies = cached_query(conn, ('companies',), '''
         SELECT * FROM companies
         ORDER BY visit_date DESC
         LIMIT 10
-    ''').fetchall()
+    ''')
     
     # Get registered drives
     registered_drives = conn.execute('''
-        SELECT pd.*, dr.registration_date, dr.status as reg_status
+        SELECT pd.*, dr.registration_date, dr.status as reg_status,
+               CASE WHEN dr.status = 'Waitlisted' THEN
+                   (SELECT COUNT(*) FROM drive_registrations w
+                    WHERE w.drive_id = dr.drive_id AND w.status = 'Waitlisted' AND w.id <= dr.id)
+               END as waitlist_position
         FROM placement_drives pd
         JOIN drive_registrations dr ON pd.id = dr.drive_id
         WHERE dr.student_id = ?
@@ -571,36 +3040,39 @@ def placements():
     ''', (student['id'],)).fetchall()
     
     # Get eligible placement drives (excluding registered ones)
+    eligible_ids = eligible_drive_ids(conn, student['id'])
     eligible_drives = conn.execute('''
-        SELECT * FROM placement_drives
-        WHERE min_cgpa <= ? 
-        AND status = 'Open'
-        AND id NOT IN (SELECT drive_id FROM drive_registrations WHERE student_id = ?)
-        ORDER BY drive_date ASC
-    ''', (student['cgpa'], student['id'])).fetchall()
+        SELECT pd.*,
+               (SELECT COUNT(*) FROM drive_registrations r
+                WHERE r.drive_id = pd.id AND r.status = 'Registered') as seats_taken
+        FROM placement_drives pd
+        WHERE pd.id IN (SELECT value FROM json_each(?))
+        AND pd.status = 'Open'
+        AND pd.id NOT IN (SELECT drive_id FROM drive_registrations WHERE student_id = ?)
+        ORDER BY pd.drive_date ASC
+    ''', (json.dumps(eligible_ids), student['id'])).fetchall()
     
     # Get all upcoming drives
-    all_drives = conn.execute('''
+    all_drives = cached_query(conn, ('placement_drives',), '''
         SELECT * FROM placement_drives
         WHERE status IN ('Open', 'Upcoming')
         ORDER BY drive_date ASC
-    ''').fetchall()
-    
-    conn.close()
+    ''')
     
     return render_template('placements.html', 
                          student=student,
                          companies=companies, 
                          eligible_drives=eligible_drives,
                          registered_drives=registered_drives,
-                         all_drives=all_drives)
+                         all_drives=all_drives,
+                         eligible_ids=set(eligible_ids))
 
 @app.route('/apply-drive', methods=['POST'])
 @login_required
 @student_required
 def apply_drive():
-    """Register for a placement drive"""
-    drive_id = request.form.get('drive_id')
+    """Register for a placement drive, or join its waitlist when it is full"""
+    drive_id = request.form.get('drive_id', type=int)
     
     conn = get_db_connection()
     
@@ -608,50 +3080,70 @@ def apply_drive():
         # Get student info
         student = conn.execute('SELECT id FROM students WHERE user_id = ?', (session['user_id'],)).fetchone()
         
-        # Check if already registered
-        existing = conn.execute('''
-            SELECT * FROM drive_registrations 
-            WHERE student_id = ? AND drive_id = ?
-        ''', (student['id'], drive_id)).fetchone()
-        
-        if existing:
+        if (drive_id in eligibility_index(conn)['drives']
+                and drive_id not in eligible_drive_ids(conn, student['id'])):
+            flash('You do not meet the eligibility criteria for this drive.', 'warning')
+            return redirect(url_for('placements'))
+        status = register_for_drive(conn, student['id'], drive_id)
+        if status == 'Registered':
+            flash('Successfully registered for the placement drive!', 'success')
+        elif status == 'Waitlisted':
+            flash('This drive is full, so you have been added to its waitlist. '
+                  'You will be registered automatically if a seat frees up.', 'info')
+        elif conn.execute('''
+            SELECT 1 FROM drive_registrations WHERE student_id = ? AND drive_id = ?
+        ''', (student['id'], drive_id)).fetchone():
             flash('You have already registered for this drive.', 'warning')
         else:
-            conn.execute('''
-                INSERT INTO drive_registrations (student_id, drive_id)
-                VALUES (?, ?)
-            ''', (student['id'], drive_id))
-            conn.commit()
-            flash('Successfully registered for the placement drive!', 'success')
+            flash('This drive is not open for registration.', 'warning')
             
     except Exception as e:
         flash(f'An error occurred: {str(e)}', 'danger')
         
-    finally:
-        conn.close()
+    return redirect(url_for('placements'))
+
+@app.route('/withdraw-drive', methods=['POST'])
+@login_required
+@student_required
+def withdraw_drive():
+    """Withdraw from a placement drive; the first waitlisted student takes the seat"""
+    drive_id = request.form.get('drive_id', type=int)
+    
+    conn = get_db_connection()
+    
+    try:
+        student = conn.execute('SELECT id FROM students WHERE user_id = ?', (session['user_id'],)).fetchone()
+        if withdraw_from_drive(conn, student['id'], drive_id):
+            flash('You have withdrawn from the placement drive.', 'info')
+        else:
+            flash('You are not registered for this drive.', 'warning')
+    except Exception as e:
+        flash(f'An error occurred: {str(e)}', 'danger')
         
     return redirect(url_for('placements'))
 
 @app.route('/events')
 @login_required
+@awaits_event_registrations
+@conditional('events', 'announcements')
 def events():
     """University events and happenings page"""
     conn = get_db_connection()
     
     # Get upcoming events
-    upcoming = conn.execute('''
+    upcoming = cached_query(conn, ('events',), '''
         SELECT * FROM events
         WHERE event_date >= date('now')
         ORDER BY event_date ASC
-    ''').fetchall()
+    ''')
     
     # Get past events
-    past = conn.execute('''
+    past = cached_query(conn, ('events',), '''
         SELECT * FROM events
         WHERE event_date < date('now')
         ORDER BY event_date DESC
         LIMIT 5
-    ''').fetchall()
+    ''')
     
     # Get registered events for current user
     registered_events = conn.execute('''
@@ -663,13 +3155,7 @@ def events():
     ''', (session['user_id'],)).fetchall()
     
     # Get recent announcements
-    announcements = conn.execute('''
-        SELECT * FROM announcements 
-        ORDER BY created_at DESC 
-        LIMIT 5
-    ''').fetchall()
-    
-    conn.close()
+    announcements = recent_announcements(conn)
     
     return render_template('events.html', 
                          upcoming_events=upcoming, 
@@ -683,6 +3169,19 @@ def register_event(event_id):
     """Register for an event"""
     conn = get_db_connection()
     
+    if EVENT_WRITE_BEHIND:
+        try:
+            queued = queue_event_registration(conn, session['user_id'], event_id)
+            if queued is None:
+                flash('This event no longer exists.', 'danger')
+            elif queued:
+                flash('Successfully registered for the event!', 'success')
+            else:
+                flash('You are already registered for this event.', 'warning')
+        except Exception as e:
+            flash(f'An error occurred: {str(e)}', 'danger')
+        return redirect(url_for('events'))
+    
     try:
         # Check if already registered
         existing = conn.execute('''
@@ -692,21 +3191,58 @@ def register_event(event_id):
         
         if existing:
             flash('You are already registered for this event.', 'warning')
+        elif conn.execute('SELECT 1 FROM events WHERE id = ?', (event_id,)).fetchone() is None:
+            flash('This event no longer exists.', 'danger')
         else:
             conn.execute('''
                 INSERT INTO event_registrations (user_id, event_id)
                 VALUES (?, ?)
             ''', (session['user_id'], event_id))
+            bump_snapshot_versions(conn, 'SELECT ? AS user_id', (session['user_id'],))
             conn.commit()
             flash('Successfully registered for the event!', 'success')
             
     except Exception as e:
         flash(f'An error occurred: {str(e)}', 'danger')
         
-    finally:
-        conn.close()
-        
     return redirect(url_for('events'))
+
+
+def search_result_url(kind, row):
+    """Page showing a search result for the current user"""
+    if kind == 'people':
+        endpoint = 'admin_students' if row['user_type'] == 'student' else 'admin_faculties'
+        return url_for(endpoint, q=row['code'] or row['label'])
+    if kind == 'drives':
+        endpoint = 'admin_placements' if session['user_type'] == 'admin' else 'placements'
+        return url_for(endpoint, _anchor=f"drive-{row['id']}")
+    if kind == 'events':
+        return url_for('events', _anchor=f"event-{row['id']}")
+    return url_for('events', _anchor=f"announcement-{row['id']}")
+
+@app.route('/search')
+@login_required
+def search():
+    """Search results page"""
+    q = request.args.get('q', '').strip()
+    conn = get_db_connection()
+    results = search_records(conn, q, session['user_type'])
+    urls = {(kind, row['id']): search_result_url(kind, row) for kind, rows in results.items() for row in rows}
+    return render_template('search.html', q=q, results=results, urls=urls)
+
+@app.route('/search/suggest')
+@login_required
+def search_suggest():
+    """Typeahead: the best few matches of each kind as JSON"""
+    q = request.args.get('q', '').strip()
+    conn = get_db_connection()
+    results = search_records(conn, q, session['user_type'], SUGGESTION_LIMIT, SUGGESTION_CANDIDATES)
+    return {
+        'q': q,
+        'results': [{'kind': kind, 'id': row['id'], 'label': row['label'], 'url': search_result_url(kind, row)}
+                    for kind, rows in results.items() for row in rows],
+    }
+
 # ==================== ADMIN ROUTES ====================
 
 @app.route('/admin/dashboard')
@@ -729,10 +3265,8 @@ def admin_dashboard():
     event_count = cursor.fetchone()[0]
     
     # Get recent announcements
-    cursor.execute("SELECT * FROM announcements ORDER BY created_at DESC LIMIT 5")
-    announcements = cursor.fetchall()
+    announcements = recent_announcements(conn)
     
-    conn.close()
     return render_template('admin_dashboard.html', 
                            student_count=student_count, 
                            faculty_count=faculty_count,
@@ -764,61 +3298,118 @@ def admin_add_user():
                 semester = request.form['semester']
                 cursor.execute("INSERT INTO students (user_id, student_id, program, semester) VALUES (?, ?, ?, ?)",
                                (user_id, student_id, program, semester))
+                bump_data_version(conn, 'students')
             elif user_type == 'faculty':
                 faculty_id = request.form['faculty_id']
                 department = request.form['department']
                 designation = request.form['designation']
                 cursor.execute("INSERT INTO faculty (user_id, faculty_id, department, designation) VALUES (?, ?, ?, ?)",
                                (user_id, faculty_id, department, designation))
+                bump_data_version(conn, 'faculty')
             
             conn.commit()
             flash(f'Successfully added {user_type}: {full_name}', 'success')
         except sqlite3.IntegrityError:
+            conn.rollback()
             flash('Username or ID already exists!', 'danger')
-        finally:
-            conn.close()
-            
+
         return redirect(url_for('admin_dashboard'))
     
     return render_template('admin_add_user.html')
 
+@app.route('/admin/import_users', methods=['GET', 'POST'])
+@admin_required
+def admin_import_users():
+    """Bulk-create students and faculty from an uploaded CSV"""
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a CSV file to import.', 'warning')
+            return redirect(url_for('admin_import_users'))
+        conn = get_db_connection()
+        # Read the upload as a stream so large files are never held in memory
+        reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+        report = import_users(conn, reader)
+        flash(f"Imported {report['imported']} users, {report['error_count']} rows rejected.",
+              'success' if not report['error_count'] else 'warning')
+    return render_template('admin_import_users.html', report=report,
+                           required_fields=IMPORT_REQUIRED_FIELDS)
+
+@app.route('/admin/publish_results', methods=['GET', 'POST'])
+@admin_required
+def admin_publish_results():
+    """Publish a semester's grades from an uploaded CSV and recompute CGPAs"""
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        semester = request.form.get('semester', type=int)
+        if not upload or not upload.filename or not semester:
+            flash('Choose a semester and a CSV file of results.', 'warning')
+            return redirect(url_for('admin_publish_results'))
+        conn = get_db_connection()
+        reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+        report = publish_results(conn, semester, reader)
+        flash(f"Published {report['published']} grades for {report['students']} students, "
+              f"{report['error_count']} rows rejected.", 'success' if not report['error_count'] else 'warning')
+    return render_template('admin_publish_results.html', report=report,
+                           required_fields=RESULTS_REQUIRED_FIELDS, grade_points=GRADE_POINTS)
+
 @app.route('/admin/students')
 @admin_required
 def admin_students():
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT s.id, u.full_name, s.student_id, s.program, s.semester, s.cgpa 
-        FROM students s 
-        JOIN users u ON s.user_id = u.id
-    """)
-    students = cursor.fetchall()
-    conn.close()
-    return render_template('admin_students.html', students=students)
+    filters, where, params = student_list_filters(request.args)
+    students, next_cursor = keyset_page(
+        conn, 's.id, u.full_name, s.student_id, s.program, s.semester, s.cgpa',
+        'students s JOIN users u ON s.user_id = u.id', where, params,
+        STUDENT_SORTS[filters['sort']], descending=filters['order'] == 'desc',
+        cursor=request.args.get('cursor'), page_size=page_size_arg(request.args))
+    return render_list_page('admin_students.html', 'admin_student_rows.html', next_cursor,
+                            students=students, filters=filters, programs=student_programs(conn))
 
 @app.route('/admin/faculties')
 @admin_required
 def admin_faculties():
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT f.id, u.full_name, f.faculty_id, f.department, f.designation, u.email
-        FROM faculty f 
-        JOIN users u ON f.user_id = u.id
-    """)
-    faculties = cursor.fetchall()
-    conn.close()
-    return render_template('admin_faculties.html', faculties=faculties)
+    department = request.args.get('department') or None
+    q = request.args.get('q', '').strip() or None
+    where, params = [], []
+    if department:
+        where.append('f.department = ?')
+        params.append(department)
+    match = fts_query(q) if q else None
+    if match:
+        where.append('f.user_id IN (SELECT rowid FROM people_search WHERE people_search MATCH ?)')
+        params.append(match)
+    faculties, next_cursor = keyset_page(
+        conn, 'f.id, u.full_name, f.faculty_id, f.department, f.designation, u.email',
+        'faculty f JOIN users u ON f.user_id = u.id', where, params,
+        FACULTY_SORTS['name'], cursor=request.args.get('cursor'),
+        page_size=page_size_arg(request.args))
+    departments = [row['department'] for row in cached_query(conn, ('faculty',), '''
+        SELECT DISTINCT department FROM faculty ORDER BY department
+    ''')]
+    return render_list_page('admin_faculties.html', 'admin_faculty_rows.html', next_cursor,
+                            faculties=faculties, department=department, q=q, departments=departments)
 
 @app.route('/admin/placements')
 @admin_required
 def admin_placements():
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM placement_drives ORDER BY drive_date ASC")
+    cursor.execute("""
+        SELECT pd.*,
+               (SELECT COUNT(*) FROM drive_registrations r
+                WHERE r.drive_id = pd.id AND r.status = 'Registered') as registered,
+               (SELECT COUNT(*) FROM drive_registrations r
+                WHERE r.drive_id = pd.id AND r.status = 'Waitlisted') as waitlisted
+        FROM placement_drives pd
+        ORDER BY pd.drive_date ASC
+    """)
     drives = cursor.fetchall()
-    conn.close()
-    return render_template('admin_placements.html', drives=drives)
+    return render_template('admin_placements.html', drives=drives, eligible=eligible_counts(conn),
+                           rules=eligibility_index(conn)['drives'])
 
 @app.route('/admin/student/<int:student_id>')
 @admin_required
@@ -836,7 +3427,6 @@ def admin_student_detail(student_id):
     student = cursor.fetchone()
     
     if not student:
-        conn.close()
         flash('Student not found!', 'danger')
         return redirect(url_for('admin_students'))
     
@@ -849,7 +3439,6 @@ def admin_student_detail(student_id):
     """, (student_id,))
     attendance = cursor.fetchall()
     
-    conn.close()
     return render_template('student_detail.html', student=student, attendance=attendance, admin_view=True)
 
 @app.route('/admin/add_drive', methods=['POST'])
@@ -861,15 +3450,18 @@ def admin_add_drive():
     drive_date = request.form['drive_date']
     min_cgpa = request.form['min_cgpa']
     description = request.form['description']
+    # Blank means unlimited seats
+    capacity = request.form.get('capacity', type=int)
     
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, min_cgpa, description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (company_name, position, eligibility, drive_date, min_cgpa, description))
+        INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, min_cgpa, description,
+                                      capacity)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (company_name, position, eligibility, drive_date, min_cgpa, description, capacity))
+    bump_data_version(conn, 'placement_drives')
     conn.commit()
-    conn.close()
     flash('Placement drive added successfully!', 'success')
     return redirect(url_for('admin_placements'))
 
@@ -880,8 +3472,8 @@ def admin_delete_drive(drive_id):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM placement_drives WHERE id = ?", (drive_id,))
     cursor.execute("DELETE FROM drive_registrations WHERE drive_id = ?", (drive_id,))
+    bump_data_version(conn, 'placement_drives')
     conn.commit()
-    conn.close()
     flash('Placement drive removed!', 'info')
     return redirect(url_for('admin_placements'))
 
@@ -901,8 +3493,8 @@ def admin_add_event():
         INSERT INTO events (event_name, event_type, event_date, location, description, organizer)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (event_name, event_type, event_date, location, description, organizer))
+    bump_data_version(conn, 'events')
     conn.commit()
-    conn.close()
     flash('Event added successfully!', 'success')
     return redirect(url_for('events'))
 
@@ -913,8 +3505,8 @@ def admin_delete_event(event_id):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
     cursor.execute("DELETE FROM event_registrations WHERE event_id = ?", (event_id,))
+    bump_data_version(conn, 'events')
     conn.commit()
-    conn.close()
     flash('Event removed!', 'info')
     return redirect(url_for('events'))
 
@@ -927,8 +3519,8 @@ def admin_add_announcement():
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("INSERT INTO announcements (title, content) VALUES (?, ?)", (title, content))
+    bump_data_version(conn, 'announcements')
     conn.commit()
-    conn.close()
     flash('Announcement posted!', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -938,23 +3530,98 @@ def admin_delete_announcement(ann_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM announcements WHERE id = ?", (ann_id,))
+    bump_data_version(conn, 'announcements')
     conn.commit()
-    conn.close()
     flash('Announcement removed!', 'info')
     return redirect(url_for('admin_dashboard'))
 
-# ==================== INITIALIZE DATABASE ON FIRST RUN ====================
+@app.route('/admin/cache-stats')
+@admin_required
+def admin_cache_stats():
+    """Hit and miss counters of this worker's query and dashboard caches"""
+    with _metrics_lock:
+        queries, snapshots = dict(query_cache_stats), dict(dashboard_snapshot_stats)
+    lookups = queries['hits'] + queries['misses']
+    return {
+        'pid': os.getpid(),
+        'hits': queries['hits'],
+        'misses': queries['misses'],
+        'hit_ratio': queries['hits'] / lookups if lookups else 0.0,
+        'entries': len(_query_cache),
+        'dashboard_snapshots': {
+            'hits': snapshots['hits'],
+            'misses': snapshots['misses'],
+            'entries': len(_dashboard_snapshots)
+        }
+    }
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Per-endpoint request, SQL and template histograms of this worker (Prometheus format)"""
+    return Response(prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_profiles():
+    """Recent request profiles taken with ?_profile=1"""
+    return render_template('admin_profiles.html', profiles=recent_profiles())
+
+@app.route('/admin/profiles/<path:filename>')
+@admin_required
+def admin_profile_file(filename):
+    if not filename.endswith(('.prof', '.collapsed', '.txt')):
+        return {'error': 'Unknown profile file'}, 404
+    return send_from_directory(os.path.abspath(PROFILE_DIR), filename,
+                               as_attachment=not filename.endswith('.txt'))
+
+# ==================== APP SETUP ====================
+# Importing this module does no database or file work. The schema is
+# created or migrated once, before any worker starts: by `flask init-db` /
+# `flask migrate`, by gunicorn.conf.py in the gunicorn master, or by
+# `python app.py`. The asset manifest and release stamp are read on first
+# use, which gunicorn.conf.py also brings forward into the master.
 
-if not os.path.exists('database'):
-    os.makedirs('database')
+def use_database(database=None):
+    """Point the application at `database` when given and return it (tools, benchmarks,
+    `gunicorn 'app:use_database("path/to.db")'`).
 
-if not os.path.exists(DATABASE):
-    init_db()
+    There is one application per process: this reconfigures the module's app,
+    it does not build a new one.
+    """
+    if database is not None and database != app.config['DATABASE']:
+        app.config['DATABASE'] = database
+        # Pooled connections and cached results belong to the old database
+        while not _pool.empty():
+            _pool.get_nowait().close()
+        _query_cache.clear()
+        _dashboard_snapshots.clear()
+        _attendance_reports.clear()
+        _eligibility.clear()
+    return app
+
+def migrate_db():
+    """Create the database if it is missing, else run update_db.py on it unless it is
+    already at SCHEMA_VERSION; returns what was done"""
+    database = app.config['DATABASE']
+    if not os.path.exists(database):
+        init_db()
+        return 'created'
+    conn = sqlite3.connect(database)
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+    if version >= update_db.SCHEMA_VERSION:
+        return 'up to date'
+    update_db.update_db(database)
+    return 'migrated'
 
 # ==================== FACULTY ROUTES ====================
 
 @app.route('/faculty/classes')
 @login_required
+@conditional('subjects', 'faculty_subjects')
 def faculty_classes():
     """Get faculty classes for popup"""
     if session['user_type'] != 'faculty':
@@ -962,21 +3629,20 @@ def faculty_classes():
     
     conn = get_db_connection()
     
-    # Get all subjects (in real app, filter by faculty)
+    # Get the subjects this faculty member teaches, with their maintained roster counts
     classes = conn.execute('''
         SELECT 
             s.id,
             s.subject_code,
             s.subject_name,
             s.credits,
-            COUNT(DISTINCT st.id) as student_count
-        FROM subjects s
-        LEFT JOIN attendance a ON s.id = a.subject_id
-        LEFT JOIN students st ON a.student_id = st.id
-        GROUP BY s.id
-    ''').fetchall()
-    
-    conn.close()
+            s.enrolled_count as student_count
+        FROM faculty f
+        JOIN faculty_subjects fs ON fs.faculty_id = f.id
+        JOIN subjects s ON fs.subject_id = s.id
+        WHERE f.user_id = ?
+        ORDER BY s.subject_code
+    ''', (session['user_id'],)).fetchall()
     
     return render_template('faculty_classes_popup.html', classes=classes)
 
@@ -989,11 +3655,13 @@ def mark_attendance(subject_id):
         return {'error': 'Unauthorized'}, 403
     
     conn = get_db_connection()
+    if not teaches(conn, session['user_id'], subject_id):
+        return {'error': 'You do not teach this subject'}, 403
     
     # Get subject details
     subject = conn.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,)).fetchone()
     
-    # Get all students with their attendance for this subject
+    # Get the enrolled students with their attendance for this subject
     students = conn.execute('''
         SELECT 
             s.id,
@@ -1004,14 +3672,14 @@ def mark_attendance(subject_id):
             COALESCE(a.total_classes, 0) as total_classes,
             COALESCE(a.attended_classes, 0) as attended_classes,
             a.id as attendance_id
-        FROM students s
+        FROM subject_roster r
+        JOIN students s ON r.student_id = s.id
         JOIN users u ON s.user_id = u.id
-        LEFT JOIN attendance a ON s.id = a.student_id AND a.subject_id = ?
+        LEFT JOIN attendance a ON s.id = a.student_id AND a.subject_id = r.subject_id
+        WHERE r.subject_id = ?
         ORDER BY u.full_name
     ''', (subject_id,)).fetchall()
     
-    conn.close()
-    
     return render_template('mark_attendance_popup.html', subject=subject, students=students)
 
 
@@ -1022,50 +3690,74 @@ def save_attendance():
     if session['user_type'] != 'faculty':
         return {'error': 'Unauthorized'}, 403
     
-    subject_id = request.form.get('subject_id')
-    attended_students = request.form.getlist('attended[]')  # List of student IDs who attended
+    subject_id = request.form.get('subject_id', type=int)
+    # Student IDs who attended, as a set for O(1) membership tests
+    attended_students = {int(sid) for sid in request.form.getlist('attended[]') if sid.isdigit()}
     
     conn = get_db_connection()
-    cursor = conn.cursor()
+    if not teaches(conn, session['user_id'], subject_id):
+        return {'error': 'You do not teach this subject'}, 403
+    record_attendance(conn, subject_id, attended_students)
     
-    # Get all students for this subject
-    students = conn.execute('''
-        SELECT s.id, a.id as attendance_id
-        FROM students s
-        LEFT JOIN attendance a ON s.id = a.student_id AND a.subject_id = ?
-    ''', (subject_id,)).fetchall()
+    flash('Attendance marked successfully!', 'success')
+    return redirect(url_for('dashboard'))
+
+
+@app.route('/faculty/absentees/<int:subject_id>')
+@login_required
+def faculty_absentees(subject_id):
+    """Students who missed each of the last few classes of a subject"""
+    if session['user_type'] != 'faculty':
+        return {'error': 'Unauthorized'}, 403
     
-    for student in students:
-        student_id = student['id']
-        attendance_id = student['attendance_id']
-        is_present = str(student_id) in attended_students
-        
-        if attendance_id:
-            # Update existing record
-            cursor.execute('''
-                UPDATE attendance 
-                SET total_classes = total_classes + 1,
-                    attended_classes = attended_classes + ?
-                WHERE id = ?
-            ''', (1 if is_present else 0, attendance_id))
-        else:
-            # Create new record
-            cursor.execute('''
-                INSERT INTO attendance (student_id, subject_id, total_classes, attended_classes)
-                VALUES (?, ?, 1, ?)
-            ''', (student_id, subject_id, 1 if is_present else 0))
+    classes = request.args.get('classes', 3, type=int)
+    conn = get_db_connection()
+    if not teaches(conn, session['user_id'], subject_id):
+        return {'error': 'You do not teach this subject'}, 403
+    students = missed_recent_classes(conn, subject_id, max(classes, 1))
     
-    conn.commit()
-    conn.close()
+    return {
+        'subject_id': subject_id,
+        'classes': classes,
+        'students': [dict(student) for student in students]
+    }
+
+
+@app.route('/faculty/attendance-shortage')
+@login_required
+@conditional('attendance', 'students', 'users', 'subjects', 'faculty_subjects')
+def faculty_attendance_shortage():
+    """Students of this faculty member's subjects below the attendance threshold"""
+    if session['user_type'] != 'faculty':
+        return {'error': 'Unauthorized'}, 403
     
-    flash('Attendance marked successfully!', 'success')
-    return redirect(url_for('dashboard'))
+    threshold = min(max(request.args.get('threshold', ATTENDANCE_THRESHOLD, type=int), 1), 99)
+    limit = min(max(request.args.get('limit', SHORTAGE_LIST_SIZE, type=int), 1), 1000)
+    conn = get_db_connection()
+    report = attendance_report(conn, taught_subject_ids(conn, session['user_id']), threshold)
+    shortages = report['shortages'][:limit]
+    
+    # Names only for the students and subjects shown
+    students = {row['id']: row for row in conn.execute('''
+        SELECT s.id, s.student_id, u.full_name, s.program, s.semester
+        FROM students s
+        JOIN users u ON s.user_id = u.id
+        WHERE s.id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps([entry['student_id'] for entry in shortages]),))}
+    subjects = {row['id']: row for row in conn.execute('''
+        SELECT id, subject_code, subject_name FROM subjects
+        WHERE id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps([entry['subject_id'] for entry in report['subjects']]),))}
+    
+    return render_template('faculty_shortage_popup.html', report=report, shortages=shortages,
+                           students=students, subjects=subjects, limit=limit)
 
 
 @app.route('/faculty/assignments')
 @login_required
+@conditional('assignments', 'subjects', 'faculty_subjects')
 def faculty_assignments():
-    """Get all assignments for faculty"""
+    """Get the assignments of the subjects this faculty member teaches"""
     if session['user_type'] != 'faculty':
         return {'error': 'Unauthorized'}, 403
     
@@ -1080,15 +3772,23 @@ def faculty_assignments():
             a.status,
             s.subject_name,
             s.subject_code
-        FROM assignments a
-        JOIN subjects s ON a.subject_id = s.id
+        FROM faculty f
+        JOIN faculty_subjects fs ON fs.faculty_id = f.id
+        JOIN subjects s ON fs.subject_id = s.id
+        JOIN assignments a ON a.subject_id = s.id
+        WHERE f.user_id = ?
         ORDER BY a.due_date DESC
-    ''').fetchall()
-    
-    # Get subjects for the add form
-    subjects = conn.execute('SELECT id, subject_name, subject_code FROM subjects').fetchall()
+    ''', (session['user_id'],)).fetchall()
     
-    conn.close()
+    # Get the faculty member's subjects for the add form
+    subjects = conn.execute('''
+        SELECT s.id, s.subject_name, s.subject_code
+        FROM faculty f
+        JOIN faculty_subjects fs ON fs.faculty_id = f.id
+        JOIN subjects s ON fs.subject_id = s.id
+        WHERE f.user_id = ?
+        ORDER BY s.subject_code
+    ''', (session['user_id'],)).fetchall()
     
     return render_template('faculty_assignments_popup.html', assignments=assignments, subjects=subjects)
 
@@ -1100,18 +3800,20 @@ def add_assignment():
     if session['user_type'] != 'faculty':
         return {'error': 'Unauthorized'}, 403
     
-    subject_id = request.form.get('subject_id')
+    subject_id = request.form.get('subject_id', type=int)
     title = request.form.get('title')
     description = request.form.get('description')
     due_date = request.form.get('due_date')
     
     conn = get_db_connection()
+    if not teaches(conn, session['user_id'], subject_id):
+        return {'error': 'You do not teach this subject'}, 403
     conn.execute('''
         INSERT INTO assignments (subject_id, title, description, due_date, status)
         VALUES (?, ?, ?, ?, 'pending')
     ''', (subject_id, title, description, due_date))
+    bump_data_version(conn, 'assignments')
     conn.commit()
-    conn.close()
     
     flash('Assignment added successfully!', 'success')
     return redirect(url_for('faculty_assignments'))
@@ -1130,13 +3832,15 @@ def edit_assignment(assignment_id):
     status = request.form.get('status')
     
     conn = get_db_connection()
+    if not teaches_assignment(conn, session['user_id'], assignment_id):
+        return {'error': 'You do not teach this subject'}, 403
     conn.execute('''
         UPDATE assignments 
         SET title = ?, description = ?, due_date = ?, status = ?
         WHERE id = ?
     ''', (title, description, due_date, status, assignment_id))
+    bump_data_version(conn, 'assignments')
     conn.commit()
-    conn.close()
     
     flash('Assignment updated successfully!', 'success')
     return redirect(url_for('faculty_assignments'))
@@ -1150,9 +3854,11 @@ def delete_assignment(assignment_id):
         return {'error': 'Unauthorized'}, 403
     
     conn = get_db_connection()
+    if not teaches_assignment(conn, session['user_id'], assignment_id):
+        return {'error': 'You do not teach this subject'}, 403
     conn.execute('DELETE FROM assignments WHERE id = ?', (assignment_id,))
+    bump_data_version(conn, 'assignments')
     conn.commit()
-    conn.close()
     
     flash('Assignment deleted successfully!', 'success')
     return redirect(url_for('faculty_assignments'))
@@ -1160,31 +3866,37 @@ def delete_assignment(assignment_id):
 
 @app.route('/faculty/reports')
 @login_required
+@conditional('students', 'users')
 def faculty_reports():
     """View all students and their reports"""
     if session['user_type'] != 'faculty':
         return {'error': 'Unauthorized'}, 403
     
     conn = get_db_connection()
+    filters, where, params = student_list_filters(request.args)
     
-    # Get all students with basic info
-    students = conn.execute('''
-        SELECT 
-            s.id,
-            s.student_id,
-            u.full_name,
-            s.program,
-            s.semester,
-            s.cgpa,
-            u.email
-        FROM students s
-        JOIN users u ON s.user_id = u.id
-        ORDER BY u.full_name
-    ''').fetchall()
+    # One page of students with basic info
+    students, next_cursor = keyset_page(
+        conn, 's.id, s.student_id, u.full_name, s.program, s.semester, s.cgpa, u.email',
+        'students s JOIN users u ON s.user_id = u.id', where, params,
+        STUDENT_SORTS[filters['sort']], descending=filters['order'] == 'desc',
+        cursor=request.args.get('cursor'), page_size=page_size_arg(request.args))
+    if request.args.get('partial'):
+        return render_list_page('faculty_reports_popup.html', 'faculty_report_rows.html', next_cursor,
+                                students=students)
     
-    conn.close()
+    # Summary over every matching student, not just this page
+    summary = conn.execute(f'''
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(s.cgpa >= 8.0), 0) AS excellent,
+               COALESCE(AVG(s.cgpa), 0.0) AS average
+        FROM students s
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+    ''', params).fetchone()
     
-    return render_template('faculty_reports_popup.html', students=students)
+    return render_list_page('faculty_reports_popup.html', 'faculty_report_rows.html', next_cursor,
+                            students=students, summary=summary, filters=filters,
+                            programs=student_programs(conn))
 
 
 @app.route('/faculty/student-detail/<int:student_id>')
@@ -1211,39 +3923,184 @@ def student_detail(student_id):
         WHERE s.id = ?
     ''', (student_id,)).fetchone()
     
-    # Get attendance details
-    attendance = conn.execute('''
-        SELECT 
-            s.subject_name,
-            s.subject_code,
-            a.total_classes,
-            a.attended_classes,
-            CAST(a.attended_classes AS FLOAT) / a.total_classes * 100 as percentage
-        FROM attendance a
-        JOIN subjects s ON a.subject_id = s.id
-        WHERE a.student_id = ?
-    ''', (student_id,)).fetchall()
+    # Get attendance details (subjects with no classes held yet are left out)
+    attendance = attendance_by_subject(conn, student_id)
     
-    # Get assignments status
+    # Get assignments status for the subjects the student is enrolled in
     assignments = conn.execute('''
         SELECT 
             a.title,
             s.subject_name,
             a.due_date,
             a.status
-        FROM assignments a
-        JOIN subjects s ON a.subject_id = s.id
+        FROM subject_roster r
+        JOIN subjects s ON r.subject_id = s.id
+        JOIN assignments a ON a.subject_id = s.id
+        WHERE r.student_id = ?
         ORDER BY a.due_date DESC
-    ''').fetchall()
-    
-    conn.close()
+    ''', (student_id,)).fetchall()
     
     return render_template('student_detail_popup.html', 
                          student=student, 
                          attendance=attendance,
-                         assignments=assignments)
+                         assignments=assignments,
+                         grades=student_grades(conn, student_id),
+                         grade_points=GRADE_POINTS)
+
+
+@app.route('/faculty/grade', methods=['POST'])
+@login_required
+def faculty_set_grade():
+    """Record or change one student's grade in a subject"""
+    if session['user_type'] != 'faculty':
+        return {'error': 'Unauthorized'}, 403
+    
+    student_id = request.form.get('student_id', type=int)
+    semester = request.form.get('semester', type=int)
+    grade = request.form.get('grade', '').strip().upper()
+    if student_id is None:
+        return {'error': 'student_id must be a number'}, 400
+    if grade not in GRADE_POINTS or not semester:
+        return {'error': f"grade must be one of {', '.join(GRADE_POINTS)} and semester a number"}, 400
+    
+    conn = get_db_connection()
+    subject = conn.execute('SELECT id FROM subjects WHERE subject_code = ?',
+                           (request.form.get('subject_code', '').strip(),)).fetchone()
+    if subject is None:
+        return {'error': 'Unknown subject'}, 404
+    # Only the subject's own faculty may grade it, and only its enrolled students
+    if not teaches(conn, session['user_id'], subject['id']):
+        return {'error': 'You do not teach this subject'}, 403
+    if conn.execute('SELECT 1 FROM subject_roster WHERE subject_id = ? AND student_id = ?',
+                    (subject['id'], student_id)).fetchone() is None:
+        return {'error': 'Student is not enrolled in this subject'}, 403
+    cgpa = set_grade(conn, student_id, subject['id'], grade, semester)
+    if cgpa is None:
+        return {'error': 'Unknown student or subject'}, 404
+    return {'student_id': student_id, 'cgpa': cgpa}
+
+# ==================== EXPORT ROUTES ====================
+
+@app.route('/export/<dataset>.<fmt>')
+@staff_required
+def export_data(dataset, fmt):
+    """Stream a dataset as CSV or NDJSON; ?gzip=1 compresses it"""
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        return {'error': 'Unknown export'}, 404
+    if session['user_type'] not in EXPORT_DATASETS[dataset][0]:
+        return {'error': 'Unauthorized'}, 403
+    # Faculty export only their own subjects' rosters
+    subject_ids = None
+    if session['user_type'] == 'faculty':
+        subject_ids = taught_subject_ids(get_db_connection(), session['user_id'])
+        subject_id = request.args.get('subject_id', type=int)
+        if subject_id is not None and subject_id not in subject_ids:
+            return {'error': 'You do not teach this subject'}, 403
+
+    sql, params = export_query(dataset, request.args, subject_ids)
+    chunks = export_chunks(sql, params, fmt)
+    filename = f'{dataset}.{fmt}'
+    mimetype = EXPORT_FORMATS[fmt]
+    if request.args.get('gzip'):
+        chunks = compress_stream(chunks, 'gzip', request.endpoint)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+# ==================== COMMAND LINE ====================
+
+@app.cli.command('init-db')
+@click.option('--scale', default=0.0, show_default=True,
+              help='Also generate scale * SCALE_DATA_ROWS synthetic rows.')
+@click.option('--seed', default=0, show_default=True, help='Random seed for the generated rows.')
+def init_db_command(scale, seed):
+    """Create a new database with the schema and sample data."""
+    database = app.config['DATABASE']
+    if os.path.exists(database):
+        raise click.ClickException(f'{database} already exists; run `flask migrate` to update its schema')
+    init_db(scale, seed)
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create the database, or bring an existing one up to the current schema."""
+    click.echo(f"{app.config['DATABASE']}: {migrate_db()}")
+
+@app.cli.command('import-users')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+def import_users_command(csv_file):
+    """Bulk-create students and faculty from CSV_FILE."""
+    conn = get_db_connection()
+    start = time.perf_counter()
+    report = import_users(conn, csv.DictReader(csv_file))
+    for line, message in report['errors']:
+        click.echo(f'line {line}: {message}', err=True)
+    if report['error_count'] > len(report['errors']):
+        click.echo(f"... and {report['error_count'] - len(report['errors'])} more errors", err=True)
+    click.echo(f"Imported {report['imported']} users, {report['error_count']} rows rejected "
+               f"in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('publish-results')
+@click.argument('semester', type=int)
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+def publish_results_command(semester, csv_file):
+    """Publish SEMESTER's grades from CSV_FILE and recompute CGPAs."""
+    conn = get_db_connection()
+    start = time.perf_counter()
+    report = publish_results(conn, semester, csv.DictReader(csv_file))
+    for line, message in report['errors']:
+        click.echo(f'line {line}: {message}', err=True)
+    if report['error_count'] > len(report['errors']):
+        click.echo(f"... and {report['error_count'] - len(report['errors'])} more errors", err=True)
+    click.echo(f"Published {report['published']} grades for {report['students']} students, "
+               f"{report['error_count']} rows rejected in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('enroll')
+@click.argument('subject_code')
+@click.argument('roll_numbers', nargs=-1)
+@click.option('--faculty', 'faculty_code', help='faculty_id of a faculty member who teaches the subject.')
+def enroll_command(subject_code, roll_numbers, faculty_code):
+    """Enroll the students with ROLL_NUMBERS in SUBJECT_CODE."""
+    conn = get_db_connection()
+    subject = conn.execute('SELECT id FROM subjects WHERE subject_code = ?', (subject_code,)).fetchone()
+    if subject is None:
+        raise click.ClickException(f'Unknown subject {subject_code}')
+    if faculty_code:
+        faculty = conn.execute('SELECT id FROM faculty WHERE faculty_id = ?', (faculty_code,)).fetchone()
+        if faculty is None:
+            raise click.ClickException(f'Unknown faculty {faculty_code}')
+        assign_subject(conn, faculty['id'], subject['id'])
+    student_ids = [row['id'] for row in conn.execute('''
+        SELECT id FROM students WHERE student_id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(roll_numbers),))]
+    added = enroll_students(conn, subject['id'], student_ids)
+    click.echo(f'Enrolled {added} students in {subject_code}, '
+               f'{len(roll_numbers) - len(student_ids)} unknown, {len(student_ids) - added} already enrolled')
+
+@app.cli.command('generate-data')
+@click.option('--scale', default=1.0, show_default=True,
+              help='Multiple of SCALE_DATA_ROWS (1.0 = 50k students).')
+@click.option('--seed', default=0, show_default=True, help='Random seed; a seed can be used once per database.')
+def generate_data_command(scale, seed):
+    """Add synthetic students, faculty, subjects, drives and events."""
+    conn = get_db_connection()
+    start = time.perf_counter()
+    counts = insert_scale_data(conn, scale, seed)
+    for table, rows in counts.items():
+        click.echo(f'{table:<22}{rows:>10}')
+    click.echo(f'Generated in {time.perf_counter() - start:.1f}s')
+
+@app.cli.command('precompile-templates')
+def precompile_templates_command():
+    """Compile every template into the bytecode cache."""
+    start = time.perf_counter()
+    names = precompile_templates()
+    click.echo(f'Compiled {len(names)} templates into {TEMPLATE_CACHE_DIR} '
+               f'in {(time.perf_counter() - start) * 1000:.0f} ms')
 
 # ==================== RUN APPLICATION ====================
 
 if __name__ == '__main__':
+    migrate_db()
     app.run(debug=True)
@@ -0,0 +1,1143 @@
+"""
+Benchmarks for the University Management System.
+
+Usage:
+    python benchmark.py pool [--requests 300] [--workers 2]
+    python benchmark.py save-attendance [--students 1000 10000 50000]
+    python benchmark.py routes [--targets test-client gunicorn] [--datasets small medium large]
+                               [--concurrency 8] [--compare previous.json]
+    python benchmark.py drive-burst [--applicants 2000] [--capacity 150] [--withdrawals 50]
+    python benchmark.py event-burst [--modes sync write-behind] [--users 300] [--events 10]
+    python benchmark.py attendance-report [--students 5000 50000] [--subjects 8] [--threshold 75]
+    python benchmark.py publish-results [--students 1000 10000] [--subjects 6]
+    python benchmark.py eligibility [--dataset large] [--lookups 1000]
+    python benchmark.py roster [--dataset large] [--faculty 20]
+    python benchmark.py search [--dataset large] [--queries 500]
+    python benchmark.py startup [--modes cold bytecode-cache preload] [--workers 4] [--repeat 5]
+
+Each benchmark works on a temporary copy of the database so the real
+database/university.db is never modified.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DATABASE = os.path.join(BASE_DIR, 'database', 'university.db')
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmark-results')
+
+STUDENT_LOGIN = {'username': '2024002', 'password': 'pass123'}
+ADMIN_LOGIN = {'username': 'admin', 'password': 'admin123'}
+
+
+# ==================== HELPERS ====================
+
+def copy_database(workdir):
+    """Copy the sample database into workdir, migrate it and return its path"""
+    path = os.path.join(workdir, 'university.db')
+    shutil.copyfile(SOURCE_DATABASE, path)
+    load_app(path).migrate_db()
+    return path
+
+
+def load_app(database):
+    """Import app.py against the given database path"""
+    sys.path.insert(0, BASE_DIR)
+    import app
+    app.use_database(database)
+    return app
+
+
+def add_students(conn, count):
+    """Bulk insert count extra students (and their users)"""
+    start = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0] + 1
+    conn.executemany(
+        "INSERT INTO users (id, username, password, user_type, full_name) VALUES (?, ?, 'pass123', 'student', ?)",
+        ((uid, f'bench{uid}', f'Student {uid}') for uid in range(start, start + count)))
+    conn.executemany(
+        "INSERT INTO students (user_id, student_id, program, semester) VALUES (?, ?, 'Computer Science', 6)",
+        ((uid, f'B{uid}') for uid in range(start, start + count)))
+    conn.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds"""
+    return {
+        'mean': statistics.mean(samples) * 1000,
+        'p50': percentile(samples, 50) * 1000,
+        'p95': percentile(samples, 95) * 1000,
+        'p99': percentile(samples, 99) * 1000,
+    }
+
+
+def start_gunicorn(database, port, workers, env=None):
+    """Start gunicorn serving app:app and wait until it accepts connections"""
+    proc_env = dict(os.environ, UMS_DATABASE=database, **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=BASE_DIR, env=proc_env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def stop_gunicorn(proc):
+    proc.terminate()
+    proc.wait(timeout=10)
+
+
+def logged_in_opener(base_url, credentials):
+    """A urllib opener holding a logged-in session cookie"""
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode(credentials).encode()
+    response = opener.open(f'{base_url}/login', data=data)
+    response.read()
+    if response.geturl().endswith('/login'):
+        raise RuntimeError(f"login failed for {credentials['username']}")
+    return opener
+
+
+def time_requests(opener, url, count):
+    """Issue count GET requests and return the per-request latencies"""
+    opener.open(url).read()  # warm up
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        opener.open(url).read()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ==================== BENCHMARKS ====================
+
+def bench_pool(args):
+    """Per-request latency of /dashboard and /placements with and without the connection pool"""
+    routes = ['/dashboard', '/placements']
+    configs = [('no pool', '0'), (f'pool of {args.pool_size}', str(args.pool_size))]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = copy_database(workdir)
+        results = {}
+        for label, pool_size in configs:
+            port = free_port()
+            proc = start_gunicorn(database, port, args.workers, {'UMS_DB_POOL_SIZE': pool_size})
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                opener = logged_in_opener(base_url, STUDENT_LOGIN)
+                for route in routes:
+                    samples = time_requests(opener, base_url + route, args.requests)
+                    results[(label, route)] = summarize(samples)
+            finally:
+                stop_gunicorn(proc)
+
+    print(f"{'config':<14}{'route':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for (label, route), stats in results.items():
+        print(f"{label:<14}{route:<14}{stats['mean']:>10.2f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}")
+
+
+def legacy_save_attendance(conn, subject_id, attended_students):
+    """The original per-student loop from save_attendance, kept for comparison"""
+    cursor = conn.cursor()
+    students = conn.execute('''
+        SELECT s.id, a.id as attendance_id
+        FROM students s
+        LEFT JOIN attendance a ON s.id = a.student_id AND a.subject_id = ?
+    ''', (subject_id,)).fetchall()
+    for student in students:
+        is_present = str(student['id']) in attended_students
+        if student['attendance_id']:
+            cursor.execute('''
+                UPDATE attendance
+                SET total_classes = total_classes + 1,
+                    attended_classes = attended_classes + ?
+                WHERE id = ?
+            ''', (1 if is_present else 0, student['attendance_id']))
+        else:
+            cursor.execute('''
+                INSERT INTO attendance (student_id, subject_id, total_classes, attended_classes)
+                VALUES (?, ?, 1, ?)
+            ''', (student['id'], subject_id, 1 if is_present else 0))
+    conn.commit()
+
+
+def bench_save_attendance(args):
+    """Time one save_attendance click for growing student counts, old loop vs set-based upsert"""
+    rng = random.Random(args.seed)
+    print(f"{'students':>10}{'legacy ms':>14}{'set-based ms':>14}{'speedup':>10}")
+    for count in args.students:
+        with tempfile.TemporaryDirectory() as workdir:
+            app = load_app(os.path.join(workdir, 'university.db'))
+            app.init_db()
+            conn = app.connect_db()
+            add_students(conn, count)
+            ids = [row[0] for row in conn.execute('SELECT id FROM students')]
+            app.enroll_students(conn, 1, ids)
+            present = rng.sample(ids, min(args.seats, len(ids)))
+
+            legacy, set_based = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                legacy_save_attendance(conn, 1, [str(sid) for sid in present])
+                legacy.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                app.record_attendance(conn, 1, set(present))
+                set_based.append(time.perf_counter() - start)
+            conn.close()
+
+        legacy_ms = statistics.median(legacy) * 1000
+        set_ms = statistics.median(set_based) * 1000
+        print(f"{count:>10}{legacy_ms:>14.1f}{set_ms:>14.1f}{legacy_ms / set_ms:>9.1f}x")
+
+
+# ==================== ROUTE BENCHMARK ====================
+
+# Dataset name -> insert_sample_data() scale factor
+DATASET_SCALES = {'small': 0.01, 'medium': 0.1, 'large': 1.0}
+DATASET_SEED = 7
+
+# (name, role, method, path, request data); {placeholders} and data callables
+# are filled per request from the simulated user's random choices
+ROUTE_CASES = [
+    ('login', None, 'POST', '/login', lambda user, rng, ids: user['credentials']),
+    ('dashboard', 'student', 'GET', '/dashboard', None),
+    ('academics', 'student', 'GET', '/academics', None),
+    ('placements', 'student', 'GET', '/placements', None),
+    ('events', 'student', 'GET', '/events', None),
+    ('apply_drive', 'student', 'POST', '/apply-drive',
+     lambda user, rng, ids: {'drive_id': rng.choice(ids['drives'])}),
+    ('register_event', 'student', 'POST', '/register-event/{event_id}', None),
+    ('faculty_dashboard', 'faculty', 'GET', '/dashboard', None),
+    ('faculty_classes', 'faculty', 'GET', '/faculty/classes', None),
+    ('faculty_assignments', 'faculty', 'GET', '/faculty/assignments', None),
+    ('faculty_reports', 'faculty', 'GET', '/faculty/reports', None),
+    ('mark_attendance', 'faculty', 'GET', '/faculty/mark-attendance/{subject_id}', None),
+    ('save_attendance', 'faculty', 'POST', '/faculty/save-attendance',
+     lambda user, rng, ids: {'subject_id': user['subject_id'], 'attended[]': user['present']}),
+    ('admin_dashboard', 'admin', 'GET', '/admin/dashboard', None),
+    ('admin_students', 'admin', 'GET', '/admin/students', None),
+    ('admin_faculties', 'admin', 'GET', '/admin/faculties', None),
+    ('admin_placements', 'admin', 'GET', '/admin/placements', None),
+]
+
+
+def build_dataset(workdir, name):
+    """Create a seeded database for one of DATASET_SCALES and return its path"""
+    database = os.path.join(workdir, f'{name}.db')
+    start = time.perf_counter()
+    app = load_app(database)
+    app.init_db()
+    conn = app.connect_db()
+    app.insert_scale_data(conn, DATASET_SCALES[name], DATASET_SEED)
+    conn.close()
+    print(f'built {name} dataset in {time.perf_counter() - start:.1f}s')
+    return database
+
+
+def simulated_users(database, count, seed):
+    """Login details and request targets for `count` users of each role"""
+    conn = load_app(database).connect_db()
+    ids = {
+        'drives': [row[0] for row in conn.execute('SELECT id FROM placement_drives')],
+        'events': [row[0] for row in conn.execute('SELECT id FROM events')],
+        'subjects': [row[0] for row in conn.execute('SELECT id FROM subjects')],
+    }
+    users = {}
+    for role in ('student', 'faculty', 'admin'):
+        rows = conn.execute('''
+            SELECT username, password FROM users WHERE user_type = ? ORDER BY id LIMIT ?
+        ''', (role, count)).fetchall()
+        users[role] = [{'credentials': {'username': row[0], 'password': row[1]}} for row in rows]
+    rng = random.Random(seed)
+    for user in users['faculty']:
+        # Each faculty member marks one of their subjects, with most of its roster present
+        user['subject_id'] = rng.choice([row[0] for row in conn.execute('''
+            SELECT fs.subject_id FROM users u
+            JOIN faculty f ON f.user_id = u.id
+            JOIN faculty_subjects fs ON fs.faculty_id = f.id
+            WHERE u.username = ?
+        ''', (user['credentials']['username'],))])
+        roster = [row[0] for row in conn.execute(
+            'SELECT student_id FROM subject_roster WHERE subject_id = ?', (user['subject_id'],))]
+        user['present'] = [str(sid) for sid in rng.sample(roster, int(len(roster) * 0.8))]
+    conn.close()
+    return users, ids
+
+
+class TestClientSession:
+    """A simulated user driving the app in-process through Flask's test client"""
+
+    def __init__(self, app):
+        self.client = app.app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """A simulated user talking to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def run_route(sessions, users, ids, case, requests_per_user, seed):
+    """Fire requests_per_user requests per simulated user at once; return the latency summary"""
+    name, role, method, path, data = case
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = sessions[index]
+        user = users[index]
+        samples, errors = [], 0
+        # The first request warms up template and query caches and is not timed
+        for n in range(requests_per_user + 1):
+            url = path.format(event_id=rng.choice(ids['events']), subject_id=user.get('subject_id'))
+            form = data(user, rng, ids) if data else None
+            start = time.perf_counter()
+            status = session.request(method, url, form)
+            if n:
+                samples.append(time.perf_counter() - start)
+                errors += status >= 400
+        return samples, errors
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(len(sessions)) as pool:
+        results = list(pool.map(worker, range(len(sessions))))
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for worker_samples, _ in results for sample in worker_samples]
+    stats = {key + '_ms': round(value, 3) for key, value in summarize(samples).items()}
+    stats.update({
+        'requests': len(samples),
+        'errors': sum(errors for _, errors in results),
+        'throughput_rps': round(len(samples) / elapsed, 1),
+    })
+    return stats
+
+
+def bench_target(make_session, database, args, cases):
+    """Run every route case against one target; returns {route: stats}"""
+    users, ids = simulated_users(database, args.concurrency, args.seed)
+    sessions = {}
+    for role, role_users in users.items():
+        sessions[role] = []
+        for user in role_users:
+            session = make_session()
+            if session.request('POST', '/login', user['credentials']) != 302:
+                raise RuntimeError(f"login failed for {user['credentials']['username']}")
+            sessions[role].append(session)
+
+    results = {}
+    for case in cases:
+        name, role = case[0], case[1]
+        # Logins are measured for students on fresh sessions
+        role_sessions = sessions[role] if role else [make_session() for _ in users['student']]
+        results[name] = run_route(role_sessions, users[role or 'student'], ids, case,
+                                  args.requests, args.seed)
+        stats = results[name]
+        print(f"  {name:<22}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['errors']:>8}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(previous, current, threshold):
+    """Print p50/p99 changes against an earlier run; returns the number of regressions"""
+    before = {(run['target'], run['dataset']): run['routes'] for run in previous['runs']}
+    regressions = 0
+    print(f"\nchange vs {previous.get('git_commit') or 'previous run'} ({previous['created']})")
+    for run in current['runs']:
+        old_routes = before.get((run['target'], run['dataset']))
+        if not old_routes:
+            continue
+        print(f"{run['target']} / {run['dataset']}")
+        for name, stats in run['routes'].items():
+            if name not in old_routes:
+                continue
+            changes, regressed = [], False
+            for key in ('p50_ms', 'p99_ms'):
+                old = old_routes[name][key]
+                change = (stats[key] - old) / old * 100 if old else 0.0
+                changes.append(f'{key[:3]} {change:+6.1f}%')
+                regressed = regressed or change > threshold
+            regressions += regressed
+            print(f"  {name:<22}{'  '.join(changes)}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def bench_routes(args):
+    """p50/p95/p99 latency and throughput of every route, per dataset size and target"""
+    cases = [case for case in ROUTE_CASES if not args.routes or case[0] in args.routes]
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'concurrency': args.concurrency,
+        'requests_per_user': args.requests,
+        'seed': args.seed,
+        'runs': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for dataset in args.datasets:
+            database = build_dataset(workdir, dataset)
+            for target in args.targets:
+                # Every target starts from the same data
+                run_database = os.path.join(workdir, f'{dataset}-{target}.db')
+                shutil.copyfile(database, run_database)
+                print(f"{target} / {dataset}: {args.concurrency} users x {args.requests} requests per route")
+                print(f"  {'route':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+                if target == 'test-client':
+                    bench_app = load_app(run_database)
+                    routes = bench_target(lambda: TestClientSession(bench_app), run_database, args, cases)
+                else:
+                    port = free_port()
+                    proc = start_gunicorn(run_database, port, args.workers)
+                    try:
+                        base_url = f'http://127.0.0.1:{port}'
+                        routes = bench_target(lambda: HttpSession(base_url), run_database, args, cases)
+                    finally:
+                        stop_gunicorn(proc)
+                report['runs'].append({
+                    'target': target,
+                    'dataset': dataset,
+                    'scale': DATASET_SCALES[dataset],
+                    'routes': routes,
+                })
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"routes-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nresults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), report, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+# ==================== DRIVE REGISTRATION BURST ====================
+
+def drive_counts(conn, drive_id):
+    """(registered, waitlisted) for a drive"""
+    counts = dict(conn.execute('''
+        SELECT status, COUNT(*) FROM drive_registrations WHERE drive_id = ? GROUP BY status
+    ''', (drive_id,)).fetchall())
+    return counts.get('Registered', 0), counts.get('Waitlisted', 0)
+
+
+def fire_at_once(sessions, path, data_for):
+    """POST to path from every session at the same moment; returns (statuses, seconds)"""
+    start_signal = threading.Event()
+    statuses = [None] * len(sessions)
+
+    def worker(index):
+        start_signal.wait()
+        statuses[index] = sessions[index].request('POST', path, data_for(index))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(sessions))]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    start_signal.set()
+    for thread in threads:
+        thread.join()
+    return statuses, time.perf_counter() - start
+
+
+def bench_drive_burst(args):
+    """Concurrent applications to one capped drive: no overbooking, ordered waitlist promotion"""
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'university.db')
+        app = load_app(database)
+        app.init_db()
+        conn = app.connect_db()
+        add_students(conn, args.applicants)
+        drive_id = conn.execute('''
+            INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, min_cgpa, capacity)
+            VALUES ('Burst Corp', 'Engineer', 'All', date('now', '+7 days'), 0, ?)
+        ''', (args.capacity,)).lastrowid
+        conn.commit()
+        applicants = conn.execute('''
+            SELECT u.username, s.id FROM users u JOIN students s ON s.user_id = u.id
+            WHERE u.username LIKE 'bench%' ORDER BY u.id
+        ''').fetchall()
+
+        port = free_port()
+        proc = start_gunicorn(database, port, args.workers)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            sessions = [HttpSession(base_url) for _ in applicants]
+            with concurrent.futures.ThreadPoolExecutor(32) as pool:
+                logins = list(pool.map(
+                    lambda pair: pair[0].request('POST', '/login', {'username': pair[1][0], 'password': 'pass123'}),
+                    zip(sessions, applicants)))
+            if any(status != 302 for status in logins):
+                raise RuntimeError('applicant login failed')
+
+            print(f'{len(sessions)} applicants, {args.capacity} seats, {args.workers} gunicorn workers')
+            statuses, elapsed = fire_at_once(sessions, '/apply-drive', lambda i: {'drive_id': drive_id})
+            errors = sum(status != 302 for status in statuses)
+            registered, waitlisted = drive_counts(conn, drive_id)
+            print(f'apply burst:    {elapsed:6.2f}s  {len(statuses) / elapsed:8.0f} req/s  '
+                  f'{registered} registered, {waitlisted} waitlisted, {errors} HTTP errors')
+            if registered != min(args.capacity, len(applicants)):
+                failures.append(f'{registered} registered for {args.capacity} seats')
+            if registered + waitlisted != len(applicants):
+                failures.append(f'{len(applicants) - registered - waitlisted} applications lost')
+            if errors:
+                failures.append(f'{errors} HTTP errors')
+
+            # Registered students withdraw at once; the earliest applicants
+            # on the waitlist must take exactly the freed seats
+            rows = conn.execute('''
+                SELECT student_id, status FROM drive_registrations WHERE drive_id = ? ORDER BY id
+            ''', (drive_id,)).fetchall()
+            waitlist = [row[0] for row in rows if row[1] == 'Waitlisted']
+            session_of = {student_id: sessions[i] for i, (_, student_id) in enumerate(applicants)}
+            leaving = random.Random(args.seed).sample(
+                [row[0] for row in rows if row[1] == 'Registered'], min(args.withdrawals, registered))
+            statuses, elapsed = fire_at_once([session_of[student_id] for student_id in leaving], '/withdraw-drive',
+                                             lambda i: {'drive_id': drive_id})
+            registered, waitlisted = drive_counts(conn, drive_id)
+            promoted = {row[0] for row in conn.execute('''
+                SELECT student_id FROM drive_registrations
+                WHERE drive_id = ? AND status = 'Registered'
+            ''', (drive_id,))} & set(waitlist)
+            print(f'withdraw burst: {elapsed:6.2f}s  {len(leaving)} withdrew, {len(promoted)} promoted from the waitlist, '
+                  f'{registered} registered, {waitlisted} waitlisted')
+            if registered != min(args.capacity, len(applicants) - len(leaving)):
+                failures.append(f'{registered} registered for {args.capacity} seats after withdrawals')
+            if promoted != set(waitlist[:len(promoted)]) or len(promoted) != min(len(leaving), len(waitlist)):
+                failures.append('waitlist was not promoted in application order')
+        finally:
+            stop_gunicorn(proc)
+            conn.close()
+
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if failures:
+        sys.exit(1)
+    print('OK: no overbooking, waitlist promoted in order')
+
+
+# ==================== EVENT REGISTRATION BURST ====================
+
+# mode -> UMS_EVENT_WRITE_BEHIND
+EVENT_WRITE_MODES = {'sync': '0', 'write-behind': '1'}
+
+
+def bench_event_burst(args):
+    """Registration throughput with synchronous inserts vs the write-behind queue, and no loss on shutdown"""
+    failures = []
+    print(f'{args.users} users x {args.events} events each, {args.workers} gunicorn workers')
+    print(f"{'mode':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'stored':>10}")
+    results = {}
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            database = os.path.join(workdir, 'university.db')
+            app = load_app(database)
+            app.init_db()
+            conn = app.connect_db()
+            add_students(conn, args.users)
+            first_event = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM events').fetchone()[0]
+            conn.executemany('''
+                INSERT INTO events (id, event_name, event_type, event_date) VALUES (?, ?, 'Fest', date('now', '+7 days'))
+            ''', ((first_event + i, f'Fest event {i}') for i in range(args.events)))
+            conn.commit()
+            usernames = [row[0] for row in conn.execute("SELECT username FROM users WHERE username LIKE 'bench%'")]
+            conn.close()
+
+            port = free_port()
+            proc = start_gunicorn(database, port, args.workers, {'UMS_EVENT_WRITE_BEHIND': EVENT_WRITE_MODES[mode]})
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                sessions = [HttpSession(base_url) for _ in usernames]
+                with concurrent.futures.ThreadPoolExecutor(32) as pool:
+                    list(pool.map(lambda pair: pair[0].request('POST', '/login',
+                                                               {'username': pair[1], 'password': 'pass123'}),
+                                  zip(sessions, usernames)))
+
+                start_signal = threading.Event()
+                samples, errors = [[] for _ in sessions], [0] * len(sessions)
+
+                def worker(index):
+                    start_signal.wait()
+                    for event_id in range(first_event, first_event + args.events):
+                        request_start = time.perf_counter()
+                        if sessions[index].request('POST', f'/register-event/{event_id}') != 302:
+                            errors[index] += 1
+                        samples[index].append(time.perf_counter() - request_start)
+
+                threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(sessions))]
+                for thread in threads:
+                    thread.start()
+                start = time.perf_counter()
+                start_signal.set()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+            finally:
+                # Graceful shutdown must write everything that was acknowledged
+                stop_gunicorn(proc)
+
+            conn = sqlite3.connect(database)
+            stored = conn.execute('SELECT COUNT(*) FROM event_registrations WHERE event_id >= ?',
+                                  (first_event,)).fetchone()[0]
+            conn.close()
+
+        latencies = [sample for user_samples in samples for sample in user_samples]
+        stats = summarize(latencies)
+        results[mode] = len(latencies) / elapsed
+        print(f"{mode:<14}{results[mode]:>10.0f}{stats['p50']:>10.2f}{stats['p99']:>10.2f}"
+              f"{sum(errors):>8}{stored:>10}")
+        if stored != args.users * args.events:
+            failures.append(f'{mode}: {stored} of {args.users * args.events} registrations stored')
+        if sum(errors):
+            failures.append(f'{mode}: {sum(errors)} HTTP errors')
+
+    if len(results) == 2:
+        print(f"write-behind throughput: {results['write-behind'] / results['sync']:.1f}x sync")
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if failures:
+        sys.exit(1)
+
+
+# ==================== ATTENDANCE SHORTAGE REPORT ====================
+
+def add_attendance(conn, subjects, seed):
+    """Give every student random attendance counters in `subjects` new subjects taught by
+    faculty1; returns the row count and the subject ids"""
+    rng = random.Random(seed)
+    first = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM subjects').fetchone()[0]
+    subject_ids = list(range(first, first + subjects))
+    conn.executemany("INSERT INTO subjects (id, subject_code, subject_name, credits) VALUES (?, ?, ?, 4)",
+                     ((subject_id, f'BENCH{i}', f'Bench subject {i}') for i, subject_id in enumerate(subject_ids)))
+    conn.executemany('''
+        INSERT INTO faculty_subjects (faculty_id, subject_id)
+        SELECT f.id, ? FROM faculty f JOIN users u ON f.user_id = u.id WHERE u.username = 'faculty1'
+    ''', ((subject_id,) for subject_id in subject_ids))
+    conn.execute('DELETE FROM attendance')
+    student_ids = [row[0] for row in conn.execute('SELECT id FROM students')]
+
+    def rows():
+        for student_id in student_ids:
+            for subject_id in subject_ids:
+                total = rng.randint(0, 60)
+                attended = round(total * min(rng.gauss(0.88, 0.07), 1.0))
+                yield student_id, subject_id, total, max(attended, 0)
+    conn.executemany('''
+        INSERT INTO attendance (student_id, subject_id, total_classes, attended_classes) VALUES (?, ?, ?, ?)
+    ''', rows())
+    conn.commit()
+    return len(student_ids) * subjects, subject_ids
+
+
+def bench_attendance_report(args):
+    """Time the attendance shortage report of a faculty member teaching every benchmark subject"""
+    print(f"{'students':>10}{'rows':>10}{'engine':>8}{'report ms':>11}{'cached ms':>11}"
+          f"{'route ms':>10}{'short':>8}")
+    for count in args.students:
+        with tempfile.TemporaryDirectory() as workdir:
+            app = load_app(os.path.join(workdir, 'university.db'))
+            app.init_db()
+            conn = app.connect_db()
+            add_students(conn, count)
+            rows, subject_ids = add_attendance(conn, args.subjects, args.seed)
+            conn.close()
+
+            cold, cached = [], []
+            for _ in range(args.repeat):
+                with app.app.app_context():
+                    conn = app.get_db_connection()
+                    app._attendance_reports.clear()
+                    start = time.perf_counter()
+                    report = app.attendance_report(conn, subject_ids, args.threshold)
+                    cold.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    app.attendance_report(conn, subject_ids, args.threshold)
+                    cached.append(time.perf_counter() - start)
+
+            # The whole request, report rebuilt, as the faculty popup sees it
+            client = app.app.test_client()
+            client.post('/login', data={'username': 'faculty1', 'password': 'pass123'})
+            route = []
+            for _ in range(args.repeat):
+                app._attendance_reports.clear()
+                start = time.perf_counter()
+                response = client.get(f'/faculty/attendance-shortage?threshold={args.threshold}')
+                route.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+
+        engine = 'numpy' if app.np is not None else 'python'
+        print(f"{count:>10}{rows:>10}{engine:>8}{statistics.median(cold) * 1000:>11.1f}"
+              f"{statistics.median(cached) * 1000:>11.3f}{statistics.median(route) * 1000:>10.1f}"
+              f"{report['short_students']:>8}")
+
+
+# ==================== RESULTS PUBLISHING ====================
+
+def bench_publish_results(args):
+    """Time publishing a semester's results in one pass against the same grades set one at a time"""
+    rng = random.Random(args.seed)
+    print(f"{'students':>10}{'grades':>10}{'one by one ms':>15}{'bulk ms':>10}{'speedup':>9}{'match':>7}")
+    for count in args.students:
+        with tempfile.TemporaryDirectory() as workdir:
+            app = load_app(os.path.join(workdir, 'university.db'))
+            app.init_db()
+            conn = app.connect_db()
+            add_students(conn, count)
+            first = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM subjects').fetchone()[0]
+            conn.executemany("INSERT INTO subjects (id, subject_code, subject_name, credits) VALUES (?, ?, ?, ?)",
+                             ((first + i, f'BENCH{i}', f'Bench subject {i}', rng.choice((2, 3, 4)))
+                              for i in range(args.subjects)))
+            conn.commit()
+            students = [tuple(row) for row in conn.execute('SELECT id, student_id FROM students')]
+            subjects = [tuple(row) for row in conn.execute('SELECT id, subject_code FROM subjects WHERE id >= ?',
+                                                            (first,))]
+            grades = [(student, subject, rng.choice(list(app.GRADE_POINTS)))
+                      for student in students for subject in subjects]
+            conn.close()
+
+            with app.app.app_context():
+                conn = app.get_db_connection()
+                start = time.perf_counter()
+                for (student_id, _), (subject_id, _), grade in grades:
+                    app.set_grade(conn, student_id, subject_id, grade, 1)
+                one_by_one = time.perf_counter() - start
+                incremental = conn.execute('SELECT id, cgpa FROM students ORDER BY id').fetchall()
+
+                # Publishing the same grades again must land on the same CGPAs
+                rows = [{'student_id': roll, 'subject_code': code, 'grade': grade}
+                        for (_, roll), (_, code), grade in grades]
+                start = time.perf_counter()
+                app.publish_results(conn, 1, rows)
+                bulk = time.perf_counter() - start
+                recomputed = conn.execute('SELECT id, cgpa FROM students ORDER BY id').fetchall()
+                match = [tuple(row) for row in incremental] == [tuple(row) for row in recomputed]
+
+        print(f"{count:>10}{len(grades):>10}{one_by_one * 1000:>15.0f}{bulk * 1000:>10.0f}"
+              f"{one_by_one / bulk:>8.1f}x{'yes' if match else 'NO':>7}")
+
+
+# ==================== ELIGIBILITY INDEX ====================
+
+def bench_eligibility(args):
+    """Eligible counts per drive and eligible drives per student: CGPA index vs one query each"""
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        database = build_dataset(workdir, args.dataset)
+        app = load_app(database)
+        with app.app.app_context():
+            conn = app.get_db_connection()
+            drives = [tuple(row) for row in conn.execute('SELECT id, min_cgpa FROM placement_drives')]
+            students = [tuple(row) for row in conn.execute('SELECT id, cgpa FROM students')]
+            sample = rng.sample(students, min(args.lookups, len(students)))
+
+            start = time.perf_counter()
+            app.eligibility_index(conn)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            per_query = {drive_id: conn.execute('SELECT COUNT(*) FROM students WHERE cgpa >= ?',
+                                                (min_cgpa,)).fetchone()[0]
+                         for drive_id, min_cgpa in drives}
+            counts_sql = time.perf_counter() - start
+            start = time.perf_counter()
+            indexed = app.eligible_counts(conn)
+            counts_index = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for student_id, cgpa in sample:
+                conn.execute('SELECT id FROM placement_drives WHERE min_cgpa <= ?', (cgpa,)).fetchall()
+            lookups_sql = time.perf_counter() - start
+            start = time.perf_counter()
+            for student_id, _ in sample:
+                app.eligible_drive_ids(conn, student_id)
+            lookups_index = time.perf_counter() - start
+
+    # Generated drives only have a CGPA rule, so both sides must agree
+    match = per_query == indexed
+    print(f'{len(students)} students, {len(drives)} drives ({args.dataset} dataset)')
+    print(f'index build                          {build * 1000:>10.1f} ms')
+    print(f"eligible counts, all drives   query {counts_sql * 1000:>10.1f} ms   index {counts_index * 1000:>8.2f} ms"
+          f"   {'match' if match else 'MISMATCH'}")
+    print(f'eligible drives, {len(sample)} students  query {lookups_sql * 1000:>8.1f} ms   '
+          f'index {lookups_index * 1000:>8.2f} ms')
+    if not match:
+        sys.exit(1)
+
+
+# ==================== FACULTY ROSTER BENCHMARK ====================
+
+# The class list and attendance sheet queries from before enrollments, kept for comparison
+LEGACY_CLASS_LIST = '''
+    SELECT s.id, s.subject_code, s.subject_name, s.credits, COUNT(DISTINCT st.id) as student_count
+    FROM subjects s
+    LEFT JOIN attendance a ON s.id = a.subject_id
+    LEFT JOIN students st ON a.student_id = st.id
+    GROUP BY s.id
+'''
+LEGACY_ATTENDANCE_SHEET = '''
+    SELECT s.id, s.student_id, u.full_name, s.program, s.semester,
+           COALESCE(a.total_classes, 0) as total_classes,
+           COALESCE(a.attended_classes, 0) as attended_classes,
+           a.id as attendance_id
+    FROM students s
+    JOIN users u ON s.user_id = u.id
+    LEFT JOIN attendance a ON s.id = a.student_id AND a.subject_id = ?
+    ORDER BY u.full_name
+'''
+
+
+def bench_roster(args):
+    """Faculty class list and attendance sheet: whole-table queries vs the enrollment tables"""
+    with tempfile.TemporaryDirectory() as workdir:
+        database = build_dataset(workdir, args.dataset)
+        app = load_app(database)
+        conn = app.connect_db()
+        teachers = conn.execute('''
+            SELECT u.username, MIN(fs.subject_id), s.enrolled_count
+            FROM faculty f
+            JOIN users u ON f.user_id = u.id
+            JOIN faculty_subjects fs ON fs.faculty_id = f.id
+            JOIN subjects s ON fs.subject_id = s.id
+            GROUP BY f.id
+            ORDER BY f.id
+            LIMIT ?
+        ''', (args.faculty,)).fetchall()
+
+        timings = {'legacy classes': [], 'legacy sheet': [], 'classes route': [], 'sheet route': []}
+        for username, subject_id, _ in teachers:
+            start = time.perf_counter()
+            conn.execute(LEGACY_CLASS_LIST).fetchall()
+            timings['legacy classes'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            legacy_rows = len(conn.execute(LEGACY_ATTENDANCE_SHEET, (subject_id,)).fetchall())
+            timings['legacy sheet'].append(time.perf_counter() - start)
+
+            client = app.app.test_client()
+            client.post('/login', data={'username': username, 'password': 'pass123'}, follow_redirects=True)
+            for key, path in (('classes route', '/faculty/classes'),
+                              ('sheet route', f'/faculty/mark-attendance/{subject_id}')):
+                start = time.perf_counter()
+                response = client.get(path)
+                timings[key].append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    sys.exit(f'{path} as {username}: HTTP {response.status_code}')
+        conn.close()
+
+    sizes = [size for _, _, size in teachers]
+    print(f'{len(teachers)} faculty members, class sizes {min(sizes)}-{max(sizes)}, '
+          f'legacy sheet lists {legacy_rows} students ({args.dataset} dataset)')
+    for key, samples in timings.items():
+        print(f"{key:<16}{'median':>8}{statistics.median(samples) * 1000:>10.2f} ms"
+              f"{'max':>6}{max(samples) * 1000:>10.2f} ms")
+
+
+# ==================== SEARCH BENCHMARK ====================
+
+def search_terms(conn, count, rng):
+    """Typeahead inputs: 2-5 character prefixes of names, roll numbers, events and companies"""
+    words = [row[0] for row in conn.execute('''
+        SELECT full_name FROM users WHERE user_type != 'admin'
+        UNION ALL SELECT student_id FROM students
+        UNION ALL SELECT event_name FROM events
+        UNION ALL SELECT company_name FROM placement_drives
+    ''')]
+    terms = []
+    for _ in range(count):
+        word = rng.choice(rng.choice(words).split())
+        terms.append(word[:rng.randint(2, 5)])
+    return terms
+
+
+def bench_search(args):
+    """Typeahead and full search latency over the FTS5 index through the test client"""
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        database = build_dataset(workdir, args.dataset)
+        app = load_app(database)
+        conn = app.connect_db()
+        terms = search_terms(conn, args.queries, rng)
+        conn.close()
+
+        print(f"{'role':<10}{'endpoint':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for role, credentials in (('admin', ADMIN_LOGIN), ('student', STUDENT_LOGIN)):
+            client = app.app.test_client()
+            client.post('/login', data=credentials, follow_redirects=True)
+            for endpoint in ('/search/suggest', '/search'):
+                client.get(f'{endpoint}?q=warmup')
+                samples = []
+                for term in terms:
+                    start = time.perf_counter()
+                    response = client.get(endpoint, query_string={'q': term})
+                    samples.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        sys.exit(f'{endpoint}?q={term}: HTTP {response.status_code}')
+                stats = summarize(samples)
+                print(f"{role:<10}{endpoint:<18}{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}"
+                      f"{max(samples) * 1000:>9.2f}")
+
+
+# ==================== STARTUP BENCHMARK ====================
+
+# mode -> (gunicorn.conf.py with preload and precompile, bytecode cache filled beforehand)
+STARTUP_MODES = {
+    'cold': (False, False),
+    'bytecode-cache': (False, True),
+    'preload': (True, True),
+}
+FIRST_VIEW_PATHS = ['/dashboard', '/academics', '/placements', '/events', '/profile']
+
+
+def fill_template_cache(database, cache_dir):
+    """Compile every template into cache_dir with the flask CLI"""
+    env = dict(os.environ, UMS_DATABASE=database, UMS_TEMPLATE_CACHE_DIR=cache_dir)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'precompile-templates'],
+                   cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def time_startup(database, workers, config, cache_dir):
+    """Seconds from spawning gunicorn to its first response, and the first view of each page after it"""
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, UMS_DATABASE=database, UMS_TEMPLATE_CACHE_DIR=cache_dir)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config, '-w', str(workers),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=BASE_DIR, env=env,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f'{base_url}/login', timeout=5).read()
+                break
+            except OSError:
+                if time.perf_counter() - start > 30:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.005)
+        first_response = time.perf_counter() - start
+        opener = logged_in_opener(base_url, STUDENT_LOGIN)
+        first_views = {}
+        for path in FIRST_VIEW_PATHS:
+            view_start = time.perf_counter()
+            opener.open(base_url + path).read()
+            first_views[path] = time.perf_counter() - view_start
+        return first_response, first_views
+    finally:
+        stop_gunicorn(proc)
+
+
+def bench_startup(args):
+    """Time from starting gunicorn to its first served request, with and without preloaded templates"""
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'modes': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        database = build_dataset(workdir, 'small')
+        print(f"{'mode':<16}{'first response ms':>19}{'first views ms':>16}{'slowest view ms':>17}")
+        # Settings file equivalent to running without gunicorn.conf.py
+        lazy_config = os.path.join(workdir, 'lazy.conf.py')
+        with open(lazy_config, 'w') as f:
+            f.write('preload_app = False\n')
+
+        for mode in args.modes:
+            preload, warm_cache = STARTUP_MODES[mode]
+            config = os.path.join(BASE_DIR, 'gunicorn.conf.py') if preload else lazy_config
+            responses, view_totals, slowest = [], [], []
+            for run in range(args.repeat):
+                cache_dir = os.path.join(workdir, f'template-cache-{mode}-{run}')
+                if warm_cache:
+                    fill_template_cache(database, cache_dir)
+                first_response, first_views = time_startup(database, args.workers, config, cache_dir)
+                responses.append(first_response)
+                view_totals.append(sum(first_views.values()))
+                slowest.append(max(first_views.values()))
+            report['modes'][mode] = {
+                'first_response_ms': statistics.median(responses) * 1000,
+                'first_views_ms': statistics.median(view_totals) * 1000,
+                'slowest_view_ms': statistics.median(slowest) * 1000,
+            }
+            stats = report['modes'][mode]
+            print(f"{mode:<16}{stats['first_response_ms']:>19.1f}{stats['first_views_ms']:>16.1f}"
+                  f"{stats['slowest_view_ms']:>17.1f}")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nmedians of {args.repeat} runs written to {output}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    pool = subparsers.add_parser('pool', help=bench_pool.__doc__)
+    pool.add_argument('--requests', type=int, default=300)
+    pool.add_argument('--workers', type=int, default=2)
+    pool.add_argument('--pool-size', type=int, default=8)
+    pool.set_defaults(func=bench_pool)
+
+    save = subparsers.add_parser('save-attendance', help=bench_save_attendance.__doc__)
+    save.add_argument('--students', type=int, nargs='+', default=[1000, 10000, 50000])
+    save.add_argument('--seats', type=int, default=300, help='students marked present per class')
+    save.add_argument('--repeat', type=int, default=5)
+    save.add_argument('--seed', type=int, default=42)
+    save.set_defaults(func=bench_save_attendance)
+
+    routes = subparsers.add_parser('routes', help=bench_routes.__doc__)
+    routes.add_argument('--targets', nargs='+', choices=['test-client', 'gunicorn'],
+                        default=['test-client', 'gunicorn'])
+    routes.add_argument('--datasets', nargs='+', choices=list(DATASET_SCALES),
+                        default=list(DATASET_SCALES))
+    routes.add_argument('--routes', nargs='+', choices=[case[0] for case in ROUTE_CASES],
+                        help='only these routes (default: all)')
+    routes.add_argument('--concurrency', type=int, default=8, help='simulated users per role')
+    routes.add_argument('--requests', type=int, default=5, help='requests per user per route')
+    routes.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    routes.add_argument('--seed', type=int, default=42)
+    routes.add_argument('--output', help='results file (default: benchmark-results/routes-<time>.json)')
+    routes.add_argument('--compare', metavar='PREVIOUS_JSON', help='report changes against an earlier run')
+    routes.add_argument('--threshold', type=float, default=20.0,
+                        help='percent slowdown reported as a regression (exit status 1)')
+    routes.set_defaults(func=bench_routes)
+
+    burst = subparsers.add_parser('drive-burst', help=bench_drive_burst.__doc__)
+    burst.add_argument('--applicants', type=int, default=2000)
+    burst.add_argument('--capacity', type=int, default=150, help='seats in the drive')
+    burst.add_argument('--withdrawals', type=int, default=50, help='registered students who withdraw afterwards')
+    burst.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    burst.add_argument('--seed', type=int, default=42)
+    burst.set_defaults(func=bench_drive_burst)
+
+    events = subparsers.add_parser('event-burst', help=bench_event_burst.__doc__)
+    events.add_argument('--modes', nargs='+', choices=list(EVENT_WRITE_MODES), default=list(EVENT_WRITE_MODES))
+    events.add_argument('--users', type=int, default=300)
+    events.add_argument('--events', type=int, default=10, help='events each user registers for')
+    events.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    events.set_defaults(func=bench_event_burst)
+
+    shortage = subparsers.add_parser('attendance-report', help=bench_attendance_report.__doc__)
+    shortage.add_argument('--students', type=int, nargs='+', default=[5000, 50000])
+    shortage.add_argument('--subjects', type=int, default=8, help='attendance rows per student')
+    shortage.add_argument('--threshold', type=int, default=75)
+    shortage.add_argument('--repeat', type=int, default=3)
+    shortage.add_argument('--seed', type=int, default=1)
+    shortage.set_defaults(func=bench_attendance_report)
+
+    publish = subparsers.add_parser('publish-results', help=bench_publish_results.__doc__)
+    publish.add_argument('--students', type=int, nargs='+', default=[1000, 10000])
+    publish.add_argument('--subjects', type=int, default=6, help='grades per student')
+    publish.add_argument('--seed', type=int, default=1)
+    publish.set_defaults(func=bench_publish_results)
+
+    eligibility = subparsers.add_parser('eligibility', help=bench_eligibility.__doc__)
+    eligibility.add_argument('--dataset', choices=list(DATASET_SCALES), default='large')
+    eligibility.add_argument('--lookups', type=int, default=1000, help='students to look up eligible drives for')
+    eligibility.add_argument('--seed', type=int, default=1)
+    eligibility.set_defaults(func=bench_eligibility)
+
+    roster = subparsers.add_parser('roster', help=bench_roster.__doc__)
+    roster.add_argument('--dataset', choices=list(DATASET_SCALES), default='large')
+    roster.add_argument('--faculty', type=int, default=20, help='faculty members to load pages for')
+    roster.set_defaults(func=bench_roster)
+
+    search = subparsers.add_parser('search', help=bench_search.__doc__)
+    search.add_argument('--dataset', choices=list(DATASET_SCALES), default='large')
+    search.add_argument('--queries', type=int, default=500, help='typeahead inputs per endpoint and role')
+    search.add_argument('--seed', type=int, default=1)
+    search.set_defaults(func=bench_search)
+
+    startup = subparsers.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--modes', nargs='+', choices=list(STARTUP_MODES), default=list(STARTUP_MODES))
+    startup.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--output', help='results file (default: benchmark-results/startup-<time>.json)')
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Static asset build for the University Management System.
+
+Copies every file under static/ to static/dist/ with a content hash in its
+name, writes gzip (and, when the brotli module is installed, brotli)
+variants of the text assets next to them, and records the mapping in
+static/dist/manifest.json. app.py reads the manifest at startup so
+url_for('static', ...) points at the fingerprinted files, which are served
+precompressed with an immutable Cache-Control header.
+
+With --fontawesome pointing at an unpacked Font Awesome Free download
+(the directory containing css/all.css and webfonts/), the icon font is
+first vendored into static/vendor/fontawesome/ reduced to the icons the
+templates and scripts use. The fonts themselves are subset when fontTools
+is installed and copied whole otherwise. base.html loads the vendored
+icons instead of the CDN stylesheet once they exist.
+
+Usage:
+    python build_assets.py [--fontawesome path/to/fontawesome-free-6.4.0-web]
+
+Run it as part of every deploy; the app falls back to the plain static
+files when static/dist/ has not been built.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+VENDOR_ICONS_DIR = os.path.join(STATIC_DIR, 'vendor', 'fontawesome')
+ICON_SOURCES = [os.path.join(BASE_DIR, 'templates'), os.path.join(STATIC_DIR, 'js')]
+
+# Only text assets shrink enough to be worth a precompressed variant
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.ttf', '.eot')
+HASH_LENGTH = 12
+
+URL_PATTERN = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+ICON_CLASS_PATTERN = re.compile(r'\bfa-[a-z0-9-]+\b')
+GLYPH_PATTERN = re.compile(r'''(?:content|--fa)\s*:\s*["']\\([0-9a-fA-F]+)["']''')
+FONT_STYLE_CLASSES = {
+    'solid': ('fa', 'fas', 'fa-solid'),
+    'regular': ('far', 'fa-regular'),
+    'brands': ('fab', 'fa-brands'),
+}
+
+
+# ==================== ICON SUBSET ====================
+
+def used_icon_classes():
+    """Every fa-* class named in the templates and scripts"""
+    classes = set()
+    for root_dir in ICON_SOURCES:
+        for root, _, files in os.walk(root_dir):
+            for name in files:
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    classes.update(ICON_CLASS_PATTERN.findall(f.read()))
+    return classes
+
+
+def used_font_styles():
+    """Font Awesome styles (solid, regular, brands) the templates use"""
+    tokens = set()
+    for root_dir in ICON_SOURCES:
+        for root, _, files in os.walk(root_dir):
+            for name in files:
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    for match in re.finditer(r'class\s*=\s*["\']([^"\']*)', f.read()):
+                        tokens.update(match.group(1).split())
+    return {style for style, classes in FONT_STYLE_CLASSES.items() if tokens & set(classes)}
+
+
+def css_blocks(css):
+    """Split a stylesheet into top-level (prelude, body) pairs"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks, depth, start, prelude = [], 0, 0, ''
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i].strip()))
+                start = i + 1
+    return blocks
+
+
+def subset_rules(css, classes, styles):
+    """The rules of Font Awesome's all.css that the given classes and styles need"""
+    kept = []
+    for prelude, body in css_blocks(css):
+        if prelude.startswith('@font-face'):
+            if any(f'fa-{style}-' in body for style in styles):
+                kept.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@keyframes'):
+            if prelude.split()[-1] in classes:
+                kept.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            inner = subset_rules(body, classes, styles)
+            if inner:
+                kept.append(f'{prelude}{{{"".join(inner)}}}')
+        else:
+            selectors = [s.strip() for s in prelude.split(',')
+                         if set(ICON_CLASS_PATTERN.findall(s)) <= classes]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+    return kept
+
+
+def vendor_icons(fontawesome_dir):
+    """Write the icon subset of a Font Awesome download to static/vendor/fontawesome/"""
+    classes = used_icon_classes()
+    styles = used_font_styles()
+    with open(os.path.join(fontawesome_dir, 'css', 'all.css'), encoding='utf-8') as f:
+        rules = subset_rules(f.read(), classes, styles)
+    codepoints = {int(code, 16) for code in GLYPH_PATTERN.findall(''.join(rules))}
+
+    shutil.rmtree(VENDOR_ICONS_DIR, ignore_errors=True)
+    os.makedirs(os.path.join(VENDOR_ICONS_DIR, 'webfonts'))
+    css = '\n'.join(rules) + '\n'
+    for style in sorted(styles):
+        weight = '400' if style != 'solid' else '900'
+        source = os.path.join(fontawesome_dir, 'webfonts', f'fa-{style}-{weight}.woff2')
+        if font_subset is None:
+            target = f'fa-{style}-{weight}.woff2'
+            shutil.copyfile(source, os.path.join(VENDOR_ICONS_DIR, 'webfonts', target))
+        else:
+            # woff2 needs brotli; woff is still far smaller than the full font
+            flavor = 'woff2' if brotli is not None else 'woff'
+            target = f'fa-{style}-{weight}.{flavor}'
+            options = font_subset.Options()
+            options.flavor = flavor
+            font = font_subset.load_font(source, options)
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(unicodes=codepoints)
+            subsetter.subset(font)
+            font_subset.save_font(font, os.path.join(VENDOR_ICONS_DIR, 'webfonts', target), options)
+        # Point the @font-face at the single file shipped for this style
+        css = re.sub(rf'src:[^;}}]*fa-{style}-{weight}[^;}}]*',
+                     f'src:url("webfonts/{target}") format("{target.rsplit(".", 1)[1]}")', css)
+    with open(os.path.join(VENDOR_ICONS_DIR, 'icons.css'), 'w', encoding='utf-8') as f:
+        f.write(css)
+    print(f'Vendored {len(codepoints)} icons ({", ".join(sorted(styles))}) into {VENDOR_ICONS_DIR}'
+          + ('' if font_subset else ' (fontTools not installed, fonts copied whole)'))
+
+
+# ==================== FINGERPRINTING ====================
+
+def source_files():
+    """Paths relative to static/ of every asset to build, stylesheets last
+    so the files they reference are already fingerprinted"""
+    paths = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(root) == os.path.abspath(STATIC_DIR):
+            dirs[:] = [d for d in dirs if d != 'dist']
+        for name in files:
+            paths.append(os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/'))
+    return sorted(paths, key=lambda path: (path.endswith('.css'), path))
+
+
+def rewrite_css_urls(css, path, manifest):
+    """Point url() references in a stylesheet at their fingerprinted files"""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        url = match.group(2)
+        target = manifest.get(posixpath.normpath(posixpath.join(directory, url.split('?')[0].split('#')[0])))
+        if target is None or '://' in url or url.startswith('data:'):
+            return match.group(0)
+        return f'url("{posixpath.relpath(target, posixpath.join("dist", directory))}")'
+    return URL_PATTERN.sub(replace, css)
+
+
+def fingerprinted_name(path, content):
+    """style.css -> style.<hash>.css"""
+    stem, ext = posixpath.splitext(path)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def write_variants(target, content):
+    """Write the asset plus any precompressed variants smaller than it; returns their sizes"""
+    with open(target, 'wb') as f:
+        f.write(content)
+    sizes = {'identity': len(content)}
+    if not target.endswith(COMPRESSIBLE):
+        return sizes
+    # mtime=0 keeps the .gz byte-identical between builds
+    variants = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    for encoding, suffix, compress in variants:
+        compressed = compress(content)
+        if len(compressed) < len(content):
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+            sizes[encoding] = len(compressed)
+    return sizes
+
+
+def build():
+    """Rebuild static/dist/ and its manifest"""
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifest = {}
+    for path in source_files():
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = rewrite_css_urls(content.decode('utf-8'), path, manifest).encode('utf-8')
+        hashed = posixpath.join('dist', fingerprinted_name(path, content))
+        target = os.path.join(STATIC_DIR, *hashed.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        sizes = write_variants(target, content)
+        manifest[path] = hashed
+        print(f'{path:<45} -> {hashed}  ' + '  '.join(f'{k}={v}' for k, v in sizes.items()))
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        print('brotli not installed: only gzip variants were written')
+    print(f'{len(manifest)} assets written to {DIST_DIR}')
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets')
+    parser.add_argument('--fontawesome', help='unpacked Font Awesome Free download to vendor the used icons from')
+    args = parser.parse_args()
+
+    if args.fontawesome:
+        vendor_icons(args.fontawesome)
+    build()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
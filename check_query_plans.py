@@ -0,0 +1,155 @@
+"""
+Query plan regression check.
+
+Runs EXPLAIN QUERY PLAN on every SQL statement passed to execute() or
+cached_query() in app.py and fails if any of them does a full table scan. Statements that
+list a whole table on purpose are allowed per function in
+FULL_SCAN_ALLOWED. The paginated lists build their SQL at runtime, so each
+sort order and filter combination in KEYSET_LISTS is checked as well.
+
+Usage:
+    python check_query_plans.py [--database path/to/university.db]
+
+Without --database a fresh database is built by init_db() in a temporary
+directory. Exits with status 1 when a plan regresses. The same checks run
+under pytest, one test per statement, in tests/test_query_plans.py:
+
+    python -m pytest tests
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SOURCE = os.path.join(BASE_DIR, 'app.py')
+
+# Tables a function's statements may scan end to end, because they list
+# every row on purpose
+FULL_SCAN_ALLOWED = {
+    'data_versions': {'data_version'},
+    # Validates a results upload against every subject code
+    'publish_results': {'subjects'},
+    # Parses the rules of every drive into the eligibility index
+    'eligibility_index': {'placement_drives'},
+    # Enrolls the sample students in every sample subject
+    'insert_sample_data': {'subjects'},
+}
+
+# (label, FROM clause, sort, filters) for every paginated list shape
+KEYSET_LISTS = [
+    ('students by name', 'students s JOIN users u ON s.user_id = u.id', 'STUDENT_SORTS', 'name', {}),
+    ('students by cgpa', 'students s JOIN users u ON s.user_id = u.id', 'STUDENT_SORTS', 'cgpa', {}),
+    ('students in a program by cgpa', 'students s JOIN users u ON s.user_id = u.id', 'STUDENT_SORTS', 'cgpa',
+     {'program': 'Computer Science', 'semester': '6', 'cgpa_min': '7'}),
+    ('students matching a search', 'students s JOIN users u ON s.user_id = u.id', 'STUDENT_SORTS', 'name',
+     {'q': 'sarah'}),
+    ('faculty by name', 'faculty f JOIN users u ON f.user_id = u.id', 'FACULTY_SORTS', 'name', {}),
+]
+
+# A plan step reading a table without any index
+SCAN_PATTERN = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+
+
+def collect_statements(path=APP_SOURCE):
+    """(line number, function name, sql) for every literal SQL string passed to
+    execute(), executemany() or cached_query()"""
+    tree = ast.parse(open(path).read())
+    statements = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        for node in ast.walk(func):
+            if not isinstance(node, ast.Call):
+                continue
+            if isinstance(node.func, ast.Attribute) and node.func.attr in ('execute', 'executemany'):
+                sql_index = 0
+            elif isinstance(node.func, ast.Name) and node.func.id == 'cached_query':
+                sql_index = 2
+            else:
+                continue
+            if len(node.args) <= sql_index:
+                continue
+            arg = node.args[sql_index]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                sql = arg.value.strip()
+                if sql.split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+                    statements.append((node.lineno, func.name, sql))
+    return sorted(set(statements))
+
+
+def load_app(database):
+    """Import app.py against the given database, creating it if missing"""
+    sys.path.insert(0, BASE_DIR)
+    import app
+    app.use_database(database)
+    if not os.path.exists(database):
+        app.init_db()
+    return app
+
+
+def full_scans(conn, sql):
+    """Names of the tables the statement scans without an index"""
+    params = [None] * sql.count('?')
+    plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+    # Subqueries and CTEs are scanned once they are built; that is not a table scan
+    derived = {detail.split()[-1] for detail in plan if detail.startswith(('MATERIALIZE', 'CO-ROUTINE'))}
+    scans = []
+    for detail in plan:
+        match = SCAN_PATTERN.match(detail)
+        if match and match.group(1) not in derived:
+            scans.append(match.group(2) or match.group(1))
+    return scans
+
+
+def keyset_statements(app):
+    """(label, sql) for the first and a later page of every list in KEYSET_LISTS"""
+    from werkzeug.datastructures import MultiDict
+    statements = []
+    for label, from_sql, sorts, sort, args in KEYSET_LISTS:
+        _, where, params = app.student_list_filters(MultiDict(args))
+        for descending in (False, True):
+            for cursor in (None, app.encode_cursor([0, 0])):
+                sql, _ = app.keyset_query('*', from_sql, where, params, getattr(app, sorts)[sort],
+                                          descending=descending, cursor=cursor)
+                statements.append((label, sql))
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN regression check for app.py')
+    parser.add_argument('--database', help='check against an existing database instead of a fresh one')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = args.database or os.path.join(workdir, 'university.db')
+        # Use the app's own connections so its SQL functions are registered
+        app = load_app(database)
+        conn = app.connect_db()
+
+        failures = 0
+        statements = collect_statements()
+        for lineno, function, sql in statements:
+            allowed = FULL_SCAN_ALLOWED.get(function, set())
+            scans = [t for t in full_scans(conn, sql) if t not in allowed]
+            if scans:
+                failures += 1
+                print(f"app.py:{lineno} ({function}): full scan of {', '.join(scans)}")
+                print('    ' + ' '.join(sql.split()))
+        lists = keyset_statements(app)
+        for label, sql in lists:
+            scans = full_scans(conn, sql)
+            if scans:
+                failures += 1
+                print(f"keyset list ({label}): full scan of {', '.join(scans)}")
+                print('    ' + sql)
+        conn.close()
+
+    print(f'{len(statements) + len(lists)} statements checked, {failures} with full table scans')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
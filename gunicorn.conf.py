@@ -0,0 +1,35 @@
+"""
+gunicorn settings, read automatically from the working directory
+(`gunicorn app:app`, as in the Procfile).
+
+The database is created or migrated once in the master before any
+worker exists, the static asset manifest is read there, and the app is imported there with all templates
+compiled, so forked workers share the compiled code instead of each
+compiling templates on their first requests. With preload_app a HUP no
+longer reloads application code; restart the master to deploy. Exiting
+workers first write their queued event registrations.
+"""
+import time
+
+preload_app = True
+
+
+def on_starting(server):
+    from app import migrate_db, release_stamp, static_assets
+    server.log.info('Database %s', migrate_db())
+    # Read the asset manifest and release stamp once, before workers fork
+    manifest = static_assets()[0]
+    server.log.info('Release %s, %d fingerprinted assets', release_stamp(), len(manifest))
+
+
+def when_ready(server):
+    from app import precompile_templates
+    start = time.perf_counter()
+    names = precompile_templates()
+    server.log.info('Precompiled %d templates in %.0f ms', len(names), (time.perf_counter() - start) * 1000)
+
+
+def worker_exit(server, worker):
+    # Acknowledged event registrations are still queued in this worker
+    from app import stop_event_writer
+    stop_event_writer()
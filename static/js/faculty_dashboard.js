@@ -9,12 +9,14 @@ let FACULTY_URLS = {
     classes: '',
     assignments: '',
     reports: '',
+    shortage: '',
     markAttendanceBase: '',
     saveAttendance: '',
     addAssignment: '',
     editAssignmentBase: '',
     deleteAssignmentBase: '',
-    studentDetailBase: ''
+    studentDetailBase: '',
+    setGrade: ''
 };
 
 function initFacultyDashboard(urls) {
@@ -35,6 +37,8 @@ function openPopup(type) {
         url = FACULTY_URLS.assignments;
     } else if (type === 'reports') {
         url = FACULTY_URLS.reports;
+    } else if (type === 'shortage') {
+        url = FACULTY_URLS.shortage;
     }
 
     fetch(url)
@@ -193,6 +197,27 @@ function deleteAssignment(id, title) {
 
 // ==================== REPORT LOGIC ====================
 
+function filterStudentReports(form) {
+    const params = new URLSearchParams();
+    new FormData(form).forEach((value, key) => {
+        if (value !== '') params.append(key, value);
+    });
+    fetch(`${FACULTY_URLS.reports}?${params}`)
+        .then(response => response.text())
+        .then(html => {
+            document.getElementById('modalBody').innerHTML = html;
+        });
+}
+
+function filterShortageReport(form) {
+    const params = new URLSearchParams(new FormData(form));
+    fetch(`${FACULTY_URLS.shortage}?${params}`)
+        .then(response => response.text())
+        .then(html => {
+            document.getElementById('modalBody').innerHTML = html;
+        });
+}
+
 function searchStudents() {
     const input = document.getElementById('searchInput');
     if (!input) return;
@@ -228,3 +253,16 @@ function viewStudentDetail(studentId) {
             modalBody.innerHTML = html;
         });
 }
+
+async function submitGrade(form, studentId) {
+    const response = await fetch(FACULTY_URLS.setGrade, {
+        method: 'POST',
+        body: new URLSearchParams({ ...Object.fromEntries(new FormData(form)), student_id: studentId })
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        alert(result.error);
+        return;
+    }
+    viewStudentDetail(studentId);
+}
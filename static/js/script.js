@@ -195,4 +195,96 @@ function exportTableToCSV(tableId, filename) {
     window.URL.revokeObjectURL(url);
 }
 
+// ==================== LOAD MORE ROWS ====================
+// Fetches the next page of a keyset-paginated table and appends its rows.
+// The button carries the list URL (with filters), the cursor and the tbody id.
+function loadMoreRows(button) {
+    const url = new URL(button.dataset.url, window.location.href);
+    url.searchParams.set('cursor', button.dataset.cursor);
+    url.searchParams.set('partial', '1');
+
+    button.disabled = true;
+    fetch(url)
+        .then(response => {
+            const nextCursor = response.headers.get('X-Next-Cursor');
+            return response.text().then(html => ({ html, nextCursor }));
+        })
+        .then(({ html, nextCursor }) => {
+            document.getElementById(button.dataset.target).insertAdjacentHTML('beforeend', html);
+            if (nextCursor) {
+                button.dataset.cursor = nextCursor;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            button.disabled = false;
+        });
+}
+
 console.log('University Management System JavaScript loaded successfully!');
+
+// ==================== SEARCH TYPEAHEAD ====================
+const SEARCH_KIND_ICONS = {
+    people: 'user',
+    events: 'calendar-alt',
+    drives: 'briefcase',
+    announcements: 'bullhorn'
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    const box = document.getElementById('searchBox');
+    const list = document.getElementById('searchSuggestions');
+    if (!box || !list) return;
+    let timer = null;
+    let latest = 0;
+
+    box.addEventListener('input', function() {
+        clearTimeout(timer);
+        const q = box.value.trim();
+        if (q.length < 2) {
+            list.classList.remove('open');
+            return;
+        }
+        timer = setTimeout(() => {
+            const request = ++latest;
+            fetch(`${box.dataset.suggestUrl}?q=${encodeURIComponent(q)}`)
+                .then(response => response.json())
+                .then(data => {
+                    // Answers can arrive out of order; only show the newest
+                    if (request !== latest) return;
+                    list.innerHTML = '';
+                    data.results.forEach(result => {
+                        const link = document.createElement('a');
+                        const icon = document.createElement('i');
+                        link.href = result.url;
+                        icon.className = `fas fa-${SEARCH_KIND_ICONS[result.kind]}`;
+                        link.append(icon, ' ', result.label);
+                        list.appendChild(link);
+                    });
+                    list.classList.toggle('open', data.results.length > 0);
+                });
+        }, 150);
+    });
+
+    box.addEventListener('keydown', function(e) {
+        const links = Array.from(list.querySelectorAll('a'));
+        const current = links.findIndex(link => link.classList.contains('active'));
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const next = e.key === 'ArrowDown' ? current + 1 : current - 1;
+            links.forEach(link => link.classList.remove('active'));
+            if (links.length) links[(next + links.length) % links.length].classList.add('active');
+        } else if (e.key === 'Enter' && current >= 0) {
+            e.preventDefault();
+            window.location = links[current].href;
+        } else if (e.key === 'Escape') {
+            list.classList.remove('open');
+        }
+    });
+
+    // Delayed so a click on a suggestion lands first
+    box.addEventListener('blur', () => setTimeout(() => list.classList.remove('open'), 200));
+});
@@ -0,0 +1,51 @@
+"""Shared fixtures: app.py on a fresh copy of the sample database per test"""
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_query_plans
+
+STUDENT_LOGIN = {'username': '2024002', 'password': 'pass123'}
+FACULTY_LOGIN = {'username': 'faculty1', 'password': 'pass123'}
+ADMIN_LOGIN = {'username': 'admin', 'password': 'admin123'}
+SAMPLE_SCALE = 0.01
+SAMPLE_SEED = 7
+
+
+@pytest.fixture(scope='session')
+def sample_database(tmp_path_factory):
+    """init_db()'s sample data plus ~500 generated students, built once and
+    copied by each test"""
+    database = str(tmp_path_factory.mktemp('sample') / 'university.db')
+    app = check_query_plans.load_app(database)
+    conn = app.connect_db()
+    app.insert_scale_data(conn, SAMPLE_SCALE, SAMPLE_SEED)
+    conn.close()
+    return database
+
+
+@pytest.fixture
+def app(sample_database, tmp_path):
+    database = str(tmp_path / 'university.db')
+    shutil.copy(sample_database, database)
+    return check_query_plans.load_app(database)
+
+
+@pytest.fixture
+def db(app):
+    """The pooled connection a request would use, inside an app context"""
+    with app.app.app_context():
+        yield app.get_db_connection()
+
+
+@pytest.fixture
+def login(app):
+    """login(credentials) -> a test client signed in with them"""
+    def login(credentials):
+        client = app.app.test_client()
+        client.post('/login', data=credentials, follow_redirects=True)
+        return client
+    return login
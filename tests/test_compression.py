@@ -0,0 +1,104 @@
+"""HTML minification and response compression"""
+import gzip
+
+import pytest
+
+from conftest import ADMIN_LOGIN, STUDENT_LOGIN
+
+
+def test_indentation_and_comments_between_tags_go(app):
+    html = '<ul>\n    <li>One</li>\n    <!-- two -->\n    <li>Three</li>\n</ul>\n'
+    assert app.minify_html(html) == '<ul>\n<li>One</li>\n<li>Three</li>\n</ul>\n'
+
+
+def test_conditional_comments_stay(app):
+    html = '<!--[if IE]><p>Old browser</p><![endif]-->'
+    assert app.minify_html(html) == html
+
+
+def test_text_keeps_its_spacing(app):
+    html = '<p>Two  spaces and\n    a wrapped line</p>'
+    assert app.minify_html(html) == html
+
+
+@pytest.mark.parametrize('block', [
+    '<pre>\n    indented\n\n    <!-- shown -->\n</pre>',
+    '<PRE class="x">  a\n  b  </PRE>',
+    '<textarea name="c">\n  line one\n\n  line two\n</textarea>',
+    '<script>\n    if (a < b) {\n        // kept\n    }\n</script>',
+])
+def test_raw_blocks_are_unchanged(app, block):
+    html = f'<div>\n    {block}\n    <p>after</p>\n</div>'
+    minified = app.minify_html(html)
+    assert block in minified
+    assert minified == f'<div>\n{block}\n<p>after</p>\n</div>'
+
+
+def test_attributes_are_unchanged(app):
+    html = ('<input type="text" value="two  spaces" placeholder="a, b ; c">\n'
+            '<div class="card\n            shadow" data-note="x { y }" title=\'single  quoted\'>\n'
+            '    text\n</div>')
+    minified = app.minify_html(html)
+    for attribute in ('value="two  spaces"', 'placeholder="a, b ; c"', 'class="card\n            shadow"',
+                      'data-note="x { y }"', "title='single  quoted'"):
+        assert attribute in minified
+
+
+def test_style_is_compacted(app):
+    html = '<style>\n    /* card */\n    .card , .box {\n        color : red ;\n        margin: 0 auto;\n    }\n</style>'
+    assert app.minify_html(html) == '<style> .card,.box{color : red;margin: 0 auto;}</style>'
+
+
+def test_style_strings_are_unchanged(app):
+    html = '<style>\n  a::after { content: "  /* not a comment */ ;  "; font-family: \'A  B\' }\n</style>'
+    assert app.minify_html(html) == ('<style> a::after{content: "  /* not a comment */ ;  ";'
+                                     'font-family: \'A  B\'}</style>')
+
+
+def test_minified_page_renders_the_same_text(app, login):
+    client = login(STUDENT_LOGIN)
+    app.MINIFY_HTML = False
+    try:
+        original = client.get('/dashboard').get_data(as_text=True)
+    finally:
+        app.MINIFY_HTML = True
+    minified = client.get('/dashboard').get_data(as_text=True)
+    assert len(minified) < len(original)
+    assert minified == app.minify_html(original)
+
+
+def test_pages_are_compressed_for_clients_that_accept_it(app, login):
+    client = login(STUDENT_LOGIN)
+    identity = client.get('/dashboard')
+    assert 'Content-Encoding' not in identity.headers
+    assert 'Accept-Encoding' in identity.headers['Vary']
+
+    response = client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == identity.get_data()
+
+
+def test_brotli_is_preferred(app, login):
+    if app.brotli is None:
+        pytest.skip('Brotli is not installed')
+    client = login(STUDENT_LOGIN)
+    identity = client.get('/dashboard')
+    response = client.get('/dashboard', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert app.brotli.decompress(response.get_data()) == identity.get_data()
+
+
+def test_small_responses_are_not_compressed(app, login):
+    client = login(ADMIN_LOGIN)
+    response = client.get('/search/suggest?q=zzzz', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.get_data()) < app.COMPRESS_MIN_BYTES
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_exports_are_compressed(app, login):
+    client = login(ADMIN_LOGIN)
+    identity = client.get('/export/students.csv')
+    response = client.get('/export/students.csv', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.get_data()) == identity.get_data()
@@ -0,0 +1,122 @@
+"""Drive registration: seat limits, the waitlist and its promotion order"""
+import threading
+
+from conftest import STUDENT_LOGIN
+
+
+def add_drive(conn, capacity, status='Open'):
+    drive_id = conn.execute('''
+        INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, status, min_cgpa,
+                                      capacity)
+        VALUES ('TestCo', 'Engineer', 'Open to all', '2030-01-01', ?, 0, ?)
+        RETURNING id
+    ''', (status, capacity)).fetchone()[0]
+    conn.commit()
+    return drive_id
+
+
+def student_ids(conn, count):
+    return [row[0] for row in conn.execute('SELECT id FROM students ORDER BY id LIMIT ?', (count,))]
+
+
+def statuses(conn, drive_id):
+    """student id -> status, in application order"""
+    return dict(conn.execute('SELECT student_id, status FROM drive_registrations WHERE drive_id = ? ORDER BY id',
+                             (drive_id,)).fetchall())
+
+
+def test_full_drive_waitlists_in_application_order(app, db):
+    drive_id = add_drive(db, capacity=2)
+    students = student_ids(db, 5)
+    assert [app.register_for_drive(db, student, drive_id) for student in students] == [
+        'Registered', 'Registered', 'Waitlisted', 'Waitlisted', 'Waitlisted']
+
+
+def test_unlimited_drive_never_waitlists(app, db):
+    drive_id = add_drive(db, capacity=None)
+    assert {app.register_for_drive(db, student, drive_id) for student in student_ids(db, 20)} == {'Registered'}
+
+
+def test_repeat_and_closed_applications_are_refused(app, db):
+    drive_id = add_drive(db, capacity=1)
+    first, second = student_ids(db, 2)
+    assert app.register_for_drive(db, first, drive_id) == 'Registered'
+    assert app.register_for_drive(db, first, drive_id) is None
+    assert app.register_for_drive(db, second, drive_id) == 'Waitlisted'
+    assert app.register_for_drive(db, second, drive_id) is None
+    assert app.register_for_drive(db, first, add_drive(db, capacity=5, status='Closed')) is None
+    assert statuses(db, drive_id) == {first: 'Registered', second: 'Waitlisted'}
+
+
+def test_withdrawal_promotes_the_first_waitlisted(app, db):
+    drive_id = add_drive(db, capacity=2)
+    a, b, c, d, e = student_ids(db, 5)
+    for student in (a, b, c, d, e):
+        app.register_for_drive(db, student, drive_id)
+
+    assert app.withdraw_from_drive(db, b, drive_id) == 'Registered'
+    assert statuses(db, drive_id) == {a: 'Registered', c: 'Registered', d: 'Waitlisted', e: 'Waitlisted'}
+
+    # Leaving the waitlist frees no seat
+    assert app.withdraw_from_drive(db, d, drive_id) == 'Waitlisted'
+    assert statuses(db, drive_id) == {a: 'Registered', c: 'Registered', e: 'Waitlisted'}
+
+    assert app.withdraw_from_drive(db, a, drive_id) == 'Registered'
+    assert statuses(db, drive_id) == {c: 'Registered', e: 'Registered'}
+    assert app.withdraw_from_drive(db, a, drive_id) is None
+
+
+def test_reapplying_joins_the_back_of_the_waitlist(app, db):
+    drive_id = add_drive(db, capacity=1)
+    a, b, c = student_ids(db, 3)
+    for student in (a, b, c):
+        app.register_for_drive(db, student, drive_id)
+    app.withdraw_from_drive(db, b, drive_id)
+    assert app.register_for_drive(db, b, drive_id) == 'Waitlisted'
+    app.withdraw_from_drive(db, a, drive_id)
+    assert statuses(db, drive_id) == {c: 'Registered', b: 'Waitlisted'}
+
+
+def test_concurrent_applicants_never_overbook(app):
+    with app.app.app_context():
+        drive_id = add_drive(app.get_db_connection(), capacity=10)
+    conn = app.connect_db()
+    students = student_ids(conn, 60)
+    results = []
+    start = threading.Barrier(len(students))
+
+    def apply(student):
+        own = app.connect_db()
+        try:
+            start.wait()
+            results.append(app.register_for_drive(own, student, drive_id))
+        finally:
+            own.close()
+
+    threads = [threading.Thread(target=apply, args=(student,)) for student in students]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ['Registered'] * 10 + ['Waitlisted'] * 50
+    assert list(statuses(conn, drive_id).values()).count('Registered') == 10
+    conn.close()
+
+
+def test_placements_page_shows_waitlist_position(app, db, login):
+    drive_id = add_drive(db, capacity=1)
+    me = db.execute("SELECT s.id FROM students s JOIN users u ON u.id = s.user_id WHERE u.username = ?",
+                    (STUDENT_LOGIN['username'],)).fetchone()[0]
+    others = [student for student in student_ids(db, 3) if student != me][:2]
+    for student in others:
+        app.register_for_drive(db, student, drive_id)
+
+    client = login(STUDENT_LOGIN)
+    response = client.post('/apply-drive', data={'drive_id': drive_id}, follow_redirects=True)
+    assert b'added to its waitlist' in response.data
+    assert b'Waitlist #2' in response.data
+
+    app.withdraw_from_drive(db, others[0], drive_id)
+    assert statuses(db, drive_id) == {others[1]: 'Registered', me: 'Waitlisted'}
+    assert b'Waitlist #1' in client.get('/placements').data
@@ -0,0 +1,97 @@
+"""Placement eligibility: parsing drive criteria and matching students to drives"""
+import pytest
+
+PROGRAMS = ('Computer Science', 'Electronics')
+
+
+@pytest.mark.parametrize('criteria, min_cgpa', [
+    ('CGPA > 7.5', 7.5),
+    ('CGPA >= 7', 7.0),
+    ('CGPA: 7.0', 7.0),
+    ('cgpa=6.5', 6.5),
+    ('CGPA 8', 8.0),
+    ('Minimum CGPA of 7', 7.0),
+    ('Min. CGPA 6.5', 6.5),
+    ('min cgpa: 8', 8.0),
+    ('GPA at least 7.2', 7.2),
+    ('CGPA of at least 7.1', 7.1),
+    ('CGPA above 6', 6.0),
+    ('7.5+ CGPA', 7.5),
+    ('7 CGPA and above', 7.0),
+])
+def test_cgpa_clauses(app, criteria, min_cgpa):
+    rules = app.parse_eligibility(criteria)
+    assert rules['min_cgpa'] == min_cgpa
+    assert rules['notes'] == []
+
+
+@pytest.mark.parametrize('criteria', ['CGPA < 9', 'CGPA below 9', 'Python/Java'])
+def test_unchecked_clauses_are_notes(app, criteria):
+    rules = app.parse_eligibility(criteria)
+    assert rules['min_cgpa'] == 0.0
+    assert rules['notes'] == [criteria]
+
+
+def test_every_rule(app):
+    rules = app.parse_eligibility('CGPA: 7.0; No active backlogs, Sem >= 5\nComputer Science, Cloud experience',
+                                  programs=PROGRAMS)
+    assert rules == {'min_cgpa': 7.0, 'no_backlogs': True, 'programs': {'Computer Science'}, 'min_semester': 5,
+                     'notes': ['Cloud experience']}
+
+
+def test_semester_rule_is_inclusive_of_ge_only(app):
+    assert app.parse_eligibility('Semester > 5')['min_semester'] == 6
+    assert app.parse_eligibility('sem >= 5')['min_semester'] == 5
+
+
+def test_column_and_text_take_the_larger_minimum(app):
+    assert app.parse_eligibility('CGPA: 7.0', min_cgpa=8.0)['min_cgpa'] == 8.0
+    assert app.parse_eligibility('CGPA: 7.0', min_cgpa=6.0)['min_cgpa'] == 7.0
+    assert app.parse_eligibility('Open to all', min_cgpa=None)['min_cgpa'] == 0.0
+
+
+def add_drive(conn, app, criteria, min_cgpa=0.0):
+    drive_id = conn.execute('''
+        INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, status, min_cgpa)
+        VALUES ('TestCo', 'Engineer', ?, '2030-01-01', 'Open', ?)
+        RETURNING id
+    ''', (criteria, min_cgpa)).fetchone()[0]
+    app.bump_data_version(conn, 'placement_drives')
+    conn.commit()
+    return drive_id
+
+
+def students(conn):
+    return {row['id']: row for row in conn.execute('''
+        SELECT s.id, COALESCE(s.cgpa, 0.0) AS cgpa, s.program, s.semester,
+               EXISTS (SELECT 1 FROM grades g WHERE g.student_id = s.id AND g.grade_points = 0) AS backlog
+        FROM students s
+    ''')}
+
+
+def test_text_cgpa_filters_students(app, db):
+    drive_id = add_drive(db, app, 'CGPA: 8.0')
+    expected = {student_id for student_id, row in students(db).items() if row['cgpa'] >= 8.0}
+    assert 0 < len(expected) < len(students(db))
+    assert set(app.eligible_students(db, drive_id)) == expected
+    assert app.eligible_counts(db)[drive_id] == len(expected)
+
+
+def test_students_and_drives_agree(app, db):
+    no_backlogs = add_drive(db, app, 'No backlogs')
+    add_drive(db, app, 'No backlogs, Computer Science')
+    add_drive(db, app, 'CGPA 7, Sem >= 3')
+    failed = db.execute('SELECT MAX(id) FROM students').fetchone()[0]
+    app.set_grade(db, failed, db.execute('SELECT MIN(id) FROM subjects').fetchone()[0], 'F', 1)
+    assert failed not in app.eligible_students(db, no_backlogs)
+    everyone = students(db)
+    eligible = {drive_id: set(app.eligible_students(db, drive_id)) for drive_id in app.eligible_counts(db)}
+    for student_id in everyone:
+        assert set(app.eligible_drive_ids(db, student_id)) == {
+            drive_id for drive_id, ids in eligible.items() if student_id in ids}
+
+
+def test_eligible_students_are_sorted_by_cgpa(app, db):
+    drive_id = add_drive(db, app, 'Open to all')
+    cgpas = [students(db)[student_id]['cgpa'] for student_id in app.eligible_students(db, drive_id)]
+    assert cgpas == sorted(cgpas)
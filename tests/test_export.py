@@ -0,0 +1,126 @@
+"""Streamed CSV/NDJSON exports: contents, filters, access and connection reuse"""
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from conftest import ADMIN_LOGIN, FACULTY_LOGIN, STUDENT_LOGIN
+
+
+def csv_rows(response):
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+
+def faculty_subject_ids(conn):
+    return [row[0] for row in conn.execute('''
+        SELECT fs.subject_id FROM faculty_subjects fs
+        JOIN faculty f ON f.id = fs.faculty_id
+        JOIN users u ON u.id = f.user_id
+        WHERE u.username = ?
+    ''', (FACULTY_LOGIN['username'],))]
+
+
+def test_students_csv_streams_every_student_in_batches(app, db, login, monkeypatch):
+    monkeypatch.setattr(app, 'EXPORT_BATCH_ROWS', 50)
+    response = login(ADMIN_LOGIN).get('/export/students.csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename=students.csv'
+    rows = csv_rows(response)
+    assert list(rows[0]) == ['student_id', 'username', 'full_name', 'email', 'program', 'semester', 'cgpa']
+    assert [row['student_id'] for row in rows] == [
+        row[0] for row in db.execute('SELECT student_id FROM students ORDER BY id')]
+
+
+def test_ndjson_matches_csv(app, login):
+    client = login(ADMIN_LOGIN)
+    lines = client.get('/export/attendance.ndjson').get_data(as_text=True).splitlines()
+    records = [json.loads(line) for line in lines]
+    rows = csv_rows(client.get('/export/attendance.csv'))
+    assert len(records) == len(rows) > 0
+    for record, row in zip(records, rows):
+        assert {key: '' if value is None else str(value) for key, value in record.items()} == row
+
+
+def test_gzip_download(app, login):
+    client = login(ADMIN_LOGIN)
+    plain = client.get('/export/students.csv')
+    response = client.get('/export/students.csv?gzip=1')
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=students.csv.gz'
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+
+def test_filters(app, db, login):
+    client = login(ADMIN_LOGIN)
+    program = db.execute('SELECT program FROM students LIMIT 1').fetchone()[0]
+    rows = csv_rows(client.get('/export/students.csv', query_string={'program': program, 'cgpa_min': 7}))
+    assert rows and all(row['program'] == program and float(row['cgpa']) >= 7 for row in rows)
+
+    subject_id, code = db.execute('SELECT id, subject_code FROM subjects WHERE id IN '
+                                  '(SELECT subject_id FROM attendance) LIMIT 1').fetchone()
+    rows = csv_rows(client.get(f'/export/attendance.csv?subject_id={subject_id}'))
+    assert rows and {row['subject_code'] for row in rows} == {code}
+
+    drive_id = db.execute('SELECT drive_id FROM drive_registrations LIMIT 1').fetchone()[0]
+    rows = csv_rows(client.get(f'/export/drive_registrations.csv?drive_id={drive_id}'))
+    assert len(rows) == db.execute('SELECT COUNT(*) FROM drive_registrations WHERE drive_id = ?',
+                                   (drive_id,)).fetchone()[0]
+
+
+@pytest.mark.parametrize('path, status', [
+    ('/export/grades.csv', 404),
+    ('/export/students.xml', 404),
+])
+def test_unknown_exports(app, login, path, status):
+    assert login(ADMIN_LOGIN).get(path).status_code == status
+
+
+def test_students_cannot_export(app, login):
+    response = login(STUDENT_LOGIN).get('/export/students.csv')
+    assert response.status_code == 302
+
+
+def test_faculty_export_only_their_rosters(app, db, login):
+    client = login(FACULTY_LOGIN)
+    taught = faculty_subject_ids(db)
+    assert taught
+    assert client.get('/export/drive_registrations.csv').status_code == 403
+
+    rows = csv_rows(client.get('/export/students.csv'))
+    assert 0 < len(rows) < db.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+    assert sorted(row['student_id'] for row in rows) == sorted(row[0] for row in db.execute(f'''
+        SELECT DISTINCT s.student_id FROM students s JOIN subject_roster r ON r.student_id = s.id
+        WHERE r.subject_id IN ({','.join('?' * len(taught))})
+    ''', taught))
+
+    codes = {row[0] for row in db.execute(f'SELECT subject_code FROM subjects WHERE id IN '
+                                          f'({",".join("?" * len(taught))})', taught)}
+    rows = csv_rows(client.get('/export/attendance.csv'))
+    assert rows and {row['subject_code'] for row in rows} <= codes
+
+    other = db.execute(f'SELECT id FROM subjects WHERE id NOT IN ({",".join("?" * len(taught))}) LIMIT 1',
+                       taught).fetchone()[0]
+    assert client.get(f'/export/attendance.csv?subject_id={other}').status_code == 403
+    assert client.get(f'/export/attendance.csv?subject_id={taught[0]}').status_code == 200
+
+
+def test_export_connection_goes_back_to_the_pool(app, login):
+    client = login(ADMIN_LOGIN)
+    client.get('/export/students.csv').get_data()
+    pooled = app._pool.qsize()
+    for _ in range(3):
+        client.get('/export/students.csv').get_data()
+    assert app._pool.qsize() == pooled
+
+
+def test_failed_export_releases_its_connection(app):
+    with app.app.app_context():
+        app.get_db_connection()
+    pooled = app._pool.qsize()
+    chunks = app.export_chunks('SELECT * FROM no_such_table', [], 'csv')
+    with pytest.raises(Exception, match='no such table'):
+        next(chunks)
+    assert app._pool.qsize() == pooled
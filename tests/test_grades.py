@@ -0,0 +1,153 @@
+"""Grades and the incrementally maintained CGPA"""
+import random
+
+import pytest
+
+
+def subjects(conn, count):
+    """(id, code, credits) of `count` subjects with different credits where possible"""
+    return [tuple(row) for row in conn.execute('''
+        SELECT id, subject_code, credits FROM subjects ORDER BY credits, id LIMIT ?
+    ''', (count,))]
+
+
+def student(conn, student_id):
+    return conn.execute('SELECT cgpa, graded_credits, grade_point_total FROM students WHERE id = ?',
+                        (student_id,)).fetchone()
+
+
+def first_student(conn):
+    return conn.execute('SELECT id, student_id FROM students ORDER BY id LIMIT 1').fetchone()
+
+
+def recomputed_cgpa(conn, student_id):
+    return conn.execute('''
+        SELECT ROUND(SUM(credits * grade_points) * 1.0 / SUM(credits), 2) FROM grades WHERE student_id = ?
+    ''', (student_id,)).fetchone()[0]
+
+
+def test_cgpa_is_the_credit_weighted_average(app, db):
+    student_id = first_student(db)['id']
+    (first, _, first_credits), (second, _, second_credits) = subjects(db, 2)
+
+    assert app.set_grade(db, student_id, first, 'A', 1) == 8.0
+    cgpa = app.set_grade(db, student_id, second, 'O', 1)
+    assert cgpa == round((8 * first_credits + 10 * second_credits) / (first_credits + second_credits), 2)
+    assert tuple(student(db, student_id)) == (cgpa, first_credits + second_credits,
+                                              8 * first_credits + 10 * second_credits)
+
+
+def test_regrading_replaces_the_old_grade(app, db):
+    student_id = first_student(db)['id']
+    (first, _, _), (second, _, _) = subjects(db, 2)
+    app.set_grade(db, student_id, first, 'F', 1)
+    app.set_grade(db, student_id, second, 'B', 1)
+    before = tuple(student(db, student_id))
+
+    cgpa = app.set_grade(db, student_id, first, 'A+', 2)
+    assert cgpa == recomputed_cgpa(db, student_id)
+    assert student(db, student_id)['graded_credits'] == before[1]
+    assert db.execute('SELECT COUNT(*) FROM grades WHERE student_id = ?', (student_id,)).fetchone()[0] == 2
+
+
+def test_unknown_student_or_subject_changes_nothing(app, db):
+    student_id = first_student(db)['id']
+    subject_id = subjects(db, 1)[0][0]
+    before = tuple(student(db, student_id))
+    assert app.set_grade(db, student_id, -1, 'A', 1) is None
+    assert app.set_grade(db, -1, subject_id, 'A', 1) is None
+    assert tuple(student(db, student_id)) == before
+    assert db.execute('SELECT COUNT(*) FROM grades').fetchone()[0] == 0
+    assert not db.in_transaction
+
+
+def test_one_by_one_matches_publishing(app, db):
+    rng = random.Random(3)
+    roll_numbers = dict(db.execute('SELECT id, student_id FROM students ORDER BY id LIMIT 30').fetchall())
+    grades = [(student_id, subject, rng.choice(list(app.GRADE_POINTS)))
+              for student_id in roll_numbers for subject in subjects(db, 5) if rng.random() < 0.7]
+    for student_id, (subject_id, _, _), grade in grades:
+        app.set_grade(db, student_id, subject_id, grade, 1)
+    incremental = db.execute('SELECT id, cgpa, graded_credits, grade_point_total FROM students').fetchall()
+
+    report = app.publish_results(db, 1, [{'student_id': roll_numbers[student_id], 'subject_code': code,
+                                          'grade': grade}
+                                         for student_id, (_, code, _), grade in grades])
+    assert report['published'] == len(grades)
+    assert report['students'] == len({student_id for student_id, _, _ in grades})
+    recomputed = db.execute('SELECT id, cgpa, graded_credits, grade_point_total FROM students').fetchall()
+    assert [tuple(row) for row in incremental] == [tuple(row) for row in recomputed]
+
+
+def test_publishing_reports_bad_rows(app, db):
+    roll = first_student(db)['student_id']
+    (_, code, credits), (_, other_code, other_credits) = subjects(db, 2)
+    report = app.publish_results(db, 1, [
+        {'student_id': roll, 'subject_code': code, 'grade': 'C'},
+        {'student_id': roll, 'subject_code': code, 'grade': 'b+'},  # replaces the row above
+        {'student_id': roll, 'subject_code': other_code, 'grade': ' O '},
+        {'student_id': roll, 'subject_code': '', 'grade': 'A'},
+        {'student_id': 'NOBODY', 'subject_code': code, 'grade': 'A'},
+        {'student_id': roll, 'subject_code': 'NOPE', 'grade': 'A'},
+        {'student_id': roll, 'subject_code': code, 'grade': 'Z'},
+    ])
+    assert report['published'] == 2
+    assert report['students'] == 1
+    assert report['error_count'] == 4
+    assert [line for line, _ in report['errors']] == [5, 6, 7, 8]
+    assert 'missing subject_code' in report['errors'][0][1]
+    cgpa = student(db, first_student(db)['id'])['cgpa']
+    assert cgpa == round((7 * credits + 10 * other_credits) / (credits + other_credits), 2)
+
+
+def test_students_without_grades_keep_their_cgpa(app, db):
+    graded, ungraded = db.execute('SELECT id, cgpa FROM students ORDER BY id LIMIT 2').fetchall()
+    app.set_grade(db, graded['id'], subjects(db, 1)[0][0], 'P', 1)
+    assert student(db, graded['id'])['cgpa'] == 4.0
+    assert student(db, ungraded['id'])['cgpa'] == ungraded['cgpa']
+
+
+def test_eligibility_index_moves_graded_students(app, db):
+    drive_id = db.execute('''
+        INSERT INTO placement_drives (company_name, position, eligibility_criteria, drive_date, status, min_cgpa)
+        VALUES ('TestCo', 'Engineer', 'CGPA > 9.5', '2030-01-01', 'Open', 0)
+        RETURNING id
+    ''').fetchone()[0]
+    app.bump_data_version(db, 'placement_drives')
+    db.commit()
+    index = app.eligibility_index(db)
+    student_id = db.execute('SELECT id FROM students WHERE cgpa < 9 ORDER BY id LIMIT 1').fetchone()[0]
+    assert student_id not in app.eligible_students(db, drive_id)
+    assert drive_id not in app.eligible_drive_ids(db, student_id)
+
+    app.set_grade(db, student_id, subjects(db, 1)[0][0], 'O', 1)
+    moved = app.eligibility_index(db)
+    # Moved in a copy: the drives were not parsed again
+    assert moved is not index and moved['drives'] is index['drives']
+    assert student_id in app.eligible_students(db, drive_id)
+    assert drive_id in app.eligible_drive_ids(db, student_id)
+
+    app._eligibility.clear()
+    rebuilt = app.eligibility_index(db)
+    assert rebuilt['students'] == moved['students']
+    assert rebuilt['cgpas'] == moved['cgpas']
+
+
+def test_other_writes_rebuild_the_eligibility_index(app, db):
+    index = app.eligibility_index(db)
+    roll = first_student(db)['student_id']
+    app.publish_results(db, 1, [{'student_id': roll, 'subject_code': subjects(db, 1)[0][1], 'grade': 'O'}])
+    rebuilt = app.eligibility_index(db)
+    assert rebuilt['drives'] is not index['drives']
+
+
+@pytest.mark.parametrize('behind', [1, 5])
+def test_a_worker_behind_the_change_log_rebuilds(app, db, monkeypatch, behind):
+    monkeypatch.setattr(app, 'CGPA_CHANGE_LOG_ROWS', 3)
+    index = app.eligibility_index(db)
+    ids = [row[0] for row in db.execute('SELECT id FROM students ORDER BY id LIMIT ?', (behind,))]
+    for student_id in ids:
+        app.set_grade(db, student_id, subjects(db, 1)[0][0], 'A', 1)
+    assert db.execute('SELECT COUNT(*) FROM cgpa_change_log').fetchone()[0] == min(behind, 3)
+    updated = app.eligibility_index(db)
+    assert (updated['drives'] is index['drives']) == (behind <= 3)
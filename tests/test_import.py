@@ -0,0 +1,130 @@
+"""Bulk user import: validation, batching, the per-row fallback and the upload page"""
+import codecs
+import io
+
+from conftest import ADMIN_LOGIN
+
+HEADER = 'user_type,username,password,full_name,email,student_id,program,semester,faculty_id,department,designation'
+
+
+def student(n, **fields):
+    return dict({'user_type': 'student', 'username': f'imported{n}', 'password': 'secret', 'full_name': f'Student {n}',
+                 'email': f'imported{n}@example.edu', 'student_id': f'IMP{n:04d}', 'program': 'Imported Studies',
+                 'semester': '3'}, **fields)
+
+
+def faculty(n, **fields):
+    return dict({'user_type': 'faculty', 'username': f'prof{n}', 'password': 'secret', 'full_name': f'Prof {n}',
+                 'faculty_id': f'FIMP{n:03d}', 'department': 'Imports', 'designation': 'Lecturer'}, **fields)
+
+
+def imported(conn):
+    """username -> (user_type, roll number or faculty id) of every imported user"""
+    return {row[0]: (row[1], row[2]) for row in conn.execute('''
+        SELECT u.username, u.user_type, COALESCE(s.student_id, f.faculty_id)
+        FROM users u
+        LEFT JOIN students s ON s.user_id = u.id
+        LEFT JOIN faculty f ON f.user_id = u.id
+        WHERE u.username LIKE 'imported%' OR u.username LIKE 'prof%'
+    ''')}
+
+
+def test_students_and_faculty_are_linked_to_their_users(app, db):
+    report = app.import_users(db, [student(1), faculty(1), student(2, email='', user_type=' Student ')])
+    assert report == {'imported': 3, 'error_count': 0, 'errors': []}
+    assert imported(db) == {'imported1': ('student', 'IMP0001'), 'prof1': ('faculty', 'FIMP001'),
+                            'imported2': ('student', 'IMP0002')}
+    assert db.execute("SELECT semester FROM students WHERE student_id = 'IMP0002'").fetchone()[0] == 3
+
+
+def test_invalid_rows_are_reported_and_skipped(app, db):
+    existing_user, existing_roll = db.execute('''
+        SELECT u.username, s.student_id FROM users u JOIN students s ON s.user_id = u.id LIMIT 1
+    ''').fetchone()
+    existing_faculty = db.execute('SELECT faculty_id FROM faculty LIMIT 1').fetchone()[0]
+    report = app.import_users(db, [
+        student(1),
+        student(2, user_type='alumni'),
+        student(3, program=''),
+        student(4, username=existing_user),
+        student(5, student_id=existing_roll),
+        student(6, semester='third'),
+        faculty(7, faculty_id=existing_faculty),
+        student(8, username='imported1'),         # taken earlier in the same file
+        student(9, student_id='IMP0001'),
+        faculty(10),
+    ])
+    assert report['imported'] == 2
+    assert report['error_count'] == 8
+    assert [line for line, _ in report['errors']] == [3, 4, 5, 6, 7, 8, 9, 10]
+    messages = dict(report['errors'])
+    assert "user_type must be 'student' or 'faculty'" in messages[3]
+    assert messages[4] == 'missing program'
+    assert 'already exists' in messages[5] and 'already exists' in messages[6]
+    assert 'semester must be a number' in messages[7]
+    assert set(imported(db)) == {'imported1', 'prof10'}
+
+
+def test_error_list_is_capped_but_every_error_counted(app, db, monkeypatch):
+    monkeypatch.setattr(app, 'IMPORT_MAX_ERRORS', 2)
+    report = app.import_users(db, [student(n, semester='x') for n in range(5)])
+    assert report['error_count'] == 5
+    assert len(report['errors']) == 2
+
+
+def test_large_files_are_written_in_batches(app, db, monkeypatch):
+    monkeypatch.setattr(app, 'IMPORT_BATCH_ROWS', 3)
+    report = app.import_users(db, [student(n) for n in range(10)] + [faculty(n) for n in range(4)])
+    assert report['imported'] == 14
+    ids = [row[0] for row in db.execute("SELECT u.id FROM users u JOIN students s ON s.user_id = u.id "
+                                        "WHERE u.username LIKE 'imported%' ORDER BY u.id")]
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_a_batch_that_fails_is_retried_row_by_row(app, db):
+    def rows():
+        yield student(1)
+        yield student(2)
+        # Another writer takes a username after it was validated
+        other = app.connect_db()
+        other.execute("INSERT INTO users (username, password, user_type, full_name) "
+                      "VALUES ('imported3', 'x', 'student', 'Someone else')")
+        other.commit()
+        other.close()
+        yield student(3)
+        yield student(4)
+
+    report = app.import_users(db, rows())
+    assert report['imported'] == 3
+    assert report['error_count'] == 1
+    assert report['errors'][0][0] == 4
+    assert 'UNIQUE' in report['errors'][0][1]
+    assert {'imported1', 'imported2', 'imported4'} <= set(imported(db))
+
+
+def test_upload_page_imports_a_csv(app, db, login):
+    client = login(ADMIN_LOGIN)
+    rows = [HEADER,
+            'student,imported1,pw,New Student,,IMP0001,Imported Studies,2,,,',
+            'faculty,prof1,pw,New Prof,,,,,FIMP001,Imports,Lecturer',
+            'student,imported2,pw,Bad Semester,,IMP0002,Imported Studies,two,,,']
+    # Spreadsheet exports start with a byte order mark
+    upload = io.BytesIO(codecs.BOM_UTF8 + '\r\n'.join(rows).encode())
+    response = client.post('/admin/import_users', data={'file': (upload, 'users.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b'Imported 2 users, 1 rows rejected.' in response.data
+    assert set(imported(db)) == {'imported1', 'prof1'}
+
+    # Imported users can sign in, and cached lists see them
+    assert 'Imported Studies' in app.student_programs(db)
+    page = client.get('/admin/students', query_string={'program': 'Imported Studies'})
+    assert b'IMP0001' in page.data
+    new_client = app.app.test_client()
+    response = new_client.post('/login', data={'username': 'imported1', 'password': 'pw'})
+    assert response.status_code == 302 and '/login' not in response.headers['Location']
+
+
+def test_upload_page_needs_a_file(app, login):
+    response = login(ADMIN_LOGIN).post('/admin/import_users', data={}, follow_redirects=True)
+    assert b'Choose a CSV file to import.' in response.data
@@ -0,0 +1,117 @@
+"""Keyset pagination: walking every page, filters, sort orders and bad cursors"""
+import base64
+import json
+import math
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from conftest import ADMIN_LOGIN, FACULTY_LOGIN, STUDENT_LOGIN
+
+STUDENTS_FROM = 'students s JOIN users u ON s.user_id = u.id'
+
+
+def walk(app, conn, args, page_size):
+    """Ids of every student the list shows for `args`, one page at a time"""
+    filters, where, params = app.student_list_filters(MultiDict(args))
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = app.keyset_page(conn, 's.id', STUDENTS_FROM, where, params,
+                                       app.STUDENT_SORTS[filters['sort']], descending=filters['order'] == 'desc',
+                                       cursor=cursor, page_size=page_size)
+        ids.extend(row['id'] for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def ordered(conn, sort_sql, where='', params=()):
+    return [row[0] for row in conn.execute(f'SELECT s.id FROM {STUDENTS_FROM} {where} ORDER BY {sort_sql}', params)]
+
+
+@pytest.mark.parametrize('sort, order, sort_sql', [
+    ('name', 'asc', 'u.full_name, u.id'),
+    ('name', 'desc', 'u.full_name DESC, u.id DESC'),
+    ('cgpa', 'asc', 's.cgpa, s.id'),
+    ('cgpa', 'desc', 's.cgpa DESC, s.id DESC'),
+])
+def test_pages_cover_every_row_once(app, db, sort, order, sort_sql):
+    expected = ordered(db, sort_sql)
+    ids, pages = walk(app, db, {'sort': sort, 'order': order}, page_size=37)
+    assert ids == expected
+    assert pages == math.ceil(len(expected) / 37)
+
+
+def test_ties_on_the_sort_key_are_not_skipped(app, db):
+    # Many students share a CGPA, and pages end inside those runs
+    assert db.execute('SELECT COUNT(*) - COUNT(DISTINCT cgpa) FROM students').fetchone()[0] > 100
+    ids, _ = walk(app, db, {'sort': 'cgpa'}, page_size=3)
+    assert ids == ordered(db, 's.cgpa, s.id')
+
+
+def test_filters_apply_to_every_page(app, db):
+    program = db.execute('SELECT program FROM students GROUP BY program ORDER BY COUNT(*) DESC').fetchone()[0]
+    ids, _ = walk(app, db, {'program': program, 'cgpa_min': '6', 'cgpa_max': '9', 'sort': 'cgpa'}, page_size=10)
+    expected = ordered(db, 's.cgpa, s.id', 'WHERE s.program = ? AND s.cgpa BETWEEN 6 AND 9', (program,))
+    assert ids == expected and len(expected) > 10
+
+
+def test_an_exact_last_page_has_no_next_cursor(app, db):
+    count = db.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+    rows, cursor = app.keyset_page(db, 's.id', STUDENTS_FROM, [], [], app.STUDENT_SORTS['name'], page_size=count)
+    assert len(rows) == count and cursor is None
+
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize('cursor', [
+    None, '', 'not base64!', base64.urlsafe_b64encode(b'not json').decode(), token({'a': 1}), token([1]),
+    token([1, 2, 3]), token(['x', [1]]), token([{'a': 1}, 2]), token([2 ** 63, 1]), token(['x', -2 ** 64]),
+])
+def test_invalid_cursors_are_ignored(app, cursor):
+    assert app.decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize('values', [['Alice', 12], [7.5, 3], [None, 4], [-2 ** 63, 2 ** 63 - 1]])
+def test_cursors_round_trip(app, values):
+    assert app.decode_cursor(app.encode_cursor(values)) == values
+
+
+def test_load_more_walks_the_admin_list(app, db, login):
+    client = login(ADMIN_LOGIN)
+    roll_numbers = [row[0] for row in db.execute(f'SELECT s.student_id FROM {STUDENTS_FROM} '
+                                                 f'ORDER BY s.cgpa DESC, s.id DESC')]
+    seen, cursor = [], ''
+    while True:
+        response = client.get('/admin/students', query_string={'sort': 'cgpa', 'order': 'desc', 'per_page': 100,
+                                                               'partial': 1, 'cursor': cursor})
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        seen.extend(roll for roll in roll_numbers if f'>{roll}<' in html)
+        cursor = response.headers['X-Next-Cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(roll_numbers)
+
+
+def test_a_tampered_cursor_shows_the_first_page(app, login):
+    client = login(ADMIN_LOGIN)
+    first = client.get('/admin/students?partial=1')
+    tampered = client.get('/admin/students', query_string={'partial': 1, 'cursor': token([[1], {'x': 2}])})
+    assert tampered.status_code == 200
+    assert tampered.data == first.data
+
+
+def test_page_size_is_clamped(app, login):
+    client = login(ADMIN_LOGIN)
+    rows = client.get('/admin/students?partial=1&per_page=100000').get_data(as_text=True).count('<tr')
+    assert rows == app.MAX_PAGE_SIZE
+
+
+def test_faculty_reports_page_through_students(app, login):
+    assert login(STUDENT_LOGIN).get('/faculty/reports?partial=1').status_code in (302, 403)
+    response = login(FACULTY_LOGIN).get('/faculty/reports?partial=1&per_page=5')
+    assert response.status_code == 200
+    assert response.headers['X-Next-Cursor']
@@ -0,0 +1,38 @@
+"""EXPLAIN QUERY PLAN regression tests: check_query_plans.py under pytest"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_query_plans
+
+STATEMENTS = check_query_plans.collect_statements()
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    return check_query_plans.load_app(str(tmp_path_factory.mktemp('db') / 'university.db'))
+
+
+@pytest.fixture(scope='module')
+def conn(app):
+    conn = app.connect_db()
+    yield conn
+    conn.close()
+
+
+def test_statements_found():
+    assert len(STATEMENTS) > 100
+
+
+@pytest.mark.parametrize('lineno, function, sql', STATEMENTS,
+                         ids=[f'{function}:{lineno}' for lineno, function, _ in STATEMENTS])
+def test_no_full_scan(conn, lineno, function, sql):
+    allowed = check_query_plans.FULL_SCAN_ALLOWED.get(function, set())
+    assert [table for table in check_query_plans.full_scans(conn, sql) if table not in allowed] == []
+
+
+def test_keyset_lists_use_indexes(app, conn):
+    for label, sql in check_query_plans.keyset_statements(app):
+        assert check_query_plans.full_scans(conn, sql) == [], label
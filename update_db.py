@@ -1,11 +1,152 @@
 import sqlite3
 import os
 
-DATABASE = 'database/university.db'
+DATABASE = os.environ.get('UMS_DATABASE', 'database/university.db')
 
-def update_db():
-    print(f"Connecting to {DATABASE}...")
-    conn = sqlite3.connect(DATABASE)
+# Stored in PRAGMA user_version once every step below has been applied;
+# bump it when adding a step
+SCHEMA_VERSION = 7
+
+# Full-text search tables, one per kind of record. people_search is keyed by
+# users.id and gathers its columns from users, students and faculty; the
+# others index their table in place (external content). Triggers keep them
+# in sync, and each table's bm25 column weights are stored as its rank.
+# Every roll number is a token of its own, so people_search indexes longer
+# prefixes too; without them "S070" would merge thousands of posting lists.
+SEARCH_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS people_search USING fts5(
+        full_name, code, program, user_type UNINDEXED,
+        prefix='2 3 4 5 6', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS events_search USING fts5(
+        event_name, event_type, description,
+        content='events', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS drives_search USING fts5(
+        company_name, position, description,
+        content='placement_drives', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS announcements_search USING fts5(
+        title, content,
+        content='announcements', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    );
+    INSERT INTO people_search (people_search, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)');
+    INSERT INTO events_search (events_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)');
+    INSERT INTO drives_search (drives_search, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)');
+    INSERT INTO announcements_search (announcements_search, rank) VALUES ('rank', 'bm25(5.0, 1.0)');
+
+    CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users
+    WHEN new.user_type IN ('student', 'faculty') BEGIN
+        INSERT INTO people_search (rowid, full_name, user_type) VALUES (new.id, new.full_name, new.user_type);
+    END;
+    CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE OF full_name ON users BEGIN
+        UPDATE people_search SET full_name = new.full_name WHERE rowid = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users BEGIN
+        DELETE FROM people_search WHERE rowid = old.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS students_search_insert AFTER INSERT ON students BEGIN
+        UPDATE people_search SET code = new.student_id, program = new.program WHERE rowid = new.user_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS students_search_update AFTER UPDATE OF student_id, program ON students BEGIN
+        UPDATE people_search SET code = new.student_id, program = new.program WHERE rowid = new.user_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS faculty_search_insert AFTER INSERT ON faculty BEGIN
+        UPDATE people_search SET code = new.faculty_id, program = new.department WHERE rowid = new.user_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS faculty_search_update AFTER UPDATE OF faculty_id, department ON faculty BEGIN
+        UPDATE people_search SET code = new.faculty_id, program = new.department WHERE rowid = new.user_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS events_search_insert AFTER INSERT ON events BEGIN
+        INSERT INTO events_search (rowid, event_name, event_type, description)
+        VALUES (new.id, new.event_name, new.event_type, new.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS events_search_delete AFTER DELETE ON events BEGIN
+        INSERT INTO events_search (events_search, rowid, event_name, event_type, description)
+        VALUES ('delete', old.id, old.event_name, old.event_type, old.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS events_search_update AFTER UPDATE OF event_name, event_type, description ON events BEGIN
+        INSERT INTO events_search (events_search, rowid, event_name, event_type, description)
+        VALUES ('delete', old.id, old.event_name, old.event_type, old.description);
+        INSERT INTO events_search (rowid, event_name, event_type, description)
+        VALUES (new.id, new.event_name, new.event_type, new.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS drives_search_insert AFTER INSERT ON placement_drives BEGIN
+        INSERT INTO drives_search (rowid, company_name, position, description)
+        VALUES (new.id, new.company_name, new.position, new.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS drives_search_delete AFTER DELETE ON placement_drives BEGIN
+        INSERT INTO drives_search (drives_search, rowid, company_name, position, description)
+        VALUES ('delete', old.id, old.company_name, old.position, old.description);
+    END;
+    CREATE TRIGGER IF NOT EXISTS drives_search_update AFTER UPDATE OF company_name, position, description
+    ON placement_drives BEGIN
+        INSERT INTO drives_search (drives_search, rowid, company_name, position, description)
+        VALUES ('delete', old.id, old.company_name, old.position, old.description);
+        INSERT INTO drives_search (rowid, company_name, position, description)
+        VALUES (new.id, new.company_name, new.position, new.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS announcements_search_insert AFTER INSERT ON announcements BEGIN
+        INSERT INTO announcements_search (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS announcements_search_delete AFTER DELETE ON announcements BEGIN
+        INSERT INTO announcements_search (announcements_search, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS announcements_search_update AFTER UPDATE OF title, content ON announcements BEGIN
+        INSERT INTO announcements_search (announcements_search, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO announcements_search (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+"""
+
+def create_search_index(cursor):
+    """Create the search tables and their triggers, then fill them from the existing rows"""
+    cursor.executescript(SEARCH_SCHEMA)
+    cursor.execute("DELETE FROM people_search")
+    cursor.execute("""
+        INSERT INTO people_search (rowid, full_name, code, program, user_type)
+        SELECT u.id, u.full_name, COALESCE(s.student_id, f.faculty_id), COALESCE(s.program, f.department), u.user_type
+        FROM users u
+        LEFT JOIN students s ON s.user_id = u.id
+        LEFT JOIN faculty f ON f.user_id = u.id
+        WHERE u.user_type IN ('student', 'faculty')
+    """)
+    for table in ('events_search', 'drives_search', 'announcements_search'):
+        cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+
+def create_indexes(cursor):
+    """Create the secondary indexes used by the routes"""
+    # One attendance row per student per subject
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_student_subject ON attendance(student_id, subject_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_subject ON attendance(subject_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_subject_roster_student ON subject_roster(student_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_faculty_subjects_subject ON faculty_subjects(subject_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_sessions_subject_date ON attendance_sessions(subject_id, class_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_user ON students(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_cgpa ON students(cgpa)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_program_semester ON students(program, semester, cgpa)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_full_name ON users(full_name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_faculty_user ON faculty(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_faculty_department ON faculty(department)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_status_due ON assignments(status, due_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_due ON assignments(due_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assignments_subject_due ON assignments(subject_id, due_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_companies_visit_date ON companies(visit_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_drives_status_cgpa ON placement_drives(status, min_cgpa)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_drives_date ON placement_drives(drive_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_drive_registrations_drive_status ON drive_registrations(drive_id, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_event_registrations_event ON event_registrations(event_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_announcements_created ON announcements(created_at)')
+
+def update_db(database=None):
+    database = database or DATABASE
+    print(f"Connecting to {database}...")
+    conn = sqlite3.connect(database)
     cursor = conn.cursor()
     
     # Create Drive Registrations table
@@ -70,7 +211,157 @@ def update_db():
         
         # update description for existing records
         cursor.execute("UPDATE placement_drives SET description = 'No description available.' WHERE description IS NULL")
-    
+
+    if 'capacity' not in columns:
+        print("Adding capacity column to placement_drives...")
+        cursor.execute("ALTER TABLE placement_drives ADD COLUMN capacity INTEGER")
+
+    # Merge duplicate attendance rows so (student_id, subject_id) can be unique
+    print("Merging duplicate attendance records...")
+    cursor.execute("""
+        UPDATE attendance
+        SET total_classes = (SELECT SUM(total_classes) FROM attendance a
+                             WHERE a.student_id = attendance.student_id AND a.subject_id = attendance.subject_id),
+            attended_classes = (SELECT SUM(attended_classes) FROM attendance a
+                                WHERE a.student_id = attendance.student_id AND a.subject_id = attendance.subject_id)
+        WHERE id IN (SELECT MIN(id) FROM attendance GROUP BY student_id, subject_id HAVING COUNT(*) > 1)
+    """)
+    cursor.execute("""
+        DELETE FROM attendance
+        WHERE id NOT IN (SELECT MIN(id) FROM attendance GROUP BY student_id, subject_id)
+    """)
+
+    # Create the attendance ledger tables
+    print("Creating subject_roster and attendance_sessions tables...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subject_roster (
+            subject_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            carried_total INTEGER DEFAULT 0,
+            carried_attended INTEGER DEFAULT 0,
+            PRIMARY KEY (subject_id, position),
+            UNIQUE (subject_id, student_id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id),
+            FOREIGN KEY (student_id) REFERENCES students(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject_id INTEGER NOT NULL,
+            class_date DATE NOT NULL,
+            roster_size INTEGER NOT NULL,
+            present_count INTEGER NOT NULL,
+            present BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        )
+    ''')
+
+    # Existing counters become the carried-over balance of each roster entry
+    cursor.execute("SELECT COUNT(*) FROM subject_roster")
+    if cursor.fetchone()[0] == 0:
+        print("Building subject rosters from attendance records...")
+        cursor.execute("""
+            INSERT INTO subject_roster (subject_id, position, student_id, carried_total, carried_attended)
+            SELECT subject_id,
+                   ROW_NUMBER() OVER (PARTITION BY subject_id ORDER BY student_id) - 1,
+                   student_id, total_classes, attended_classes
+            FROM attendance
+        """)
+
+    # Create the enrollment tables: rosters already list each subject's students
+    print("Creating faculty_subjects table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS faculty_subjects (
+            faculty_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            PRIMARY KEY (faculty_id, subject_id),
+            FOREIGN KEY (faculty_id) REFERENCES faculty(id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        ) WITHOUT ROWID
+    ''')
+    # Subjects nobody teaches yet are handed out to the faculty in turn
+    cursor.execute("""
+        INSERT INTO faculty_subjects (faculty_id, subject_id)
+        SELECT f.id, s.subject_id
+        FROM (SELECT id AS subject_id, ROW_NUMBER() OVER (ORDER BY id) - 1 AS n FROM subjects
+              WHERE id NOT IN (SELECT subject_id FROM faculty_subjects)) s
+        JOIN (SELECT id, ROW_NUMBER() OVER (ORDER BY id) - 1 AS n FROM faculty) f
+            ON f.n = s.n % (SELECT COUNT(*) FROM faculty)
+    """)
+
+    cursor.execute("PRAGMA table_info(subjects)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if 'enrolled_count' not in columns:
+        print("Adding enrolled_count column to subjects...")
+        cursor.execute("ALTER TABLE subjects ADD COLUMN enrolled_count INTEGER DEFAULT 0")
+    cursor.execute("""
+        UPDATE subjects SET enrolled_count = (SELECT COUNT(*) FROM subject_roster r WHERE r.subject_id = subjects.id)
+    """)
+
+    # Create Grades table and the running CGPA sums on students
+    print("Creating grades table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS grades (
+            student_id INTEGER NOT NULL,
+            subject_id INTEGER NOT NULL,
+            semester INTEGER NOT NULL,
+            grade TEXT NOT NULL,
+            grade_points INTEGER NOT NULL,
+            credits INTEGER NOT NULL,
+            graded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (student_id, subject_id),
+            FOREIGN KEY (student_id) REFERENCES students(id),
+            FOREIGN KEY (subject_id) REFERENCES subjects(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("PRAGMA table_info(students)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if 'graded_credits' not in columns:
+        print("Adding graded_credits and grade_point_total columns to students...")
+        cursor.execute("ALTER TABLE students ADD COLUMN graded_credits INTEGER DEFAULT 0")
+        cursor.execute("ALTER TABLE students ADD COLUMN grade_point_total INTEGER DEFAULT 0")
+
+    # Create Data Version table used to invalidate cached query results
+    print("Creating data_version table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Create Snapshot Version table used to invalidate dashboard snapshots
+    print("Creating snapshot_version table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snapshot_version (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Create CGPA Change Log table used to update the eligibility index in place
+    print("Creating cgpa_change_log table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cgpa_change_log (
+            students_version INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL
+        )
+    ''')
+
+    # Create the full-text search tables
+    print("Creating search index...")
+    create_search_index(cursor)
+
+    # Create indexes for the hot query paths
+    print("Creating indexes...")
+    cursor.execute('DROP INDEX IF EXISTS idx_drive_registrations_drive')
+    create_indexes(cursor)
+
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
     conn.commit()
     conn.close()
     print("Database updated successfully!")